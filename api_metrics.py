@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Google API 呼び出しの計測（メソッド別の回数・レイテンシ分布・受信バイト数・リトライ・クォータエラー）
+
+環境変数 GOOGLE_API_METRICS に出力先ディレクトリを設定すると、google_clients.get_service が
+作る全サービスの HTTP セッションを計測用のラッパーで包み、終了時に
+JSON と Prometheus のテキスト形式でメソッド別の集計を書き出す。
+
+  GOOGLE_API_METRICS=/tmp/api-metrics python3 auto-fix-drive-permissions.py
+
+メソッドはディスカバリー文書のパスから判定する（例: drive.files.list, sheets.spreadsheets.values.get）。
+バッチリクエストは {api}.batch として1回の HTTP 呼び出しを記録し、中の各リクエストも
+それぞれのメソッドとして数える（中のリクエストのレイテンシはバッチ全体のもの）。
+直前に失敗した同じリクエストを同じスレッドで送り直したものをリトライとして数える。
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from urllib.parse import urlsplit
+
+METRICS_ENV = 'GOOGLE_API_METRICS'
+
+# レイテンシのヒストグラムの区切り（秒）
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 403 でもクォータ超過を表すエラー理由
+QUOTA_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded', 'quotaExceeded', 'dailyLimitExceeded',
+                 'RATE_LIMIT_EXCEEDED'}
+
+# リトライ判定のために覚えておく失敗リクエストの上限（スレッドごと）
+MAX_FAILED_KEYS = 10_000
+
+
+def enabled():
+    return bool(os.environ.get(METRICS_ENV))
+
+
+class ApiMetrics:
+    """メソッド別の集計（スレッドセーフ）"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.methods = {}
+        self.started = time.time()
+
+    def _method(self, name):
+        stat = self.methods.get(name)
+        if stat is None:
+            stat = self.methods[name] = {
+                'requests': 0,
+                'status': Counter(),
+                'buckets': [0] * len(LATENCY_BUCKETS),
+                'latency_sum': 0.0,
+                'response_bytes': 0,
+                'retries': 0,
+                'quota_errors': 0
+            }
+        return stat
+
+    def record(self, method, status, seconds, response_bytes, retry=False, quota_error=False):
+        with self.lock:
+            stat = self._method(method)
+            stat['requests'] += 1
+            stat['status'][str(status)] += 1
+            stat['latency_sum'] += seconds
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    stat['buckets'][index] += 1
+                    break
+            stat['response_bytes'] += response_bytes
+            stat['retries'] += retry
+            stat['quota_errors'] += quota_error
+
+    def reset(self):
+        with self.lock:
+            self.methods = {}
+            self.started = time.time()
+
+    def summary(self):
+        """JSON に書き出す形の集計"""
+        with self.lock:
+            methods = {}
+            for name, stat in sorted(self.methods.items()):
+                cumulative = 0
+                histogram = {}
+                for bound, count in zip(LATENCY_BUCKETS, stat['buckets']):
+                    cumulative += count
+                    histogram[f'{bound:g}'] = cumulative
+                histogram['+Inf'] = stat['requests']
+                methods[name] = {
+                    'requests': stat['requests'],
+                    'status': dict(stat['status']),
+                    'latency_seconds': {
+                        'sum': round(stat['latency_sum'], 6),
+                        'mean': round(stat['latency_sum'] / stat['requests'], 6) if stat['requests'] else 0,
+                        'buckets': histogram
+                    },
+                    'response_bytes': stat['response_bytes'],
+                    'retries': stat['retries'],
+                    'quota_errors': stat['quota_errors']
+                }
+            return {
+                'script': os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else '',
+                'started': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+                'duration_seconds': round(time.time() - self.started, 3),
+                'methods': methods
+            }
+
+    def to_prometheus(self):
+        """Prometheus のテキスト形式"""
+        summary = self.summary()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(samples)
+
+        def label(method, **extra):
+            labels = {'method': method, **extra}
+            return '{' + ','.join(f'{key}="{value}"' for key, value in labels.items()) + '}'
+
+        methods = summary['methods']
+        metric('google_api_requests_total', 'counter', 'Google API requests by method and HTTP status.', [
+            f'google_api_requests_total{label(name, status=status)} {count}'
+            for name, stat in methods.items() for status, count in sorted(stat['status'].items())
+        ])
+        histogram = []
+        for name, stat in methods.items():
+            for bound, count in stat['latency_seconds']['buckets'].items():
+                histogram.append(f'google_api_request_duration_seconds_bucket{label(name, le=bound)} {count}')
+            histogram.append(f'google_api_request_duration_seconds_sum{label(name)} {stat["latency_seconds"]["sum"]}')
+            histogram.append(f'google_api_request_duration_seconds_count{label(name)} {stat["requests"]}')
+        metric('google_api_request_duration_seconds', 'histogram', 'Google API request latency.', histogram)
+        metric('google_api_response_bytes_total', 'counter', 'Google API response body bytes.', [
+            f'google_api_response_bytes_total{label(name)} {stat["response_bytes"]}' for name, stat in methods.items()
+        ])
+        metric('google_api_retries_total', 'counter', 'Google API requests resent after a failure.', [
+            f'google_api_retries_total{label(name)} {stat["retries"]}' for name, stat in methods.items()
+        ])
+        metric('google_api_quota_errors_total', 'counter', 'Google API rate limit and quota errors.', [
+            f'google_api_quota_errors_total{label(name)} {stat["quota_errors"]}' for name, stat in methods.items()
+        ])
+        return '\n'.join(lines) + '\n'
+
+
+metrics = ApiMetrics()
+
+
+def _discovery_methods(resource):
+    """ディスカバリー文書のリソースを再帰的にたどってメソッドを列挙"""
+    for method in resource.get('methods', {}).values():
+        yield method
+    for child in resource.get('resources', {}).values():
+        yield from _discovery_methods(child)
+
+
+def method_routes(document):
+    """URL のパスからメソッドIDを判定するための (HTTPメソッド, 正規表現, メソッドID) のリスト"""
+    routes = []
+    for method in _discovery_methods(document):
+        path = document.get('servicePath', '') + method.get('flatPath', method['path'])
+        pattern = re.sub(r'\\\{\\\+[^}]+\\\}', '.+', re.escape(path))
+        pattern = re.sub(r'\\\{[^}]+\\\}', '[^/]+', pattern)
+        routes.append((method.get('httpMethod', 'GET'), re.compile(pattern), method['id'], path.count('{')))
+    # パラメータの少ない（固定部分の多い）パスを先に照合する（files/generateIds と files/{fileId} など）
+    routes.sort(key=lambda route: route[3])
+    return [route[:3] for route in routes]
+
+
+def error_reasons(content):
+    """Google API のエラー応答の本文から reason（error.errors[] と error.details[]）を集める"""
+    try:
+        error = json.loads(content)['error']
+        entries = list(error.get('errors') or []) + list(error.get('details') or [])
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return set()
+    return {entry.get('reason') for entry in entries if isinstance(entry, dict) and entry.get('reason')}
+
+
+def _quota_error(status, content):
+    if status == 429:
+        return True
+    return status == 403 and bool(error_reasons(content) & QUOTA_REASONS)
+
+
+def _as_text(data):
+    if data is None:
+        return ''
+    return data.decode('utf-8', 'replace') if isinstance(data, bytes) else data
+
+
+def _split_multipart(content_type, body):
+    """multipart/mixed の本文を Content-ID → パートの HTTP メッセージ に分解"""
+    match = re.search(r'boundary="?([^";]+)"?', content_type or '')
+    if not match:
+        return {}
+    parts = {}
+    for part in _as_text(body).replace('\r\n', '\n').split(f'--{match.group(1)}')[1:]:
+        headers, _, message = part.strip('\n').partition('\n\n')
+        # googleapiclient は長い Content-ID を折り返して送るので、1行に戻してから読む
+        headers = re.sub(r'\n[ \t]+', ' ', headers)
+        content_id = re.search(r'Content-ID:\s*<(?:response-)?([^>]*)>', headers, re.IGNORECASE)
+        if content_id and message:
+            parts[content_id.group(1)] = message
+    return parts
+
+
+class InstrumentedHttp:
+    """googleapiclient から使われる HTTP セッションを包み、呼び出しごとに計測する"""
+
+    def __init__(self, http, api, document, registry=None):
+        self.http = http
+        self.api = api
+        self.routes = method_routes(document)
+        self.batch_path = '/' + document.get('batchPath', 'batch').lstrip('/')
+        self.metrics = registry or metrics
+        self._local = threading.local()
+
+    def __getattr__(self, name):
+        # credentials・timeout などは元のセッションのものを使う
+        return getattr(self.http, name)
+
+    def _method_id(self, http_method, uri):
+        path = urlsplit(uri).path.lstrip('/')
+        for route_method, pattern, method_id in self.routes:
+            if route_method == http_method and pattern.fullmatch(path):
+                return method_id
+        return f'{self.api}.unknown'
+
+    def _is_retry(self, key, failed):
+        """直前に失敗した同じリクエストかどうかを返し、今回の結果を覚えておく"""
+        keys = getattr(self._local, 'failed', None)
+        if keys is None:
+            keys = self._local.failed = set()
+        retry = key in keys
+        if failed:
+            if len(keys) >= MAX_FAILED_KEYS:
+                keys.clear()
+            keys.add(key)
+        else:
+            keys.discard(key)
+        return retry
+
+    def request(self, uri, method='GET', body=None, headers=None, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            response, content = self.http.request(uri, method, body, headers, *args, **kwargs)
+        except Exception:
+            elapsed = time.perf_counter() - started
+            key = (method, uri, hashlib.sha1(_as_text(body).encode('utf-8')).hexdigest())
+            self.metrics.record(self._method_id(method, uri), 'error', elapsed, 0,
+                                retry=self._is_retry(key, True))
+            raise
+        elapsed = time.perf_counter() - started
+
+        if urlsplit(uri).path == self.batch_path:
+            self._record_batch(body, headers, response, content, elapsed)
+            return response, content
+
+        status = response.status
+        key = (method, uri, hashlib.sha1(_as_text(body).encode('utf-8')).hexdigest())
+        self.metrics.record(
+            self._method_id(method, uri), status, elapsed, len(content or b''),
+            retry=self._is_retry(key, status >= 400),
+            quota_error=_quota_error(status, content)
+        )
+        return response, content
+
+    def _record_batch(self, body, headers, response, content, elapsed):
+        """バッチ自体と中の各リクエストを記録"""
+        status = response.status
+        key = ('POST', self.batch_path, hashlib.sha1(_as_text(body).encode('utf-8')).hexdigest())
+        self.metrics.record(f'{self.api}.batch', status, elapsed, len(content or b''),
+                            retry=self._is_retry(key, status >= 400),
+                            quota_error=_quota_error(status, content))
+        if status >= 400:
+            return
+
+        request_headers = {name.lower(): value for name, value in (headers or {}).items()}
+        requests = _split_multipart(request_headers.get('content-type'), body)
+        responses = _split_multipart(response.get('content-type'), content)
+        for content_id, message in requests.items():
+            request_line, _, request_body = message.partition('\n\n')
+            http_method, path = request_line.split('\n', 1)[0].split(' ')[:2]
+
+            reply = responses.get(content_id, '')
+            status_line, _, reply_rest = reply.partition('\n')
+            _, _, reply_body = reply_rest.partition('\n\n')
+            match = re.match(r'HTTP/[\d.]+ (\d+)', status_line)
+            inner_status = int(match.group(1)) if match else 'missing'
+            failed = inner_status == 'missing' or inner_status >= 400
+
+            inner_key = (http_method, path, hashlib.sha1(request_body.strip().encode('utf-8')).hexdigest())
+            self.metrics.record(
+                self._method_id(http_method, path), inner_status, elapsed, len(reply_body.encode('utf-8')),
+                retry=self._is_retry(inner_key, failed),
+                quota_error=failed and _quota_error(inner_status, reply_body)
+            )
+
+
+_report_registered = False
+_report_lock = threading.Lock()
+
+
+def instrument(http, api, document):
+    """HTTP セッションを計測用に包む（初回に終了時のレポート出力を登録する）"""
+    global _report_registered
+    with _report_lock:
+        if not _report_registered:
+            atexit.register(write_report)
+            _report_registered = True
+    return InstrumentedHttp(http, api, document)
+
+
+def print_summary(summary):
+    """メソッド別の集計を表示"""
+    print(f"\n📈 Google API 呼び出し（{summary['duration_seconds']:.1f} 秒）")
+    for name, stat in summary['methods'].items():
+        print(f"   {name:<42} {stat['requests']:>7,}回   平均 {stat['latency_seconds']['mean'] * 1000:>8.1f} ms   "
+              f"{stat['response_bytes']:>12,} B   リトライ {stat['retries']:>5,}   クォータ {stat['quota_errors']:>5,}")
+
+
+def write_report(output_dir=None):
+    """集計を JSON と Prometheus のテキスト形式で書き出し、書き出したパスを返す"""
+    output_dir = output_dir or os.environ.get(METRICS_ENV)
+    summary = metrics.summary()
+    if not output_dir or not summary['methods']:
+        return None
+
+    os.makedirs(output_dir, exist_ok=True)
+    name = os.path.splitext(summary['script'] or 'python')[0]
+    base = os.path.join(output_dir, f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+    with open(base + '.json', 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    with open(base + '.prom', 'w', encoding='utf-8') as f:
+        f.write(metrics.to_prometheus())
+
+    print_summary(summary)
+    print(f"   📝 {base}.json / {base}.prom")
+    return base
@@ -1,10 +1,61 @@
 import { NextRequest, NextResponse } from 'next/server'
 import Anthropic from '@anthropic-ai/sdk'
+import { getCachedOcr, imageMd5, ocrCacheStats, ORIGINAL_SETTINGS, promptVersion, putCachedOcr } from '@/lib/ocrCache'
+
+// OCR キャッシュ（better-sqlite3）を使うため Node.js ランタイムで実行
+export const runtime = 'nodejs'
 
 const anthropic = new Anthropic({
   apiKey: process.env.ANTHROPIC_API_KEY!,
 })
 
+const MODEL = "claude-3-5-sonnet-20241022"
+const EXTRACTION_PROMPT = `この地理の問題画像から以下を抽出してJSONで返してください：
+
+{
+  "questionText": "問題文の全文",
+  "keywords": ["キーワード1", "キーワード2", ...],
+  "regions": ["地域名1", "地域名2", ...],
+  "topics": ["分野1", "分野2", ...]
+}
+
+地理的な専門用語、地域名、気候、産業、地形などのキーワードを網羅的に抽出してください。`
+// モデルかプロンプトを変えるとキャッシュのキーが変わる
+const PROMPT_VERSION = promptVersion(MODEL, EXTRACTION_PROMPT)
+
+// サーバーから取得してよい画像のホスト（Google Drive の画像URLと、そのリダイレクト先）
+const ALLOWED_IMAGE_HOSTS = ['drive.google.com', 'drive.usercontent.google.com']
+const ALLOWED_IMAGE_HOST_SUFFIX = '.googleusercontent.com'
+const IMAGE_FETCH_TIMEOUT_MS = 10_000
+const MAX_IMAGE_REDIRECTS = 3
+
+function isAllowedImageUrl(url: URL) {
+  return url.protocol === 'https:' &&
+    (ALLOWED_IMAGE_HOSTS.includes(url.hostname) || url.hostname.endsWith(ALLOWED_IMAGE_HOST_SUFFIX))
+}
+
+function parseUrl(text: unknown) {
+  try {
+    return new URL(String(text))
+  } catch {
+    return null
+  }
+}
+
+// 許可したホストの画像だけを取得する（リダイレクト先のホストも毎回確認し、全体でタイムアウトする）
+async function fetchImage(imageUrl: URL) {
+  const signal = AbortSignal.timeout(IMAGE_FETCH_TIMEOUT_MS)
+  let url = imageUrl
+  for (let redirects = 0; redirects <= MAX_IMAGE_REDIRECTS; redirects++) {
+    if (!isAllowedImageUrl(url)) return null
+    const response = await fetch(url, { signal, redirect: 'manual' })
+    const location = response.headers.get('location')
+    if (response.status < 300 || response.status >= 400 || !location) return response
+    url = new URL(location, url)
+  }
+  return null
+}
+
 export async function POST(request: NextRequest) {
   try {
     const { imageUrl, questionId } = await request.json()
@@ -12,10 +63,32 @@ export async function POST(request: NextRequest) {
     if (!imageUrl) {
       return NextResponse.json({ error: 'Image URL is required' }, { status: 400 })
     }
+    const url = parseUrl(imageUrl)
+    if (!url || !isAllowedImageUrl(url)) {
+      return NextResponse.json({ error: 'Image URL must be a Google Drive URL' }, { status: 400 })
+    }
+
+    // 画像の内容のハッシュで OCR キャッシュを引く（画像もプロンプトも同じなら Claude API を呼ばない）
+    const imageResponse = await fetchImage(url)
+    if (!imageResponse?.ok) {
+      return NextResponse.json({ error: 'Failed to fetch image' }, { status: 502 })
+    }
+    const image = Buffer.from(await imageResponse.arrayBuffer())
+    const md5 = imageMd5(image)
+
+    const cached = getCachedOcr(md5, ORIGINAL_SETTINGS, PROMPT_VERSION)
+    if (cached !== null) {
+      return NextResponse.json({
+        questionId,
+        ...JSON.parse(cached),
+        extractedAt: new Date().toISOString(),
+        cached: true
+      })
+    }
 
-    // Claude APIで画像から問題文を抽出
+    // Claude APIで画像から問題文を抽出（取得済みの画像をそのまま送る）
     const message = await anthropic.messages.create({
-      model: "claude-3-5-sonnet-20241022",
+      model: MODEL,
       max_tokens: 1000,
       messages: [
         {
@@ -24,29 +97,23 @@ export async function POST(request: NextRequest) {
             {
               type: "image",
               source: {
-                type: "url",
-                url: imageUrl
+                type: "base64",
+                media_type: mediaType(imageResponse.headers.get('content-type')),
+                data: image.toString('base64')
               }
             },
             {
               type: "text",
-              text: `この地理の問題画像から以下を抽出してJSONで返してください：
-
-{
-  "questionText": "問題文の全文",
-  "keywords": ["キーワード1", "キーワード2", ...],
-  "regions": ["地域名1", "地域名2", ...],
-  "topics": ["分野1", "分野2", ...]
-}
-
-地理的な専門用語、地域名、気候、産業、地形などのキーワードを網羅的に抽出してください。`
+              text: EXTRACTION_PROMPT
             }
           ]
         }
       ]
     })
 
-    const result = JSON.parse(message.content[0].text)
+    const text = message.content[0].text
+    const result = JSON.parse(text)
+    putCachedOcr(md5, ORIGINAL_SETTINGS, PROMPT_VERSION, text)
     
     return NextResponse.json({
       questionId,
@@ -55,10 +122,24 @@ export async function POST(request: NextRequest) {
     })
 
   } catch (error) {
+    if (error instanceof DOMException && error.name === 'TimeoutError') {
+      return NextResponse.json({ error: 'Timed out fetching image' }, { status: 504 })
+    }
     console.error('Text extraction error:', error)
     return NextResponse.json(
       { error: 'Failed to extract text from image' },
       { status: 500 }
     )
   }
-}
\ No newline at end of file
+}
+
+// OCR キャッシュのヒット率などの統計
+export async function GET() {
+  return NextResponse.json(ocrCacheStats())
+}
+
+function mediaType(contentType: string | null) {
+  const type = (contentType || '').split(';')[0].trim()
+  return (['image/jpeg', 'image/png', 'image/gif', 'image/webp'].includes(type) ? type : 'image/png') as
+    'image/jpeg' | 'image/png' | 'image/gif' | 'image/webp'
+}
@@ -1,5 +1,5 @@
 import { NextResponse } from 'next/server'
-import { getGoogleSheetsClient, SPREADSHEET_ID, SHEET_NAME, Question } from '@/lib/googleSheets'
+import { getGoogleSheetsClient, listYearTabs, fetchTabValues, yearFromTitle, Question } from '@/lib/googleSheets'
 
 // Google Drive URL を直接表示可能なURLに変換
 function convertDriveUrlToDirectLink(driveUrl: string): string {
@@ -25,34 +25,32 @@ export async function GET() {
 
     const sheets = getGoogleSheetsClient()
     
-    // スプレッドシートからデータを取得
-    const response = await sheets.spreadsheets.values.get({
-      spreadsheetId: SPREADSHEET_ID,
-      range: `${SHEET_NAME}!A:K`, // A列からK列まで取得
-    })
+    // 年度タブを探し、全タブのデータをまとめて取得
+    const titles = await listYearTabs(sheets)
+    const tabs = await fetchTabValues(sheets, titles)
 
-    const rows = response.data.values
-    
-    if (!rows || rows.length <= 1) {
-      return NextResponse.json([])
+    // 各タブのヘッダー行をスキップして、データを変換
+    const questions: Question[] = []
+    for (const { title, rows } of tabs) {
+      const year = yearFromTitle(title) || ''
+      for (const row of rows.slice(1)) {
+        questions.push({
+          id: (questions.length + 1).toString(),
+          questionId: row[0] || '', // A列: 問題ID（2024_geo_1_1など）
+          category: row[2] || '', // C列: 分野タグ（地形,農業など）
+          answer: row[3] || '', // D列: 正答
+          correctRate: row[4] || '', // E列: 正答率
+          imageUrl: convertDriveUrlToDirectLink(row[8] || ''), // I列: Google Drive URL → 直接表示可能URL
+          year, // タブ名の年度
+          notes: row[6] || '', // G列: ノート
+          createdDate: row[7] || '', // H列: 作成日
+          imageFile: row[8] || '', // I列: 元のGoogle Drive URL
+          questionText: row[9] || '', // J列: OCRキーワード
+          fullQuestionText: row[10] || '' // K列: 問題文全文
+        })
+      }
     }
 
-    // ヘッダー行をスキップして、データを変換
-    const questions: Question[] = rows.slice(1).map((row, index) => ({
-      id: (index + 1).toString(),
-      questionId: row[0] || '', // A列: 問題ID（2024_geo_1_1など）
-      category: row[2] || '', // C列: 分野タグ（地形,農業など）
-      answer: row[3] || '', // D列: 正答
-      correctRate: row[4] || '', // E列: 正答率
-      imageUrl: convertDriveUrlToDirectLink(row[8] || ''), // I列: Google Drive URL → 直接表示可能URL
-      year: '2024', // 固定値
-      notes: row[6] || '', // G列: ノート
-      createdDate: row[7] || '', // H列: 作成日
-      imageFile: row[8] || '', // I列: 元のGoogle Drive URL
-      questionText: row[9] || '', // J列: OCRキーワード
-      fullQuestionText: row[10] || '' // K列: 問題文全文
-    }))
-
     return NextResponse.json(questions)
   } catch (error) {
     console.error('Google Sheets API error:', error)
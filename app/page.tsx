@@ -15,6 +15,68 @@ type Question = {
   fullQuestionText?: string
 }
 
+// scripts/build-question-shards.py がビルド時に書き出すシャードの一覧
+type ShardEntry = {
+  file: string
+  count: number
+}
+
+type ShardManifest = {
+  years: { [year: string]: ShardEntry }
+  categories: { [category: string]: ShardEntry }
+  count: number
+}
+
+const SHARD_MANIFEST_URL = '/data/questions/manifest.json'
+
+// scripts/build-image-pyramid.py が書き出す問題画像の派生画像（幅ごとの WebP・AVIF）
+type ImageVariant = {
+  url: string
+  bytes: number
+}
+
+type ImageDerivative = {
+  width: number
+  height: number
+  avif?: ImageVariant
+  webp?: ImageVariant
+}
+
+type ImageEntry = {
+  width: number
+  height: number
+  derivatives: { [width: string]: ImageDerivative }
+}
+
+type ImageManifest = {
+  images: { [questionId: string]: ImageEntry }
+}
+
+const IMAGE_MANIFEST_URL = '/images/questions/manifest.json'
+// 一覧のカードの画像の表示幅（container の最大幅に合わせる）
+const IMAGE_SIZES = '(max-width: 768px) 100vw, 768px'
+
+// 形式ごとの srcset（元画像が小さく同じファイルになった幅は1つにまとめる）
+const srcSet = (entry: ImageEntry, format: 'avif' | 'webp') =>
+  Array.from(new Set(
+    Object.values(entry.derivatives)
+      .filter(derivative => derivative[format])
+      .map(derivative => `${derivative[format]!.url} ${derivative.width}w`)
+  )).join(', ')
+
+// シャードを並行して取得（分野別シャードは同じ問題を含むので問題IDで重複を除く）
+const fetchShards = async (entries: ShardEntry[]): Promise<Question[]> => {
+  const shards: Question[][] = await Promise.all(
+    entries.map(entry => fetch(entry.file).then(response => response.json()))
+  )
+  const seen = new Set<string>()
+  return shards.flat().filter(q => {
+    if (seen.has(q.questionId)) return false
+    seen.add(q.questionId)
+    return true
+  })
+}
+
 export default function Home() {
   const [questions, setQuestions] = useState<Question[]>([])
   const [filteredQuestions, setFilteredQuestions] = useState<Question[]>([])
@@ -24,6 +86,44 @@ export default function Home() {
   const [searchText, setSearchText] = useState<string>('')
   const [loading, setLoading] = useState(true)
   const [showAnswers, setShowAnswers] = useState<{ [key: string]: boolean }>({})
+  const [manifest, setManifest] = useState<ShardManifest | null>(null)
+  const [imageManifest, setImageManifest] = useState<ImageManifest | null>(null)
+
+  // シャードのマニフェストを取得（なければ API から全件取得）
+  const fetchManifest = async () => {
+    try {
+      const response = await fetch(SHARD_MANIFEST_URL)
+      if (!response.ok) throw new Error(`manifest: ${response.status}`)
+      const data: ShardManifest = await response.json()
+      setManifest(data)
+      setCategories(Object.keys(data.categories).sort())
+    } catch (error) {
+      console.error('Error fetching shard manifest:', error)
+      fetchQuestions()
+    }
+  }
+
+  // 選択中の年度・分野に必要なシャードだけを取得
+  const fetchQuestionShards = useCallback(async () => {
+    if (!manifest) return
+
+    let entries: ShardEntry[]
+    if (selectedYear) {
+      entries = manifest.years[selectedYear] ? [manifest.years[selectedYear]] : []
+    } else if (selectedCategories.length > 0) {
+      entries = selectedCategories.map(cat => manifest.categories[cat]).filter(Boolean)
+    } else {
+      entries = Object.values(manifest.years)
+    }
+
+    setLoading(true)
+    try {
+      setQuestions(await fetchShards(entries))
+    } catch (error) {
+      console.error('Error fetching question shards:', error)
+    }
+    setLoading(false)
+  }, [manifest, selectedYear, selectedCategories])
 
   const fetchQuestions = async () => {
     try {
@@ -80,9 +180,18 @@ export default function Home() {
   }, [questions, selectedYear, selectedCategories, searchText])
 
   useEffect(() => {
-    fetchQuestions()
+    fetchManifest()
+    // 派生画像がなければ Drive の画像をそのまま表示する
+    fetch(IMAGE_MANIFEST_URL)
+      .then(response => (response.ok ? response.json() : null))
+      .then(setImageManifest)
+      .catch(error => console.error('Error fetching image manifest:', error))
   }, [])
 
+  useEffect(() => {
+    fetchQuestionShards()
+  }, [fetchQuestionShards])
+
   useEffect(() => {
     filterQuestions()
   }, [filterQuestions])
@@ -243,11 +352,30 @@ export default function Home() {
                   )}
 
                   {/* 問題画像 */}
-                  {question.imageUrl && (
+                  {imageManifest?.images[question.questionId] ? (
+                    <div className="mb-3">
+                      {/* 画面幅に合った大きさの派生画像だけを遅延読み込み（クリックで最大の画像を開く） */}
+                      <picture>
+                        <source type="image/avif" srcSet={srcSet(imageManifest.images[question.questionId], 'avif')} sizes={IMAGE_SIZES} />
+                        <source type="image/webp" srcSet={srcSet(imageManifest.images[question.questionId], 'webp')} sizes={IMAGE_SIZES} />
+                        <img
+                          src={imageManifest.images[question.questionId].derivatives['768'].webp?.url}
+                          width={imageManifest.images[question.questionId].derivatives['768'].width}
+                          height={imageManifest.images[question.questionId].derivatives['768'].height}
+                          loading="lazy"
+                          decoding="async"
+                          alt={`問題 ${question.questionId}`}
+                          className="max-w-full h-auto rounded-lg shadow-sm cursor-pointer hover:shadow-md transition-shadow"
+                          onClick={() => window.open(imageManifest.images[question.questionId].derivatives['1600'].webp?.url, '_blank')}
+                        />
+                      </picture>
+                    </div>
+                  ) : question.imageUrl && (
                     <div className="mb-3">
                       <img
                         src={convertImageUrl(question.imageUrl)}
                         alt={`問題 ${question.questionId}`}
+                        loading="lazy"
                         className="max-w-full rounded-lg shadow-sm cursor-pointer hover:shadow-md transition-shadow"
                         onClick={() => window.open(convertImageUrl(question.imageUrl), '_blank')}
                       />
@@ -3,87 +3,37 @@
 Google Drive APIを使って全ての問題画像ファイルを一括で公開設定に変更
 """
 
-import os
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-
-def get_credentials():
-    """認証情報を取得"""
-    service_account_file = '/Users/shun/geography-service-account-key.json'
-    SCOPES = [
-        'https://www.googleapis.com/auth/drive',
-        'https://www.googleapis.com/auth/drive.file'
-    ]
-    
-    creds = service_account.Credentials.from_service_account_file(
-        service_account_file, scopes=SCOPES)
-    return creds
-
-def make_file_public(drive_service, file_id, file_name):
-    """個別ファイルを公開設定に変更"""
-    try:
-        # 既存の権限を確認
-        permissions = drive_service.permissions().list(fileId=file_id).execute()
-        
-        # 既に公開されているかチェック
-        for permission in permissions.get('permissions', []):
-            if permission.get('type') == 'anyone':
-                print(f"✓ 既に公開済み: {file_name}")
-                return True
-        
-        # 公開権限を追加
-        permission = {
-            'type': 'anyone',
-            'role': 'reader'
-        }
-        
-        drive_service.permissions().create(
-            fileId=file_id,
-            body=permission
-        ).execute()
-        
-        print(f"✅ 公開設定完了: {file_name}")
-        return True
-        
-    except Exception as e:
-        print(f"❌ エラー: {file_name} - {str(e)}")
-        return False
+from google_clients import get_credentials, DRIVE_SCOPES
+from drive_crawler import is_image
+from drive_permissions import make_files_public, print_result
+from drive_snapshot import sync_snapshot, query_files
 
 def list_and_make_public_all_images():
     """全ての画像ファイルを検索して公開設定に変更"""
     try:
-        creds = get_credentials()
-        drive_service = build('drive', 'v3', credentials=creds)
+        creds = get_credentials(DRIVE_SCOPES)
         
         # 地理問題データベースの親フォルダID
         parent_folder_id = '1BDfVPQSQkTMABOM6Fr8qyTZIS1COhtWu'
         
         print("🔍 フォルダ構造を取得中...")
         
-        # 親フォルダ内のサブフォルダを取得
-        query = f"'{parent_folder_id}' in parents and mimeType='application/vnd.google-apps.folder'"
-        subfolders = drive_service.files().list(q=query).execute()
+        # ローカルスナップショットを差分更新し、API を呼ばずに画像ファイルを検索
+        snapshot = sync_snapshot(creds, parent_folder_id)
+        images = [
+            {'id': row['id'], 'name': row['path']}
+            for row in query_files(snapshot)
+            if is_image(row['mime_type'], row['name'])
+        ]
+        snapshot.close()
+        
+        print(f"\n🔍 {len(images)}個の画像ファイルを公開設定に変更します...")
         
-        total_processed = 0
-        total_success = 0
+        # 100件ずつのバッチリクエストを並列実行
+        results = make_files_public(creds, images, on_result=print_result)
         
-        for subfolder in subfolders.get('files', []):
-            subfolder_id = subfolder['id']
-            subfolder_name = subfolder['name']
-            
-            print(f"\n📁 処理中フォルダ: {subfolder_name}")
-            
-            # サブフォルダ内の画像ファイルを取得
-            image_query = f"'{subfolder_id}' in parents and (mimeType contains 'image/' or name contains '.jpg' or name contains '.png' or name contains '.jpeg')"
-            images = drive_service.files().list(q=image_query).execute()
-            
-            for image in images.get('files', []):
-                image_id = image['id']
-                image_name = image['name']
-                
-                if make_file_public(drive_service, image_id, image_name):
-                    total_success += 1
-                total_processed += 1
+        total_processed = len(results)
+        total_success = sum(1 for result in results if result['status'] != 'error')
         
         print(f"\n🎉 処理完了!")
         print(f"📊 処理したファイル数: {total_processed}")
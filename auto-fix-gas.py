@@ -5,25 +5,12 @@ Google Apps Script プロジェクトのconvertImageUrl関数を自動修正
 
 import re
 import requests
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-
-def get_credentials():
-    service_account_file = '/Users/shun/geography-service-account-key.json'
-    SCOPES = [
-        'https://www.googleapis.com/auth/script.projects',
-        'https://www.googleapis.com/auth/script.deployments'
-    ]
-    
-    creds = service_account.Credentials.from_service_account_file(
-        service_account_file, scopes=SCOPES)
-    return creds
+from google_clients import get_service, SCRIPT_SCOPES
 
 def fix_gas_code():
     """GASプロジェクトのコードを修正"""
     try:
-        creds = get_credentials()
-        service = build('script', 'v1', credentials=creds)
+        service = get_service('script', 'v1', scopes=SCRIPT_SCOPES)
         
         # プロジェクトIDを取得 (clasp listの結果から)
         project_id = '1uVSR--THzuhHDKePsK5kXlnL3U_6ONeVNrI3fDB4XMsS66VcyUtW6zHO'
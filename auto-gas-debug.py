@@ -5,26 +5,12 @@ Google Apps Script APIを使ってテスト関数を追加し、画像URL変換
 
 import os
 import time
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-
-def get_credentials():
-    """認証情報を取得"""
-    service_account_file = '/Users/shun/geography-service-account-key.json'
-    SCOPES = [
-        'https://www.googleapis.com/auth/script.projects',
-        'https://www.googleapis.com/auth/script.deployments'
-    ]
-    
-    creds = service_account.Credentials.from_service_account_file(
-        service_account_file, scopes=SCOPES)
-    return creds
+from google_clients import get_service, SCRIPT_SCOPES
 
 def add_test_function_and_run():
     """テスト関数を追加して実行"""
     try:
-        creds = get_credentials()
-        service = build('script', 'v1', credentials=creds)
+        service = get_service('script', 'v1', scopes=SCRIPT_SCOPES)
         
         project_id = '1uVSR--THzuhHDKePsK5kXlnL3U_6ONeVNrI3fDB4XMsS66VcyUtW6zHO'
         
@@ -4,60 +4,13 @@
 """
 
 import os
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
-
-def get_credentials():
-    """認証情報を取得"""
-    service_account_file = '/Users/shun/geography-service-account-key.json'
-    SCOPES = [
-        'https://www.googleapis.com/auth/drive',
-        'https://www.googleapis.com/auth/drive.file'
-    ]
-    
-    creds = service_account.Credentials.from_service_account_file(
-        service_account_file, scopes=SCOPES)
-    return creds
-
-def make_file_public(drive_service, file_id):
-    """個別ファイルを公開設定に変更"""
-    try:
-        # ファイル情報を取得
-        file_info = drive_service.files().get(fileId=file_id).execute()
-        file_name = file_info.get('name', file_id)
-        
-        # 既存の権限を確認
-        permissions = drive_service.permissions().list(fileId=file_id).execute()
-        
-        # 既に公開されているかチェック
-        for permission in permissions.get('permissions', []):
-            if permission.get('type') == 'anyone':
-                print(f"✓ 既に公開済み: {file_name}")
-                return True, file_name
-        
-        # 公開権限を追加
-        permission = {
-            'type': 'anyone',
-            'role': 'reader'
-        }
-        
-        drive_service.permissions().create(
-            fileId=file_id,
-            body=permission
-        ).execute()
-        
-        print(f"✅ 公開設定完了: {file_name}")
-        return True, file_name
-        
-    except Exception as e:
-        print(f"❌ エラー: {file_id} - {str(e)}")
-        return False, file_id
+from google_clients import get_credentials, DRIVE_SCOPES
+from drive_permissions import make_files_public, print_result
 
 def make_all_images_public():
     """ファイルIDリストから全ての画像を公開設定に変更"""
     try:
-        creds = get_credentials()
-        drive_service = build('drive', 'v3', credentials=creds)
+        creds = get_credentials(DRIVE_SCOPES)
         
         # ファイルIDリストを読み込み
         file_ids = []
@@ -69,29 +22,19 @@ def make_all_images_public():
         
         print(f"🔍 {len(file_ids)}個の画像ファイルを処理します...")
         
-        success_count = 0
-        error_count = 0
-        processed_files = []
-        
-        for i, file_id in enumerate(file_ids, 1):
-            print(f"\n[{i}/{len(file_ids)}] 処理中: {file_id}")
-            
-            success, file_name = make_file_public(drive_service, file_id)
-            
-            if success:
-                success_count += 1
-                processed_files.append({
-                    'id': file_id,
-                    'name': file_name,
-                    'status': 'success'
-                })
-            else:
-                error_count += 1
-                processed_files.append({
-                    'id': file_id,
-                    'name': file_name,
-                    'status': 'error'
-                })
+        # 100件ずつのバッチリクエストを並列実行
+        results = make_files_public(creds, file_ids, on_result=print_result)
+        
+        processed_files = [
+            {
+                'id': result['id'],
+                'name': result['name'],
+                'status': 'error' if result['status'] == 'error' else 'success'
+            }
+            for result in results
+        ]
+        success_count = sum(1 for f in processed_files if f['status'] == 'success')
+        error_count = len(processed_files) - success_count
         
         # 結果をレポート
         print(f"\n🎉 処理完了!")
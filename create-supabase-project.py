@@ -6,9 +6,13 @@ Supabaseプロジェクトを自動作成し、地理問題データベースを
 import requests
 import json
 import os
+import sys
 import time
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+from question_schema import MIGRATION_SQL
+
 def create_supabase_project():
     """
     Supabase CLIを使用してプロジェクトを作成
@@ -88,6 +92,20 @@ ON CONFLICT (question_id) DO NOTHING;
     
     return sql_content
 
+def create_search_schema_migration():
+    """
+    検索向けスキーマへの移行ファイルを作成
+    （分野タグの text[] + GIN、数値の正答率、pg_trgm、年度パーティション）
+    """
+    print("🔍 検索向けスキーマの移行ファイルを作成中...")
+    
+    with open('supabase/migrations/002_search_optimized_questions.sql', 'w') as f:
+        f.write(MIGRATION_SQL)
+    
+    print("✅ 検索向けスキーマの移行ファイルを作成しました")
+    
+    return MIGRATION_SQL
+
 def start_local_development():
     """
     ローカル開発環境を開始
@@ -152,6 +170,7 @@ def main():
         
         # Step 2: データベーススキーマ作成
         create_database_schema()
+        create_search_schema_migration()
         
         # Step 3: 設定ファイル生成
         generate_project_config()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Google Driveのフォルダツリーを幅優先・並列で走査するクローラー
+"""
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from google_clients import get_service as get_service_for_thread
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif']
+
+# 1つのクエリにまとめる親フォルダ数（q パラメータの長さ制限のため）
+PARENTS_PER_QUERY = 40
+# files().list の1ページあたりの最大件数
+PAGE_SIZE = 1000
+# 同時に実行する files().list の数の上限（実際の同時実行数は quota_governor が調整する）
+MAX_WORKERS = 8
+
+# 必要最小限のフィールドだけを取得
+LIST_FIELDS = 'nextPageToken,files(id,name,mimeType,parents,size,md5Checksum)'
+
+DriveEntry = namedtuple('DriveEntry', ['path', 'id', 'mimeType', 'size', 'md5'])
+
+
+def is_folder(mime_type):
+    """フォルダかどうか"""
+    return mime_type == FOLDER_MIME_TYPE
+
+
+def is_image(mime_type, name):
+    """画像ファイルかどうか（MIMEタイプまたは拡張子で判定）"""
+    return mime_type.startswith('image/') or any(ext in name.lower() for ext in IMAGE_EXTENSIONS)
+
+
+def _list_children(get_service, parent_ids, fields):
+    """複数の親フォルダの子をまとめて取得（全ページを辿る）"""
+    service = get_service()
+    parents_query = ' or '.join(f"'{parent_id}' in parents" for parent_id in parent_ids)
+    query = f"({parents_query}) and trashed = false"
+
+    children = []
+    page_token = None
+    while True:
+        response = service.files().list(
+            q=query,
+            fields=fields,
+            pageSize=PAGE_SIZE,
+            pageToken=page_token
+        ).execute()
+        children.extend(response.get('files', []))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return children
+
+
+def walk_drive_tree(creds, root_id, root_path='', fields=LIST_FIELDS,
+                    max_workers=MAX_WORKERS, parents_per_query=PARENTS_PER_QUERY):
+    """
+    root_id 以下の全ファイル・フォルダを階層ごとに走査し、(パス, ファイル情報) を順次返す
+
+    fields には 'parents' と 'nextPageToken' を含めること
+    深さの制限はなし
+    """
+    # httplib2 はスレッドセーフではないため、スレッドごとのサービスを使う
+    def get_service():
+        return get_service_for_thread('drive', 'v3', creds)
+
+    visited = {root_id}
+    level = {root_id: root_path}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while level:
+            parent_ids = list(level)
+            futures = [
+                executor.submit(_list_children, get_service,
+                                parent_ids[start:start + parents_per_query], fields)
+                for start in range(0, len(parent_ids), parents_per_query)
+            ]
+
+            next_level = {}
+            for future in as_completed(futures):
+                for item in future.result():
+                    for parent_id in item.get('parents', []):
+                        if parent_id not in level:
+                            continue
+                        path = f"{level[parent_id]}/{item['name']}"
+                        yield path, item
+
+                        if is_folder(item['mimeType']) and item['id'] not in visited:
+                            visited.add(item['id'])
+                            next_level[item['id']] = path
+
+            level = next_level
+
+
+def crawl_drive_tree(creds, root_id, root_path='', **kwargs):
+    """
+    root_id 以下の全ファイル・フォルダを (path, id, mimeType, size, md5) として順次返す
+    """
+    for path, item in walk_drive_tree(creds, root_id, root_path, **kwargs):
+        size = item.get('size')
+        yield DriveEntry(
+            path=path,
+            id=item['id'],
+            mimeType=item['mimeType'],
+            size=int(size) if size is not None else None,
+            md5=item.get('md5Checksum')
+        )
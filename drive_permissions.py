@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Drive の公開設定をバッチHTTPリクエストにまとめて並列実行するモジュール
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from google_clients import get_service as get_service_for_thread
+from quota_governor import get_governor, is_retryable
+
+# Drive のバッチリクエストは1回あたり100件まで
+BATCH_SIZE = 100
+# 同時に実行するバッチ数の上限（実際の同時実行数は quota_governor が調整する）
+MAX_WORKERS = 8
+
+ANYONE_READER = {
+    'type': 'anyone',
+    'role': 'reader'
+}
+
+
+def _chunks(items, size):
+    """リストを size 件ずつに分割"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _execute_batch(service, items, make_request):
+    """1回のバッチHTTPリクエストを実行し、ファイルIDごとの (レスポンス, 例外) を返す"""
+    responses = {}
+
+    def callback(request_id, response, exception):
+        responses[request_id] = (response, exception)
+
+    batch = service.new_batch_http_request(callback=callback)
+    for item in items:
+        batch.add(make_request(service, item), request_id=item['id'])
+
+    # バッチ内のリクエストもそれぞれクォータを消費する
+    get_governor('drive').call(batch.execute, cost=len(items))
+    return responses
+
+
+def _run_batch(get_service, items, make_request):
+    """
+    1つのバッチHTTPリクエストを実行し、ファイルIDごとの (レスポンス, 例外) を返す
+
+    レート制限などの再試行できるエラーになったファイルだけを、バックオフしてから再送する
+    """
+    service = get_service()
+    governor = get_governor('drive')
+    responses = {}
+    remaining = items
+
+    for attempt in range(governor.max_retries + 1):
+        try:
+            responses.update(_execute_batch(service, remaining, make_request))
+        except Exception as e:
+            # バッチ全体が失敗した場合は全ファイルをエラー扱いにする
+            for item in remaining:
+                responses.setdefault(item['id'], (None, e))
+            break
+
+        retry = [item for item in remaining
+                 if responses.get(item['id'], (None, None))[1] is not None
+                 and is_retryable(responses[item['id']][1])]
+        if not retry or attempt == governor.max_retries:
+            break
+        time.sleep(governor.throttled(attempt, responses[retry[0]['id']][1]))
+        remaining = retry
+
+    return items, responses
+
+
+def _run_batches(get_service, items, make_request, batch_size, max_workers):
+    """バッチを並列実行し、完了したものから順に返す"""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_run_batch, get_service, chunk, make_request)
+            for chunk in _chunks(items, batch_size)
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def make_files_public(creds, files, batch_size=BATCH_SIZE, max_workers=MAX_WORKERS,
+                      check_existing=True, on_result=None):
+    """
+    複数ファイルを一括で公開設定（リンクを知っている全員が閲覧可）に変更
+
+    files: ファイルIDの文字列、または {'id': ..., 'name': ...} 辞書のリスト
+    check_existing: True の場合、先に権限を確認して公開済みのファイルをスキップ
+    on_result: ファイルごとの結果を受け取るコールバック（進捗表示用）
+
+    戻り値: ファイルごとの結果 {'id', 'name', 'status', 'error'} のリスト
+      status は 'created'（公開設定完了）/ 'already_public'（公開済み）/ 'error'
+    """
+    batch_size = min(batch_size, BATCH_SIZE)
+
+    # バッチ内で request_id が重複しないようにファイルIDで重複排除
+    items = {}
+    for f in files:
+        item = {'id': f, 'name': f} if isinstance(f, str) else {'id': f['id'], 'name': f.get('name', f['id'])}
+        items.setdefault(item['id'], item)
+    items = list(items.values())
+
+    # httplib2 はスレッドセーフではないため、スレッドごとのサービスを使う
+    def get_service():
+        return get_service_for_thread('drive', 'v3', creds)
+
+    results = []
+
+    def record(item, status, error=None):
+        result = {
+            'id': item['id'],
+            'name': item['name'],
+            'status': status,
+            'error': error
+        }
+        results.append(result)
+        if on_result:
+            on_result(result)
+
+    # 1. 既存の権限をバッチで確認
+    pending = items
+    if check_existing:
+        pending = []
+        get_permissions = lambda service, item: service.files().get(
+            fileId=item['id'], fields='id,name,permissions(type)')
+
+        for chunk, responses in _run_batches(get_service, items, get_permissions,
+                                             batch_size, max_workers):
+            for item in chunk:
+                response, exception = responses.get(item['id'], (None, 'レスポンスなし'))
+                if exception is not None:
+                    record(item, 'error', str(exception))
+                    continue
+                item['name'] = response.get('name', item['name'])
+                if any(p.get('type') == 'anyone' for p in response.get('permissions', [])):
+                    record(item, 'already_public')
+                else:
+                    pending.append(item)
+
+    # 2. 公開権限の追加をバッチで実行
+    create_permission = lambda service, item: service.permissions().create(
+        fileId=item['id'], body=ANYONE_READER, fields='id')
+
+    for chunk, responses in _run_batches(get_service, pending, create_permission,
+                                         batch_size, max_workers):
+        for item in chunk:
+            response, exception = responses.get(item['id'], (None, 'レスポンスなし'))
+            if exception is not None:
+                record(item, 'error', str(exception))
+            else:
+                record(item, 'created')
+
+    return results
+
+
+def print_result(result):
+    """結果を1行で表示"""
+    if result['status'] == 'created':
+        print(f"✅ 公開設定完了: {result['name']}")
+    elif result['status'] == 'already_public':
+        print(f"✓ 既に公開済み: {result['name']}")
+    else:
+        print(f"❌ エラー: {result['name']} - {result['error']}")
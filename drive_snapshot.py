@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Google Driveのフォルダツリーをローカルの SQLite スナップショットとして保持
+初回は全体を走査し、以降は changes.list で差分だけを取り込む
+"""
+
+import sqlite3
+from datetime import datetime
+from google_clients import get_service
+from drive_crawler import walk_drive_tree, is_folder, FOLDER_MIME_TYPE
+
+DEFAULT_SNAPSHOT_PATH = '/Users/shun/geography-drive-snapshot.sqlite3'
+
+SNAPSHOT_FIELDS = 'nextPageToken,files(id,name,mimeType,parents,size,md5Checksum,modifiedTime)'
+CHANGES_FIELDS = ('nextPageToken,newStartPageToken,'
+                  'changes(fileId,removed,file(id,name,mimeType,parents,size,md5Checksum,modifiedTime,trashed))')
+PAGE_SIZE = 1000
+
+# パスの前方一致検索で使う上限文字
+_PREFIX_END = '\U0010ffff'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id TEXT PRIMARY KEY,
+    parent_id TEXT,
+    path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    mime_type TEXT NOT NULL,
+    size INTEGER,
+    md5 TEXT,
+    modified_ms INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_files_path ON files(path);
+CREATE INDEX IF NOT EXISTS idx_files_mime_type ON files(mime_type, path);
+CREATE INDEX IF NOT EXISTS idx_files_modified_ms ON files(modified_ms);
+CREATE INDEX IF NOT EXISTS idx_files_parent_id ON files(parent_id);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# フォルダID（? のパラメータ）の配下の全ファイルID
+# Drive では同じ親に同名のフォルダを作れるのでパスでは配下を特定できない。parent_id でたどる
+# （WITH で始まる文は sqlite3 の rowcount が数えないので、サブクエリとして使う）
+_DESCENDANT_IDS = """(
+    WITH RECURSIVE descendants(id) AS (
+        SELECT id FROM files WHERE parent_id = ?
+        UNION
+        SELECT files.id FROM files JOIN descendants ON files.parent_id = descendants.id
+    )
+    SELECT id FROM descendants
+)"""
+
+
+def open_snapshot(db_path=DEFAULT_SNAPSHOT_PATH):
+    """スナップショットDBを開く（なければ作成）"""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def lookup_md5(conn, file_id):
+    """ファイルの md5Checksum を返す（スナップショットがない・見つからない場合は None）"""
+    if conn is None or not file_id:
+        return None
+    row = conn.execute('SELECT md5 FROM files WHERE id = ?', (file_id,)).fetchone()
+    return row['md5'] if row else None
+
+
+def _get_state(conn, key):
+    row = conn.execute('SELECT value FROM sync_state WHERE key = ?', (key,)).fetchone()
+    return row['value'] if row else None
+
+
+def _set_state(conn, key, value):
+    conn.execute('INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)', (key, value))
+
+
+def _to_ms(modified_time):
+    """RFC3339 形式の日時をミリ秒に変換"""
+    if not modified_time:
+        return None
+    return int(datetime.fromisoformat(modified_time.replace('Z', '+00:00')).timestamp() * 1000)
+
+
+def _file_row(item, parent_id, path):
+    size = item.get('size')
+    return (
+        item['id'],
+        parent_id,
+        path,
+        item['name'],
+        item['mimeType'],
+        int(size) if size is not None else None,
+        item.get('md5Checksum'),
+        _to_ms(item.get('modifiedTime'))
+    )
+
+
+def _insert_file(conn, row):
+    conn.execute(
+        'INSERT OR REPLACE INTO files (id, parent_id, path, name, mime_type, size, md5, modified_ms) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        row
+    )
+
+
+def _delete_subtree(conn, file_id):
+    """ファイル（フォルダの場合は配下も含めて）を削除"""
+    row = conn.execute('SELECT id FROM files WHERE id = ?', (file_id,)).fetchone()
+    if row is None:
+        return 0
+    deleted = conn.execute('DELETE FROM files WHERE id IN ' + _DESCENDANT_IDS,
+                           (file_id,)).rowcount
+    return deleted + conn.execute('DELETE FROM files WHERE id = ?', (file_id,)).rowcount
+
+
+def _upsert_file(conn, item, parent_id, parent_path):
+    """
+    ファイルを追加・更新し、フォルダの移動や名前変更の場合は配下のパスも書き換える
+
+    戻り値: スナップショットになかったフォルダ（配下を走査する必要がある）なら True
+    """
+    path = f"{parent_path}/{item['name']}"
+    old = conn.execute('SELECT path FROM files WHERE id = ?', (item['id'],)).fetchone()
+    _insert_file(conn, _file_row(item, parent_id, path))
+
+    if old is None:
+        return is_folder(item['mimeType'])
+    if old['path'] != path and is_folder(item['mimeType']):
+        conn.execute(
+            'UPDATE files SET path = ? || substr(path, ?) WHERE id IN ' + _DESCENDANT_IDS,
+            (path, len(old['path']) + 1, item['id'])
+        )
+    return False
+
+
+def _insert_subtree(conn, creds, folder_id, folder_path):
+    """フォルダの配下を全て走査してスナップショットに追加し、件数を返す"""
+    count = 0
+    for path, item in walk_drive_tree(creds, folder_id, folder_path, fields=SNAPSHOT_FIELDS):
+        parent_id = item.get('parents', [None])[0]
+        _insert_file(conn, _file_row(item, parent_id, path))
+        count += 1
+    return count
+
+
+def _full_sync(conn, creds, drive_service, root_id, root_path):
+    """ツリー全体を走査してスナップショットを作り直す"""
+    # 走査中の変更を取りこぼさないよう、先にトークンを取得しておく
+    start_page_token = drive_service.changes().getStartPageToken().execute()['startPageToken']
+
+    with conn:
+        conn.execute('DELETE FROM files')
+        conn.execute(
+            'INSERT INTO files (id, parent_id, path, name, mime_type) VALUES (?, NULL, ?, ?, ?)',
+            (root_id, root_path, root_path, FOLDER_MIME_TYPE)
+        )
+        count = _insert_subtree(conn, creds, root_id, root_path)
+
+        _set_state(conn, 'root_id', root_id)
+        _set_state(conn, 'root_path', root_path)
+        _set_state(conn, 'start_page_token', start_page_token)
+
+    return count
+
+
+def _apply_changes(conn, creds, changes):
+    """
+    changes.list の1ページ分をスナップショットに反映
+
+    ツリーの外から移動してきたフォルダは、配下のファイルの変更が届かないので配下も走査する
+    """
+    applied = 0
+    pending = []
+
+    for change in changes:
+        item = change.get('file')
+        if change.get('removed') or item is None or item.get('trashed'):
+            applied += _delete_subtree(conn, change['fileId'])
+        else:
+            pending.append(item)
+
+    # 親フォルダが同じページ内で後から追加される場合があるため、進まなくなるまで繰り返す
+    while pending:
+        unresolved = []
+        for item in pending:
+            parent = None
+            for parent_id in item.get('parents', []):
+                parent = conn.execute('SELECT id, path FROM files WHERE id = ?', (parent_id,)).fetchone()
+                if parent is not None:
+                    break
+
+            if parent is None:
+                unresolved.append(item)
+            else:
+                if _upsert_file(conn, item, parent['id'], parent['path']):
+                    applied += _insert_subtree(conn, creds, item['id'], f"{parent['path']}/{item['name']}")
+                applied += 1
+
+        if len(unresolved) == len(pending):
+            # 親がスナップショット外 = ツリー外のファイル（ツリー外へ移動したものは削除）
+            for item in unresolved:
+                applied += _delete_subtree(conn, item['id'])
+            break
+        pending = unresolved
+
+    return applied
+
+
+def _incremental_sync(conn, creds, drive_service, page_token):
+    """保存済みのトークン以降の変更だけを取り込む"""
+    applied = 0
+    while True:
+        response = drive_service.changes().list(
+            pageToken=page_token,
+            fields=CHANGES_FIELDS,
+            pageSize=PAGE_SIZE,
+            includeRemoved=True,
+            spaces='drive'
+        ).execute()
+
+        with conn:
+            applied += _apply_changes(conn, creds, response.get('changes', []))
+            if 'newStartPageToken' in response:
+                _set_state(conn, 'start_page_token', response['newStartPageToken'])
+                return applied
+            page_token = response['nextPageToken']
+            _set_state(conn, 'start_page_token', page_token)
+
+
+def sync_snapshot(creds, root_id, db_path=DEFAULT_SNAPSHOT_PATH, root_path='', full=False):
+    """
+    スナップショットを最新化して DB 接続を返す
+
+    保存済みのトークンがあれば changes.list で差分のみ取得し、
+    なければ（または full=True の場合）ツリー全体を走査する
+    """
+    conn = open_snapshot(db_path)
+    drive_service = get_service('drive', 'v3', creds)
+
+    page_token = _get_state(conn, 'start_page_token')
+    same_root = _get_state(conn, 'root_id') == root_id and _get_state(conn, 'root_path') == root_path
+    if full or page_token is None or not same_root:
+        count = _full_sync(conn, creds, drive_service, root_id, root_path)
+        print(f"🗂️  スナップショットを作成しました: {count}件")
+    else:
+        applied = _incremental_sync(conn, creds, drive_service, page_token)
+        print(f"🔄 スナップショットを更新しました: {applied}件の変更")
+
+    return conn
+
+
+def query_files(conn, path_prefix=None, mime_type=None, mime_prefix=None,
+                modified_after_ms=None, include_folders=False):
+    """
+    API を呼ばずにスナップショットからファイルを検索
+
+    path_prefix: このパスのフォルダとその配下（例: '/2024'。'/20245' は含まない）
+    mime_type: MIMEタイプの完全一致（例: 'image/png'）
+    mime_prefix: MIMEタイプの前方一致（例: 'image/'）
+    modified_after_ms: この時刻（エポックミリ秒）より後に更新されたもの
+    """
+    conditions = []
+    params = []
+
+    if path_prefix is not None:
+        folder = path_prefix.rstrip('/')
+        conditions.append('(path = ? OR (path >= ? AND path < ?))')
+        params += [folder, folder + '/', folder + '/' + _PREFIX_END]
+    if mime_type is not None:
+        conditions.append('mime_type = ?')
+        params.append(mime_type)
+    if mime_prefix is not None:
+        conditions.append('mime_type >= ? AND mime_type < ?')
+        params += [mime_prefix, mime_prefix + _PREFIX_END]
+    if modified_after_ms is not None:
+        conditions.append('modified_ms > ?')
+        params.append(modified_after_ms)
+    if not include_folders:
+        conditions.append('mime_type != ?')
+        params.append(FOLDER_MIME_TYPE)
+
+    where = ' AND '.join(conditions) if conditions else '1'
+    rows = conn.execute(f'SELECT * FROM files WHERE {where} ORDER BY path', params)
+    return [dict(row) for row in rows]
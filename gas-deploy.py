@@ -6,10 +6,7 @@ Google Apps Script API を使用して地理問題データベースWebアプリ
 import json
 import os
 import requests
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from google_clients import get_service
 
 # 必要なスコープ
 SCOPES = [
@@ -18,22 +15,10 @@ SCOPES = [
     'https://www.googleapis.com/auth/drive.file'
 ]
 
-def get_credentials():
-    """認証情報を取得"""
-    # サービスアカウントキーを使用して認証
-    from google.oauth2 import service_account
-    
-    service_account_file = '/Users/shun/geography-service-account-key.json'
-    creds = service_account.Credentials.from_service_account_file(
-        service_account_file, scopes=SCOPES)
-    
-    return creds
-
 def create_gas_project():
     """Google Apps Scriptプロジェクトを作成"""
     try:
-        creds = get_credentials()
-        service = build('script', 'v1', credentials=creds)
+        service = get_service('script', 'v1', scopes=SCOPES)
         
         # プロジェクト作成
         project_body = {
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Google API クライアントの共通モジュール
+
+- 認証情報はスコープごとに1つを全スレッドで共有し、アクセストークンは
+  有効期限までディスクにキャッシュして次回の起動でも再利用する
+- ディスカバリー文書はプロセス内で1回だけ読み込み、ライブラリ同梱の文書が
+  なければローカルにキャッシュしたものを使う
+- httplib2 はスレッドセーフではないため、サービスはスレッドごとに生成し、
+  それぞれが keep-alive の認証済み HTTP セッションを持つ
+
+環境変数 GOOGLE_API_ENDPOINT を設定すると、全 API をそのサーバー（ベンチマーク用の
+scripts/fake_google_server.py など）に向け、認証なしで呼び出す
+環境変数 GOOGLE_API_METRICS を設定すると、API 呼び出しをメソッド別に計測する（api_metrics.py）
+
+リクエストの実行は API ごとに共有する quota_governor を通り、クォータに合わせて
+同時実行数を調整し、レート制限・一時的なエラーはバックオフして再試行する
+"""
+
+import atexit
+import datetime
+import functools
+import hashlib
+import json
+import os
+import threading
+import httplib2
+import requests
+import google_auth_httplib2
+from google.auth.credentials import AnonymousCredentials
+from google.auth.transport.requests import Request
+from google.oauth2 import service_account
+from googleapiclient.discovery import build_from_document
+import api_metrics
+from quota_governor import GovernedHttpRequest
+
+SERVICE_ACCOUNT_FILE = '/Users/shun/geography-service-account-key.json'
+CACHE_DIR = '/Users/shun/.cache/geography-google-clients'
+
+DRIVE_SCOPES = [
+    'https://www.googleapis.com/auth/drive',
+    'https://www.googleapis.com/auth/drive.file'
+]
+SCRIPT_SCOPES = [
+    'https://www.googleapis.com/auth/script.projects',
+    'https://www.googleapis.com/auth/script.deployments'
+]
+SHEETS_SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+SHEETS_READONLY_SCOPES = ['https://www.googleapis.com/auth/spreadsheets.readonly']
+
+# API の接続先を差し替える環境変数（例: http://127.0.0.1:8765/）
+ENDPOINT_ENV = 'GOOGLE_API_ENDPOINT'
+
+DISCOVERY_URL = 'https://www.googleapis.com/discovery/v1/apis/{api}/{version}/rest'
+
+# HTTP のタイムアウト（秒）
+HTTP_TIMEOUT = 60
+# 有効期限までの残りがこれより短いトークンは使わずに更新する
+TOKEN_EXPIRY_MARGIN = datetime.timedelta(minutes=5)
+
+_anonymous_credentials = AnonymousCredentials()
+_credentials = {}
+_credentials_lock = threading.Lock()
+_local = threading.local()
+
+
+def _cache_path(kind, key):
+    os.makedirs(os.path.join(CACHE_DIR, kind), exist_ok=True)
+    return os.path.join(CACHE_DIR, kind, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+
+def _load_cached_token(creds, path):
+    """キャッシュ済みのトークンが有効期限内なら認証情報にセットする"""
+    try:
+        with open(path, 'r') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return
+
+    expiry = datetime.datetime.fromisoformat(cached['expiry'])
+    if expiry - TOKEN_EXPIRY_MARGIN > datetime.datetime.utcnow():
+        creds.token = cached['token']
+        creds.expiry = expiry
+
+
+def _save_token(creds, path):
+    """トークンを有効期限つきで保存（鍵ファイルと同じく本人のみ読める権限）"""
+    if not creds.token or not creds.expiry:
+        return
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        json.dump({'token': creds.token, 'expiry': creds.expiry.isoformat()}, f)
+
+
+def get_credentials(scopes=DRIVE_SCOPES, service_account_file=SERVICE_ACCOUNT_FILE):
+    """
+    サービスアカウントの認証情報を取得（スコープごとに1つを共有）
+
+    有効なトークンがキャッシュにあればそのまま使い、なければ1回だけ更新する
+    """
+    if os.environ.get(ENDPOINT_ENV):
+        return _anonymous_credentials
+
+    key = (service_account_file, tuple(sorted(scopes)))
+    with _credentials_lock:
+        creds = _credentials.get(key)
+        if creds is not None:
+            return creds
+
+        creds = service_account.Credentials.from_service_account_file(
+            service_account_file, scopes=list(scopes))
+        token_path = _cache_path('tokens', '\n'.join([service_account_file] + list(key[1])))
+        _load_cached_token(creds, token_path)
+
+        # 複数スレッドが同時に更新しないように、ロック内で先に更新しておく
+        if not creds.valid:
+            creds.refresh(Request())
+            _save_token(creds, token_path)
+
+        # 実行中に更新されたトークンは終了時に保存する
+        atexit.register(_save_token, creds, token_path)
+        _credentials[key] = creds
+        return creds
+
+
+def _static_discovery_document(api, version):
+    """ライブラリ同梱のディスカバリー文書（古いバージョンでは None）"""
+    try:
+        from googleapiclient.discovery_cache import get_static_doc
+    except ImportError:
+        return None
+    return get_static_doc(api, version)
+
+
+@functools.lru_cache(maxsize=None)
+def discovery_document(api, version):
+    """
+    ディスカバリー文書を解析済みの辞書で返す（プロセス内で1回だけ読み込む）
+
+    同梱の文書 → ローカルキャッシュ → ネットワークの順に探す
+    """
+    content = _static_discovery_document(api, version)
+    if content is None:
+        path = _cache_path('discovery', f'{api}.{version}')
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        else:
+            response = requests.get(DISCOVERY_URL.format(api=api, version=version), timeout=30)
+            response.raise_for_status()
+            content = response.text
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+    return json.loads(content)
+
+
+def authorized_http(creds, timeout=HTTP_TIMEOUT):
+    """keep-alive の認証済み HTTP セッション（1スレッドで使う）"""
+    return google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http(timeout=timeout))
+
+
+def get_service(api, version, creds=None, scopes=DRIVE_SCOPES):
+    """
+    API のサービスを取得（スレッドごとに1つを再利用する）
+
+    creds を省略した場合は scopes の共有認証情報を使う
+    """
+    if creds is None:
+        creds = get_credentials(scopes)
+
+    services = getattr(_local, 'services', None)
+    if services is None:
+        services = _local.services = {}
+
+    endpoint = os.environ.get(ENDPOINT_ENV)
+    key = (api, version, creds, endpoint)
+    service = services.get(key)
+    if service is None:
+        document = discovery_document(api, version)
+        if endpoint:
+            # rootUrl を差し替えると通常のリクエストもバッチリクエストもそのサーバーに向く
+            document = dict(document, rootUrl=endpoint.rstrip('/') + '/')
+        http = authorized_http(creds)
+        if api_metrics.enabled():
+            http = api_metrics.instrument(http, api, document)
+        service = build_from_document(document, http=http, requestBuilder=GovernedHttpRequest)
+        services[key] = service
+    return service
@@ -1,4 +1,4 @@
-import { google } from 'googleapis'
+import { google, sheets_v4 } from 'googleapis'
 
 export const getGoogleSheetsClient = () => {
   const credentials = JSON.parse(process.env.GOOGLE_SERVICE_ACCOUNT_KEY!)
@@ -12,7 +12,44 @@ export const getGoogleSheetsClient = () => {
 }
 
 export const SPREADSHEET_ID = '17cxHniOQP2C7QKCV8nqnn3IKEcd1HwWiDgExGb6FfEE'
-export const SHEET_NAME = '2024年共通テスト地理B'
+
+// 問題データの列（A列: 問題ID 〜 K列: 問題文全文）
+export const QUESTION_RANGE = 'A:K'
+
+// タブ名から年度を取得（例: '2024年共通テスト地理B' → '2024'）
+export const yearFromTitle = (title: string): string | null => {
+  const match = title.match(/(20\d{2})/)
+  return match ? match[1] : null
+}
+
+// 年度を含むタブ名の一覧を1回の spreadsheets.get で取得
+export const listYearTabs = async (sheets: sheets_v4.Sheets): Promise<string[]> => {
+  const response = await sheets.spreadsheets.get({
+    spreadsheetId: SPREADSHEET_ID,
+    fields: 'sheets.properties.title'
+  })
+  const titles = (response.data.sheets || []).map(sheet => sheet.properties?.title || '')
+  return titles.filter(title => yearFromTitle(title))
+}
+
+// 複数タブの値を1回の values.batchGet で取得
+export const fetchTabValues = async (
+  sheets: sheets_v4.Sheets,
+  titles: string[]
+): Promise<{ title: string; rows: string[][] }[]> => {
+  if (titles.length === 0) return []
+
+  const response = await sheets.spreadsheets.values.batchGet({
+    spreadsheetId: SPREADSHEET_ID,
+    ranges: titles.map(title => `'${title}'!${QUESTION_RANGE}`),
+    fields: 'valueRanges(values)'
+  })
+  const valueRanges = response.data.valueRanges || []
+  return titles.map((title, index) => ({
+    title,
+    rows: (valueRanges[index]?.values || []) as string[][]
+  }))
+}
 
 export type Question = {
   id: string
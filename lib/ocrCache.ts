@@ -0,0 +1,188 @@
+import { createHash } from 'node:crypto'
+import fs from 'node:fs'
+import { createRequire } from 'node:module'
+import os from 'node:os'
+import path from 'node:path'
+
+// scripts/ocr_cache.py と同じスキーマの OCR 結果キャッシュ
+// キーは (元画像の md5, 正規化設定, プロンプト・モデルのバージョン)、サイズ上限を超えたら LRU で削除
+// better-sqlite3 は任意の依存（`npm install better-sqlite3` で有効になる）。入っていないか、
+// キャッシュのファイルを開けない場合はキャッシュなしで動く
+// Vercel ではプロジェクトのディレクトリが書き込めないので /tmp に置く（インスタンスごとのキャッシュになる）
+const CACHE_PATH = process.env.OCR_CACHE_PATH ||
+  path.join(process.env.VERCEL ? os.tmpdir() : path.join(process.cwd(), '.cache'), 'ocr-cache.sqlite3')
+const MAX_BYTES = Number(process.env.OCR_CACHE_MAX_BYTES) || 256 * 1024 * 1024
+// 上限を超えたときに、この割合まで減らす
+const EVICT_TO_RATIO = 0.9
+
+// 正規化せずに OCR した画像の設定キー
+export const ORIGINAL_SETTINGS = 'original'
+
+const SCHEMA = `
+CREATE TABLE IF NOT EXISTS ocr_results (
+    image_md5 TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    result TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (image_md5, settings, prompt_version)
+);
+CREATE INDEX IF NOT EXISTS idx_ocr_results_last_used ON ocr_results(last_used_at);
+CREATE TABLE IF NOT EXISTS ocr_stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+`
+
+// このファイルで使う better-sqlite3 の API
+type Statement = {
+  get(...params: unknown[]): unknown
+  all(...params: unknown[]): unknown[]
+  run(...params: unknown[]): unknown
+  iterate(...params: unknown[]): IterableIterator<unknown>
+}
+type Database = {
+  prepare(sql: string): Statement
+  exec(sql: string): void
+  pragma(sql: string): unknown
+  transaction(fn: () => void): () => void
+}
+
+// バンドラーに解決させず、実行時にプロジェクトの node_modules から読み込む
+function loadSqlite() {
+  const load = createRequire(path.join(process.cwd(), 'package.json'))
+  return load('better-sqlite3') as new (filename: string) => Database
+}
+
+let db: Database | null = null
+// キャッシュのファイルを開けなかった場合はキャッシュなしで動かす
+let disabled = false
+let totalBytes = 0
+// このプロセスでの統計
+const counters = { hits: 0, misses: 0, evictions: 0 }
+
+function openCache() {
+  if (!db && !disabled) {
+    try {
+      const Sqlite = loadSqlite()
+      fs.mkdirSync(path.dirname(CACHE_PATH), { recursive: true })
+      db = new Sqlite(CACHE_PATH)
+      db.pragma('journal_mode = WAL')
+      db.exec(SCHEMA)
+      totalBytes = (db.prepare('SELECT COALESCE(SUM(bytes), 0) AS total FROM ocr_results').get() as { total: number }).total
+    } catch (error) {
+      console.warn(`OCR cache disabled (${CACHE_PATH}):`, error)
+      db = null
+      disabled = true
+    }
+  }
+  return db
+}
+
+function addStat(name: string, value = 1) {
+  openCache()
+    ?.prepare('INSERT INTO ocr_stats (name, value) VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value')
+    .run(name, value)
+}
+
+// モデル名とプロンプトからキャッシュのバージョンを作る（scripts/ocr_cache.py の prompt_version と同じ）
+export function promptVersion(model: string, prompt: string) {
+  return `${model}:${createHash('sha256').update(prompt, 'utf8').digest('hex').slice(0, 16)}`
+}
+
+export function imageMd5(image: Buffer) {
+  return createHash('md5').update(image).digest('hex')
+}
+
+// キャッシュ済みの OCR 結果を返す（なければ null）
+export function getCachedOcr(md5: string, settings: string, version: string): string | null {
+  const cache = openCache()
+  if (!cache) return null
+  const row = cache
+    .prepare('SELECT result FROM ocr_results WHERE image_md5 = ? AND settings = ? AND prompt_version = ?')
+    .get(md5, settings, version) as { result: string } | undefined
+
+  if (!row) {
+    counters.misses++
+    addStat('misses')
+    return null
+  }
+  cache
+    .prepare('UPDATE ocr_results SET last_used_at = ?, hits = hits + 1 WHERE image_md5 = ? AND settings = ? AND prompt_version = ?')
+    .run(Date.now() / 1000, md5, settings, version)
+  counters.hits++
+  addStat('hits')
+  return row.result
+}
+
+// 合計サイズが targetBytes 以下になるまで、最後に使われた時刻の古いものから削除
+function evict(cache: Database, targetBytes: number) {
+  const rows = cache
+    .prepare('SELECT image_md5, settings, prompt_version, bytes FROM ocr_results ORDER BY last_used_at')
+    .iterate() as IterableIterator<{ image_md5: string; settings: string; prompt_version: string; bytes: number }>
+  const evicted = []
+  for (const row of rows) {
+    if (totalBytes <= targetBytes) break
+    evicted.push(row)
+    totalBytes -= row.bytes
+  }
+  const remove = cache.prepare('DELETE FROM ocr_results WHERE image_md5 = ? AND settings = ? AND prompt_version = ?')
+  for (const row of evicted) {
+    remove.run(row.image_md5, row.settings, row.prompt_version)
+  }
+  counters.evictions += evicted.length
+  addStat('evictions', evicted.length)
+}
+
+// OCR 結果を保存し、上限を超えたら古いものから削除する
+export function putCachedOcr(md5: string, settings: string, version: string, result: string) {
+  const cache = openCache()
+  if (!cache) return
+  const size = Buffer.byteLength(result, 'utf8')
+  const now = Date.now() / 1000
+
+  cache.transaction(() => {
+    const previous = cache
+      .prepare('SELECT bytes FROM ocr_results WHERE image_md5 = ? AND settings = ? AND prompt_version = ?')
+      .get(md5, settings, version) as { bytes: number } | undefined
+    cache
+      .prepare(`INSERT OR REPLACE INTO ocr_results
+        (image_md5, settings, prompt_version, result, bytes, created_at, last_used_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)`)
+      .run(md5, settings, version, result, size, now, now)
+    totalBytes += size - (previous?.bytes ?? 0)
+    if (totalBytes > MAX_BYTES) {
+      evict(cache, Math.floor(MAX_BYTES * EVICT_TO_RATIO))
+    }
+  })()
+}
+
+// このプロセスと累計のヒット率・件数・サイズ
+export function ocrCacheStats() {
+  const cache = openCache()
+  if (!cache) return { enabled: false, path: CACHE_PATH }
+  const entries = (cache.prepare('SELECT COUNT(*) AS count FROM ocr_results').get() as { count: number }).count
+  const lifetime = Object.fromEntries(
+    (cache.prepare('SELECT name, value FROM ocr_stats').all() as { name: string; value: number }[])
+      .map(row => [row.name, row.value])
+  )
+  const lookups = counters.hits + counters.misses
+  const lifetimeHits = lifetime.hits ?? 0
+  const lifetimeLookups = lifetimeHits + (lifetime.misses ?? 0)
+
+  return {
+    enabled: true,
+    entries,
+    bytes: totalBytes,
+    maxBytes: MAX_BYTES,
+    ...counters,
+    hitRate: lookups ? counters.hits / lookups : 0,
+    lifetimeHits,
+    lifetimeMisses: lifetime.misses ?? 0,
+    lifetimeHitRate: lifetimeLookups ? lifetimeHits / lifetimeLookups : 0,
+    lifetimeEvictions: lifetime.evictions ?? 0
+  }
+}
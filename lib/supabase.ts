@@ -10,9 +10,12 @@ export type Question = {
   id: number
   question_id: string
   category: string
+  categories: string[]
   answer: string
-  correct_rate: string
+  correct_rate: number | null
   image_url: string
+  question_text: string | null
+  keywords: string | null
   year: number
   created_date: string
   notes: string
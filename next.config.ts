@@ -1,7 +1,37 @@
 import type { NextConfig } from "next";
 
 const nextConfig: NextConfig = {
-  /* config options here */
+  async headers() {
+    return [
+      {
+        // ファイル名に内容のハッシュを含む問題シャードは永続的にキャッシュ
+        source: '/data/questions/:shard(year-.*|category-.*)',
+        headers: [
+          { key: 'Cache-Control', value: 'public, max-age=31536000, immutable' },
+        ],
+      },
+      {
+        // 元画像のハッシュをファイル名に含む派生画像も永続的にキャッシュ
+        source: '/images/questions/:image([0-9a-f]+-\\d+\\.(?:webp|avif))',
+        headers: [
+          { key: 'Cache-Control', value: 'public, max-age=31536000, immutable' },
+        ],
+      },
+      {
+        // マニフェストは毎回再検証（ビルドごとに変わる）
+        source: '/data/questions/manifest.json',
+        headers: [
+          { key: 'Cache-Control', value: 'public, max-age=0, must-revalidate' },
+        ],
+      },
+      {
+        source: '/images/questions/manifest.json',
+        headers: [
+          { key: 'Cache-Control', value: 'public, max-age=0, must-revalidate' },
+        ],
+      },
+    ];
+  },
 };
 
 export default nextConfig;
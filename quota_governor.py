@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Google API のクォータに合わせて呼び出しを調整する共通モジュール
+
+- 再試行できるエラー（429・403 rateLimitExceeded・5xx・通信エラー）を判定し、
+  ジッター付きの指数バックオフ（Retry-After があればそれに従う）で再試行する
+- API ごとに1つの governor を全スレッドで共有し、毎分のクォータをトークンバケットで管理する
+- 同時実行数は AIMD で調整する（成功するたびに少しずつ増やし、スロットリングされたら半減）
+
+google_clients.get_service が作るサービスのリクエストは GovernedHttpRequest を通るので、
+各スクリプトの .execute() は自動的にこの制御下で実行される。
+バッチリクエストの中の個別のエラーは drive_permissions が governor を使って再試行する。
+"""
+
+import random
+import threading
+import time
+from collections import Counter, namedtuple
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+from api_metrics import error_reasons
+
+QuotaLimit = namedtuple('QuotaLimit', ['per_minute', 'initial_concurrency', 'max_concurrency'])
+
+# API ごとのユーザー単位のクォータと同時実行数（Drive: 12,000回/分、Sheets・Apps Script: 60回/分）
+DEFAULT_LIMITS = {
+    'drive': QuotaLimit(per_minute=12000, initial_concurrency=4, max_concurrency=8),
+    'sheets': QuotaLimit(per_minute=60, initial_concurrency=2, max_concurrency=4),
+    'script': QuotaLimit(per_minute=60, initial_concurrency=1, max_concurrency=2),
+}
+FALLBACK_LIMIT = QuotaLimit(per_minute=600, initial_concurrency=2, max_concurrency=4)
+
+MAX_RETRIES = 8
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 64.0
+# 同じ混雑で何度も半減しないよう、前回の減少からこの時間は同時実行数を据え置く
+DECREASE_INTERVAL_SECONDS = 2.0
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded', 'quotaExceeded', 'RATE_LIMIT_EXCEEDED'}
+
+
+def is_rate_limited(error):
+    """クォータ超過（429、または 403 のレート制限）かどうか"""
+    if not isinstance(error, HttpError):
+        return False
+    status = error.resp.status
+    return status == 429 or (status == 403 and bool(error_reasons(error.content) & RATE_LIMIT_REASONS))
+
+
+def is_retryable(error):
+    """待って再試行すれば成功する見込みのあるエラーかどうか"""
+    if isinstance(error, HttpError):
+        return error.resp.status in RETRYABLE_STATUS or is_rate_limited(error)
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+
+def backoff_delay(attempt, error=None):
+    """attempt 回目（0始まり）の再試行までの待ち時間（Full Jitter、Retry-After を優先）"""
+    if isinstance(error, HttpError):
+        retry_after = error.resp.get('retry-after')
+        if retry_after and retry_after.isdigit():
+            return float(retry_after) + random.uniform(0, BACKOFF_BASE_SECONDS)
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+class QuotaGovernor:
+    """1つの API の呼び出しを全スレッドで共有して調整する"""
+
+    def __init__(self, name, limit, max_retries=MAX_RETRIES):
+        self.name = name
+        self.capacity = float(limit.per_minute)
+        self.rate = limit.per_minute / 60
+        self.tokens = self.capacity
+        self.refilled = time.monotonic()
+        self.concurrency = float(limit.initial_concurrency)
+        self.max_concurrency = limit.max_concurrency
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.max_retries = max_retries
+        self.stats = Counter()
+        self.cond = threading.Condition()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.refilled) * self.rate)
+        self.refilled = now
+
+    def acquire(self, cost=1):
+        """同時実行数とクォータに空きができるまで待つ（バッチは中のリクエスト数を cost にする）"""
+        needed = min(cost, self.capacity)
+        with self.cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif self.in_flight >= int(self.concurrency):
+                    wait = None
+                elif self.tokens < needed:
+                    wait = (needed - self.tokens) / self.rate
+                else:
+                    self.tokens -= cost
+                    self.in_flight += 1
+                    return
+                self.cond.wait(wait)
+
+    def release(self, succeeded):
+        """呼び出しの終了を記録（成功なら同時実行数を少し増やす）"""
+        with self.cond:
+            self.in_flight -= 1
+            if succeeded:
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+            self.cond.notify_all()
+
+    def throttled(self, attempt, error):
+        """
+        再試行できるエラーを受けたときに再試行までの待ち時間（秒）を返す
+
+        クォータ超過のときだけ同時実行数を半減する（5xx や接続エラーは混雑とは限らないので、
+        その呼び出しだけがバックオフする）
+        """
+        delay = backoff_delay(attempt, error)
+        with self.cond:
+            now = time.monotonic()
+            self.stats['retries'] += 1
+            if not is_rate_limited(error):
+                return delay
+            self.stats['rate_limited'] += 1
+            # クォータ超過は全スレッド共通なので、他のスレッドも待たせる
+            self.paused_until = max(self.paused_until, now + delay)
+            if now - self.last_decrease >= DECREASE_INTERVAL_SECONDS and self.concurrency > 1:
+                before = int(self.concurrency)
+                self.concurrency = max(1.0, self.concurrency / 2)
+                self.last_decrease = now
+                if int(self.concurrency) < before:
+                    print(f"⏳ {self.name} API がスロットリングされました: 同時実行数を {int(self.concurrency)} に下げます")
+            self.cond.notify_all()
+        return delay
+
+    def call(self, func, cost=1, max_retries=None):
+        """
+        func() をクォータの範囲内で実行し、再試行できるエラーはバックオフして再試行する
+
+        max_retries: 再試行の回数（省略時は governor の既定値）
+        """
+        max_retries = self.max_retries if max_retries is None else max_retries
+        attempt = 0
+        while True:
+            self.acquire(cost)
+            try:
+                result = func()
+            except Exception as error:
+                self.release(False)
+                if attempt >= max_retries or not is_retryable(error):
+                    raise
+                time.sleep(self.throttled(attempt, error))
+                attempt += 1
+                continue
+            self.release(True)
+            return result
+
+
+_governors = {}
+_governors_lock = threading.Lock()
+
+
+def get_governor(api):
+    """API ごとに共有する governor を取得"""
+    with _governors_lock:
+        governor = _governors.get(api)
+        if governor is None:
+            governor = _governors[api] = QuotaGovernor(api, DEFAULT_LIMITS.get(api, FALLBACK_LIMIT))
+        return governor
+
+
+class GovernedHttpRequest(HttpRequest):
+    """execute() を API の governor を通して実行する HttpRequest（build の requestBuilder に渡す）"""
+
+    def execute(self, http=None, num_retries=0):
+        """
+        再試行は governor が行う（googleapiclient 自身の再試行はクォータ・同時実行数の外で
+        スリープするので使わない）。num_retries を指定した場合はその回数だけ governor が再試行する
+        """
+        api = (self.methodId or '').split('.')[0]
+        return get_governor(api).call(lambda: super(GovernedHttpRequest, self).execute(http=http),
+                                      max_retries=num_retries or None)
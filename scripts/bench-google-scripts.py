@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Google API を使うスクリプトのベンチマーク（偽サーバー上で実行）
+
+fake_google_server.py を同じプロセスで起動し、環境変数 GOOGLE_API_ENDPOINT で
+各スクリプトの処理をそこに向けて実行する。処理ごとに所要時間・API 呼び出し回数・
+HTTP リクエスト数・転送バイト数・429 の回数を表示する。
+出力先（SQLite・シャード）は一時ディレクトリに作るので、実データには触れない。
+
+gas-deploy.py（ローカルの HTML を読む）と extract-question-text.py（画像を
+drive.google.com から直接ダウンロードし、Claude API を呼ぶ）は対象外
+"""
+
+import argparse
+import importlib.util
+import io
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from fake_google_data import ROOT_FOLDER_ID, generate_dataset, DEFAULT_IMAGES, DEFAULT_YEARS
+from fake_google_server import FakeGoogleServer, parse_quotas
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPTS_DIR)
+sys.path.insert(0, ROOT_DIR)
+from google_clients import ENDPOINT_ENV, get_credentials, DRIVE_SCOPES
+
+
+def load_script(path):
+    """ハイフン入りのファイル名のスクリプトをモジュールとして読み込む"""
+    name = os.path.splitext(os.path.basename(path))[0].replace('-', '_')
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# --- ベンチマークする処理 ---
+
+def case_snapshot_full(server, work_dir):
+    """explore-drive-structure / auto-fix-drive-permissions が使うスナップショットの全件同期"""
+    from drive_snapshot import sync_snapshot, query_files
+    conn = sync_snapshot(get_credentials(DRIVE_SCOPES), ROOT_FOLDER_ID,
+                         db_path=os.path.join(work_dir, 'snapshot.db'), full=True)
+    count = len(query_files(conn))
+    conn.close()
+    return f'{count:,}件'
+
+
+def case_snapshot_incremental(server, work_dir):
+    """画像1,000件を更新したあとの差分同期"""
+    from drive_snapshot import sync_snapshot
+    server.mutate(modify=1000)
+    server.reset_stats()
+    sync_snapshot(get_credentials(DRIVE_SCOPES), ROOT_FOLDER_ID,
+                  db_path=os.path.join(work_dir, 'snapshot.db')).close()
+    return '1,000件の変更'
+
+
+def case_make_public(server, work_dir):
+    """auto-fix-drive-permissions: スナップショットの全画像を公開設定に変更"""
+    from drive_crawler import is_image
+    from drive_permissions import make_files_public
+    from drive_snapshot import sync_snapshot, query_files
+    creds = get_credentials(DRIVE_SCOPES)
+    conn = sync_snapshot(creds, ROOT_FOLDER_ID, db_path=os.path.join(work_dir, 'snapshot.db'))
+    images = [{'id': row['id'], 'name': row['path']}
+              for row in query_files(conn) if is_image(row['mime_type'], row['name'])]
+    conn.close()
+    results = make_files_public(creds, images)
+    errors = sum(1 for result in results if result['status'] == 'error')
+    return f'{len(results):,}件（失敗 {errors:,}件）'
+
+
+def case_question_index(server, work_dir):
+    """sync-question-index: 全年度タブを SQLite レプリカに同期"""
+    module = load_script(os.path.join(SCRIPTS_DIR, 'sync-question-index.py'))
+    module.sync_question_index(os.path.join(work_dir, 'questions.db')).close()
+    return ''
+
+
+def case_question_shards(server, work_dir):
+    """build-question-shards: 全年度タブから JSON シャードを作成"""
+    module = load_script(os.path.join(SCRIPTS_DIR, 'build-question-shards.py'))
+    manifest = module.build_question_shards(os.path.join(work_dir, 'shards'))
+    return f"{manifest['count']:,}問"
+
+
+def case_fix_gas(server, work_dir):
+    """auto-fix-gas: GAS プロジェクトの取得と更新"""
+    module = load_script(os.path.join(ROOT_DIR, 'auto-fix-gas.py'))
+    return '成功' if module.fix_gas_code() else '失敗'
+
+
+CASES = [
+    ('snapshot-full', case_snapshot_full),
+    ('snapshot-incremental', case_snapshot_incremental),
+    ('make-public', case_make_public),
+    ('question-index', case_question_index),
+    ('question-shards', case_question_shards),
+    ('fix-gas', case_fix_gas),
+]
+
+
+def run_case(server, work_dir, name, func, verbose):
+    """1つの処理を実行して計測結果を返す"""
+    server.reset_stats()
+    output = io.StringIO()
+    started = time.perf_counter()
+    if verbose:
+        detail = func(server, work_dir)
+    else:
+        with redirect_stdout(output):
+            detail = func(server, work_dir)
+    elapsed = time.perf_counter() - started
+    return {'name': name, 'seconds': elapsed, 'detail': detail, **server.stats()}
+
+
+def print_report(result, show_endpoints):
+    http = result['http']
+    print(f"⏱️  {result['name']:<22} {result['seconds']:>8.2f} 秒   "
+          f"API {result['api_calls']:>7,}回   HTTP {http['requests']:>6,}回   "
+          f"送信 {http['bytes_in']:>12,} B   受信 {http['bytes_out']:>13,} B   "
+          f"429 {result['rate_limited']:>5,}回   {result['detail']}")
+    if show_endpoints:
+        for endpoint, stat in result['endpoints'].items():
+            status = ', '.join(f'{code}: {count:,}' for code, count in sorted(stat['status'].items()))
+            print(f"      {endpoint:<38} {stat['calls']:>7,}回   {stat['bytes_out']:>13,} B   ({status})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Google API を使うスクリプトのベンチマーク（偽サーバー）')
+    parser.add_argument('cases', nargs='*', help=f"実行する処理（既定は全部: {', '.join(name for name, _ in CASES)}）")
+    parser.add_argument('--images', type=int, default=DEFAULT_IMAGES)
+    parser.add_argument('--years', type=int, default=DEFAULT_YEARS)
+    parser.add_argument('--latency-ms', type=float, default=30, help='1リクエストあたりの応答遅延')
+    parser.add_argument('--jitter-ms', type=float, default=10)
+    parser.add_argument('--batch-item-latency-ms', type=float, default=2, help='バッチ内1件あたりの追加遅延')
+    parser.add_argument('--quota', action='append', help='API ごとの毎分クォータ（例: sheets=300）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='ランダムに 429 を返す割合')
+    parser.add_argument('--endpoints', action='store_true', help='エンドポイント別の内訳も表示')
+    parser.add_argument('--verbose', action='store_true', help='各スクリプトの出力も表示')
+    args = parser.parse_args()
+
+    selected = [(name, func) for name, func in CASES if not args.cases or name in args.cases]
+
+    print(f"🧪 合成データを生成中（画像 {args.images:,}枚・{args.years}年度）...")
+    dataset = generate_dataset(args.images, args.years)
+
+    server = FakeGoogleServer(
+        dataset, latency_ms=args.latency_ms, latency_jitter_ms=args.jitter_ms,
+        batch_item_latency_ms=args.batch_item_latency_ms, quotas=parse_quotas(args.quota),
+        error_rate=args.error_rate
+    )
+    with server, tempfile.TemporaryDirectory() as work_dir:
+        os.environ[ENDPOINT_ENV] = server.endpoint
+        print(f"🌐 偽サーバー: {server.endpoint}\n")
+        for name, func in selected:
+            print_report(run_case(server, work_dir, name, func, args.verbose), args.endpoints)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+キーワード抽出のベンチマーク
+
+旧 analyze_question_content（用語ごとの `in` 検索）と Aho-Corasick タガーを、
+辞書の規模を変えながら合成した問題文で比較する
+"""
+
+import random
+import time
+from keyword_tagger import KeywordTagger, load_dictionary
+
+ROWS = 2000
+TEXT_LENGTH = 400
+VOCABULARY_SIZES = [18, 200, 1000, 5000]
+
+FILLER = 'のはをにがでとも図表中次地域特色記述最適当資料示考察'
+KATAKANA = 'アイウエオカキクケコサシスセソタチツテトナニヌネノハヒフヘホマミムメモヤユヨラリルレロワン'
+
+
+def legacy_analyze_question_content(question_text):
+    """旧実装（リストの用語ごとに部分文字列を検索）"""
+    geographical_keywords = []
+    regions = ['ヨーロッパ', '日本', '北アメリカ', 'アフリカ', 'アジア', 'オセアニア']
+    for region in regions:
+        if region in question_text:
+            geographical_keywords.append(region)
+
+    industry_keywords = []
+    industries = ['農業', '酪農', '稲作', '工業', '漁業', '林業', '樹園地']
+    for industry in industries:
+        if industry in question_text:
+            industry_keywords.append(industry)
+
+    climate_keywords = []
+    climates = ['地中海性気候', '温暖湿潤', '冷涼', '寒冷', '乾燥']
+    for climate in climates:
+        if climate in question_text:
+            climate_keywords.append(climate)
+
+    return geographical_keywords + industry_keywords + climate_keywords
+
+
+def linear_scan(terms, text):
+    """旧実装と同じ方式を任意の辞書に広げたもの"""
+    return [term for term in terms if term in text]
+
+
+def build_vocabulary(size, rng):
+    """実際の辞書に、架空の地名を足して指定の語数にする"""
+    terms = load_dictionary()
+    while len(terms) < size:
+        name = ''.join(rng.choice(KATAKANA) for _ in range(rng.randint(3, 7)))
+        terms.setdefault(name, 'region')
+    return dict(list(terms.items())[:size])
+
+
+def build_texts(terms, rng):
+    """辞書の用語を散りばめた合成の問題文"""
+    vocabulary = list(terms)
+    texts = []
+    for _ in range(ROWS):
+        parts = []
+        length = 0
+        while length < TEXT_LENGTH:
+            if rng.random() < 0.1:
+                part = rng.choice(vocabulary)
+            else:
+                part = ''.join(rng.choice(FILLER) for _ in range(rng.randint(2, 8)))
+            parts.append(part)
+            length += len(part)
+        texts.append(''.join(parts))
+    return texts
+
+
+def measure(function):
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+
+def main():
+    rng = random.Random(0)
+    print(f"📊 {ROWS}行 × 約{TEXT_LENGTH}文字の問題文で比較")
+
+    texts = build_texts(load_dictionary(), rng)
+    seconds = measure(lambda: [legacy_analyze_question_content(text) for text in texts])
+    print(f"\n旧 analyze_question_content（18語）: {seconds * 1000:.1f} ms ({ROWS / seconds:,.0f} 行/秒)")
+
+    print(f"\n{'語数':>6} {'線形検索':>12} {'Aho-Corasick':>14} {'構築':>10} {'倍率':>8}")
+    for size in VOCABULARY_SIZES:
+        terms = build_vocabulary(size, rng)
+        texts = build_texts(terms, rng)
+
+        build_seconds = measure(lambda: KeywordTagger(terms))
+        tagger = KeywordTagger(terms)
+
+        linear_seconds = measure(lambda: [linear_scan(terms, text) for text in texts])
+        automaton_seconds = measure(lambda: tagger.tag_many(texts))
+
+        print(f"{size:>6} {linear_seconds * 1000:>10.1f}ms {automaton_seconds * 1000:>12.1f}ms "
+              f"{build_seconds * 1000:>8.1f}ms {linear_seconds / automaton_seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
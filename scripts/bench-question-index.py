@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+問題レプリカ（SQLite FTS5）の検索ベンチマーク
+
+合成した10万問を投入し、問題ID・年度・分野タグ・全文検索の所要時間を計測する
+"""
+
+import os
+import random
+import statistics
+import tempfile
+import time
+from keyword_tagger import load_dictionary
+from question_index import open_index, rebuild_index, search_questions
+
+ROWS = 100_000
+YEARS = list(range(2006, 2026))
+REPEAT = 200
+
+FILLER = 'のはをにがでとも図表中次地域特色記述最適当資料示考察'
+
+
+def generate_questions(rng):
+    """辞書の用語を使った合成の問題データ"""
+    dictionary = load_dictionary()
+    terms = list(dictionary)
+    categories = sorted({'地形', '気候', '農業', '工業', '人口', '都市', '交通', '貿易', '環境', '民族'})
+
+    for number in range(ROWS):
+        year = YEARS[number % len(YEARS)]
+        keywords = rng.sample(terms, 6)
+        text = ''.join(
+            rng.choice(terms) if rng.random() < 0.15 else rng.choice(FILLER) * rng.randint(1, 3)
+            for _ in range(120)
+        )
+        yield {
+            'question_id': f'{year}_geo_{number}',
+            'sheet': f'{year}年共通テスト地理B',
+            'year': year,
+            'category': ','.join(rng.sample(categories, 2)),
+            'answer': str(rng.randint(1, 4)),
+            'correct_rate': f'{rng.randint(20, 95)}%',
+            'notes': '',
+            'created_date': '',
+            'image_url': '',
+            'keywords': ','.join(keywords),
+            'question_text': text
+        }
+
+
+def measure(label, query):
+    """クエリを繰り返し実行して中央値と p95 を表示"""
+    durations = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        results = query()
+        durations.append(time.perf_counter() - started)
+    durations.sort()
+    median = statistics.median(durations) * 1_000_000
+    p95 = durations[int(len(durations) * 0.95)] * 1_000_000
+    print(f"{label:<36} 中央値 {median:>8.0f} µs   p95 {p95:>8.0f} µs   {len(results):>3}件")
+
+
+def main():
+    rng = random.Random(0)
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench-questions.sqlite3')
+    conn = open_index(db_path)
+
+    started = time.perf_counter()
+    count = rebuild_index(conn, generate_questions(rng))
+    print(f"📥 {count:,}問を投入: {time.perf_counter() - started:.1f} 秒 ({db_path})\n")
+
+    measure("問題ID", lambda: search_questions(conn, question_id='2007_geo_54321'))
+    measure("年度 + 分野タグ（10件）", lambda: search_questions(conn, year=2024, category='気候', limit=10))
+    measure("全文検索 3文字以上（希少語, 10件）", lambda: search_questions(conn, text='ツンドラ気候', limit=10))
+    measure("全文検索 3文字以上（頻出語, 10件）", lambda: search_questions(conn, text='ヨーロッパ', limit=10))
+    measure("2文字 問題文・キーワード（10件）", lambda: search_questions(conn, text='気候', limit=10))
+    measure("2文字 + 年度（10件）", lambda: search_questions(conn, text='気候', year=2024, limit=10))
+    measure("2文字 + 年度（該当なし）", lambda: search_questions(conn, text='該無', year=2024, limit=10))
+    measure("2文字（該当なし）", lambda: search_questions(conn, text='該無', limit=10))
+    measure("1文字 + 年度 + 分野タグ（10件）",
+            lambda: search_questions(conn, text='島', year=2024, category='農業', limit=10))
+    measure("全文検索 + 年度 + 分野タグ（10件）",
+            lambda: search_questions(conn, text='地中海性気候', year=2024, category='農業', limit=10))
+    measure("全文検索 + 年度（該当なし）",
+            lambda: search_questions(conn, text='該当しない語句', year=2024, limit=10))
+    measure("全文検索 + 年度 + 分野タグ（該当なし）",
+            lambda: search_questions(conn, text='該当しない語句', year=2024, category='農業', limit=10))
+    measure("全文検索 + 分野タグ + 問題ID",
+            lambda: search_questions(conn, text='気候', category='気候', question_id='2007_geo_54321'))
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
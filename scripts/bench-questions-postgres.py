@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+questions テーブルの検索ベンチマーク（旧スキーマ vs 検索向けスキーマ）
+
+合成した10万問を bench_legacy（001 の定義）と bench_search（question_schema.py の定義）の
+2つのスキーマに投入し、同じ検索条件の実行計画と所要時間を比較する。
+環境変数 DATABASE_URL（なければローカルの supabase start の DB）に接続する
+"""
+
+import io
+import os
+import random
+import statistics
+import time
+import psycopg2
+from keyword_tagger import load_dictionary
+from postgres_loader import DEFAULT_DATABASE_URL
+from question_schema import SEARCH_SCHEMA_SQL, CATEGORIES_FROM_TEXT_SQL, CORRECT_RATE_FROM_TEXT_SQL
+
+ROWS = 100_000
+YEARS = list(range(2006, 2026))
+REPEAT = 30
+COPY_BATCH_ROWS = 10_000
+
+FILLER = 'のはをにがでとも図表中次地域特色記述最適当資料示考察'
+CATEGORIES = ['地形', '気候', '農業', '工業', '人口', '都市', '交通', '貿易', '環境', '民族']
+
+# 001 と同じ定義（比較のため、索引のない問題文の列だけ追加）
+LEGACY_SCHEMA_SQL = """
+CREATE TABLE questions (
+    id SERIAL PRIMARY KEY,
+    question_id VARCHAR(50) UNIQUE NOT NULL,
+    category VARCHAR(100),
+    answer VARCHAR(10),
+    correct_rate VARCHAR(10),
+    image_url TEXT,
+    year INTEGER,
+    created_date TIMESTAMP DEFAULT NOW(),
+    notes TEXT,
+    keywords TEXT,
+    question_text TEXT
+);
+CREATE INDEX idx_questions_year ON questions(year);
+CREATE INDEX idx_questions_category ON questions(category);
+"""
+
+COPY_TO_SEARCH_SQL = f"""
+INSERT INTO bench_search.questions
+    (question_id, year, category, categories, answer, correct_rate, image_url, question_text, keywords, notes)
+SELECT
+    question_id, year, category,
+    {CATEGORIES_FROM_TEXT_SQL.format(column='category')},
+    answer,
+    {CORRECT_RATE_FROM_TEXT_SQL.format(column='correct_rate')},
+    image_url, question_text, keywords, notes
+FROM bench_legacy.questions
+"""
+
+# (名前, 旧スキーマの SQL, 新スキーマの SQL, パラメータ(旧), パラメータ(新))
+QUERIES = [
+    ("分野タグ AND（気候・農業）",
+     "SELECT question_id FROM questions WHERE category LIKE %s AND category LIKE %s",
+     "SELECT question_id FROM questions WHERE categories @> %s::text[]",
+     ('%気候%', '%農業%'), (['気候', '農業'],)),
+    ("分野タグ OR（交通・貿易・環境）",
+     "SELECT question_id FROM questions WHERE category LIKE %s OR category LIKE %s OR category LIKE %s",
+     "SELECT question_id FROM questions WHERE categories && %s::text[]",
+     ('%交通%', '%貿易%', '%環境%'), (['交通', '貿易', '環境'],)),
+    ("問題文の部分一致（希少語）",
+     "SELECT question_id FROM questions WHERE question_text LIKE %s LIMIT 50",
+     "SELECT question_id FROM questions WHERE question_text LIKE %s LIMIT 50",
+     ('%ツンドラ気候%',), ('%ツンドラ気候%',)),
+    ("問題文の部分一致（該当なし）",
+     "SELECT question_id FROM questions WHERE question_text LIKE %s",
+     "SELECT question_id FROM questions WHERE question_text LIKE %s",
+     ('%該当しない語句%',), ('%該当しない語句%',)),
+    ("年度 + 正答率 50% 未満",
+     "SELECT question_id FROM questions WHERE year = %s AND replace(correct_rate, '%%', '')::numeric < %s",
+     "SELECT question_id FROM questions WHERE year = %s AND correct_rate < %s",
+     (2024, 50), (2024, 50)),
+    ("年度 + 分野タグ + 問題文",
+     "SELECT question_id FROM questions WHERE year = %s AND category LIKE %s AND question_text LIKE %s",
+     "SELECT question_id FROM questions WHERE year = %s AND categories @> %s::text[] AND question_text LIKE %s",
+     (2024, '%気候%', '%地中海性気候%'), (2024, ['気候'], '%地中海性気候%')),
+]
+
+
+def generate_rows(rng):
+    """辞書の用語を使った合成の問題データ（旧スキーマの列の並び）"""
+    terms = list(load_dictionary())
+    for number in range(ROWS):
+        year = YEARS[number % len(YEARS)]
+        text = ''.join(
+            rng.choice(terms) if rng.random() < 0.15 else rng.choice(FILLER) * rng.randint(1, 3)
+            for _ in range(120)
+        )
+        yield (
+            f'{year}_geo_{number}',
+            ','.join(rng.sample(CATEGORIES, rng.randint(1, 3))),
+            str(rng.randint(1, 4)),
+            f'{rng.randint(20, 95)}%',
+            '',
+            year,
+            '',
+            ','.join(rng.sample(terms, 6)),
+            text
+        )
+
+
+def load_legacy(cursor, rng):
+    """旧スキーマに COPY で投入"""
+    columns = 'question_id, category, answer, correct_rate, image_url, year, notes, keywords, question_text'
+    buffer = io.StringIO()
+    for count, row in enumerate(generate_rows(rng), 1):
+        buffer.write('\t'.join(str(value) for value in row) + '\n')
+        if count % COPY_BATCH_ROWS == 0:
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY questions ({columns}) FROM STDIN", buffer)
+            buffer = io.StringIO()
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY questions ({columns}) FROM STDIN", buffer)
+
+
+def setup(conn):
+    """2つのスキーマを作り直してデータを投入"""
+    with conn.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public")
+        for schema in ('bench_legacy', 'bench_search'):
+            cursor.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+            cursor.execute(f"CREATE SCHEMA {schema}")
+
+        started = time.perf_counter()
+        cursor.execute("SET search_path TO bench_legacy, public")
+        cursor.execute(LEGACY_SCHEMA_SQL)
+        load_legacy(cursor, random.Random(0))
+        print(f"📥 旧スキーマに {ROWS:,}行を投入: {time.perf_counter() - started:.1f} 秒")
+
+        started = time.perf_counter()
+        cursor.execute("SET search_path TO bench_search, public")
+        cursor.execute(SEARCH_SCHEMA_SQL)
+        cursor.execute(COPY_TO_SEARCH_SQL)
+        print(f"📥 検索向けスキーマに投入（インデックス作成込み）: {time.perf_counter() - started:.1f} 秒")
+
+        cursor.execute("ANALYZE bench_legacy.questions")
+        cursor.execute("ANALYZE bench_search.questions")
+    conn.commit()
+
+
+def plan_summary(cursor, sql, params):
+    """実行計画で使われたノード（インデックス名つき）と読んだパーティション数"""
+    cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+    plan = cursor.fetchone()[0][0]['Plan']
+
+    nodes = []
+    relations = set()
+
+    def walk(node):
+        label = node['Node Type']
+        if 'Index Name' in node:
+            label += f"({node['Index Name']})"
+        if label not in nodes:
+            nodes.append(label)
+        if 'Relation Name' in node:
+            relations.add(node['Relation Name'])
+        for child in node.get('Plans', []):
+            walk(child)
+
+    walk(plan)
+    buffers = plan.get('Shared Hit Blocks', 0) + plan.get('Shared Read Blocks', 0)
+    return nodes, len(relations), buffers
+
+
+def measure(cursor, schema, sql, params):
+    """クエリを繰り返し実行して (中央値ms, p95ms, 件数, 実行計画) を返す"""
+    cursor.execute(f"SET search_path TO {schema}, public")
+    durations = []
+    rows = 0
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        cursor.execute(sql, params)
+        rows = len(cursor.fetchall())
+        durations.append(time.perf_counter() - started)
+    durations.sort()
+    median = statistics.median(durations) * 1000
+    p95 = durations[int(len(durations) * 0.95)] * 1000
+    return median, p95, rows, plan_summary(cursor, sql, params)
+
+
+def main():
+    conn = psycopg2.connect(os.environ.get('DATABASE_URL', DEFAULT_DATABASE_URL))
+    setup(conn)
+
+    with conn.cursor() as cursor:
+        for label, legacy_sql, search_sql, legacy_params, search_params in QUERIES:
+            print(f"\n🔎 {label}")
+            results = {}
+            for name, schema, sql, params in (
+                ('旧', 'bench_legacy', legacy_sql, legacy_params),
+                ('新', 'bench_search', search_sql, search_params)
+            ):
+                median, p95, rows, (nodes, relations, buffers) = measure(cursor, schema, sql, params)
+                results[name] = median
+                print(f"   {name}: 中央値 {median:>8.2f} ms   p95 {p95:>8.2f} ms   {rows:>5}件   "
+                      f"{relations}テーブル / {buffers:,}ブロック   {' → '.join(nodes)}")
+            if results['新']:
+                print(f"   {results['旧'] / results['新']:.1f} 倍")
+        conn.rollback()
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
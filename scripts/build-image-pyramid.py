@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+全ての問題画像の派生画像（320・768・1600px の WebP・AVIF）とマニフェストを作る
+（デプロイ前に npm run build:images で実行する。npm run build には含めない）
+
+元画像のハッシュ（Driveスナップショットの md5Checksum）が前回と同じ問題は、
+画像をダウンロードせずに前回の派生画像を使う。スナップショットがない場合は
+ダウンロードした画像のハッシュで比べる（変わっていなければ変換しない）。
+ページには問題文以外の図・リード文もあるので、segment-exam-pages.py で切り出した
+問題の画像ではなく、シートの画像URLのページ全体から作る。
+"""
+
+import hashlib
+import os
+import sys
+from image_pack import ImagePack, fetch_images, to_direct_url
+from image_pyramid import (
+    DEFAULT_PYRAMID_DIR, available_formats, render_all, load_manifest, is_current, write_manifest,
+    print_pyramid_summary
+)
+from sheet_questions import SPREADSHEET_ID, list_year_tabs, fetch_tab_values, iter_questions
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from drive_snapshot import DEFAULT_SNAPSHOT_PATH, open_snapshot, lookup_md5
+from google_clients import get_service, SHEETS_READONLY_SCOPES
+
+def build_image_pyramid(output_dir=DEFAULT_PYRAMID_DIR, workers=None):
+    """全年度タブの問題画像の派生画像を作成"""
+    service = get_service('sheets', 'v4', scopes=SHEETS_READONLY_SCOPES)
+    titles = list_year_tabs(service, SPREADSHEET_ID)
+    tab_values = fetch_tab_values(service, titles, SPREADSHEET_ID)
+    questions = [question for question in iter_questions(tab_values) if question['image_url']]
+
+    formats = available_formats()
+    if 'avif' not in formats:
+        print("⚠️  Pillow が AVIF に対応していないため WebP だけを作成します")
+
+    previous = load_manifest(output_dir)
+    snapshot = open_snapshot(DEFAULT_SNAPSHOT_PATH) if os.path.exists(DEFAULT_SNAPSHOT_PATH) else None
+    image_pack = ImagePack()
+
+    # 元画像のハッシュが前回と同じ問題はダウンロードしない
+    images = {}
+    drive_sources = {}
+    for question in questions:
+        question_id = question['question_id']
+        source_md5 = lookup_md5(snapshot, to_direct_url(question['image_url'])[0])
+        entry = previous['images'].get(question_id)
+        if source_md5 and is_current(entry, source_md5, formats, output_dir):
+            images[question_id] = entry
+        else:
+            drive_sources[question_id] = (question['image_url'], source_md5)
+
+    # ダウンロードした画像のハッシュで確認し、内容が同じ画像は1回だけ変換する
+    fetched = fetch_images(image_pack, set(drive_sources.values()))
+    sources = {}
+    for question_id, (image_url, _) in drive_sources.items():
+        if image_url in fetched:
+            sources[question_id] = fetched[image_url]
+        elif question_id in previous['images']:
+            # 取得できなかった画像は前回の派生画像のまま
+            images[question_id] = previous['images'][question_id]
+
+    pending = {}
+    question_md5 = {}
+    for question_id, data in sources.items():
+        source_md5 = hashlib.md5(data).hexdigest()
+        if is_current(previous['images'].get(question_id), source_md5, formats, output_dir):
+            images[question_id] = previous['images'][question_id]
+        else:
+            pending.setdefault(source_md5, data)
+            question_md5[question_id] = source_md5
+
+    print(f"🖼️  {len(pending)}枚の派生画像を作成中...（元画像が変わっていない{len(images)}問題をスキップ）")
+    rendered = render_all(pending, output_dir, formats, workers)
+    for question_id, source_md5 in question_md5.items():
+        if source_md5 in rendered:
+            images[question_id] = rendered[source_md5]
+
+    manifest = write_manifest(images, previous, output_dir, formats)
+    print_pyramid_summary(manifest)
+    print(f"✅ {len(images)}問題の派生画像を {output_dir} に作成しました")
+
+    image_pack.close()
+    if snapshot is not None:
+        snapshot.close()
+    return manifest
+
+if __name__ == "__main__":
+    build_image_pyramid()
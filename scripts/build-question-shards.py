@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+デプロイ前に問題データを年度別・分野別の JSON シャードとして public/data/questions に書き出す
+（npm run build:shards。npm run build には含めない）
+
+ページはマニフェストを読んで必要なシャードだけを取得するので、
+リクエストのたびに Google Sheets API を呼ばない
+"""
+
+import os
+import sys
+from sheet_questions import SPREADSHEET_ID, list_year_tabs, fetch_tab_values, iter_questions
+from question_shards import DEFAULT_SHARD_DIR, build_shards, print_shard_summary
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from google_clients import get_service, SHEETS_READONLY_SCOPES
+
+def build_question_shards(shard_dir=DEFAULT_SHARD_DIR):
+    """全年度タブを読み込んでシャードを作成"""
+    service = get_service('sheets', 'v4', scopes=SHEETS_READONLY_SCOPES)
+
+    titles = list_year_tabs(service, SPREADSHEET_ID)
+    print(f"📑 年度タブ: {', '.join(titles)}")
+
+    tab_values = fetch_tab_values(service, titles, SPREADSHEET_ID)
+    manifest = build_shards(iter_questions(tab_values), shard_dir)
+    print_shard_summary(manifest)
+    print(f"✅ {manifest['count']}問題のシャードを {shard_dir} に作成しました")
+    return manifest
+
+if __name__ == "__main__":
+    build_question_shards()
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+スプレッドシートの全年度タブを列指向スナップショット（Parquet）に書き出す
+
+分析・検索インデックス作成・移行処理は Sheets API の代わりに
+question_snapshot.read_snapshot() で必要な列だけを読む
+"""
+
+import os
+import sys
+from sheet_questions import SPREADSHEET_ID, list_year_tabs, fetch_tab_values, iter_questions
+from question_snapshot import DEFAULT_SNAPSHOT_DIR, write_snapshot
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from google_clients import get_service, SHEETS_READONLY_SCOPES
+
+def export_question_snapshot(snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    """全年度タブを読み込んでスナップショットを作成"""
+    service = get_service('sheets', 'v4', scopes=SHEETS_READONLY_SCOPES)
+
+    titles = list_year_tabs(service, SPREADSHEET_ID)
+    print(f"📑 年度タブ: {', '.join(titles)}")
+
+    tab_values = fetch_tab_values(service, titles, SPREADSHEET_ID)
+    source = {'spreadsheet_id': SPREADSHEET_ID, 'tabs': titles}
+    return write_snapshot(iter_questions(tab_values), snapshot_dir, source=source)
+
+if __name__ == "__main__":
+    export_question_snapshot()
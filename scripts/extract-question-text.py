@@ -3,142 +3,486 @@
 問題画像から文章を抽出してスプレッドシートに追加するスクリプト
 """
 
-import requests
+import argparse
+import asyncio
+import hashlib
+import itertools
+import os
+import sys
 import json
-import base64
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
-import time
+from image_pack import ImagePack, to_direct_url, download_image
+from image_normalize import NormalizedImageCache, normalize_image, settings_key, timed
+from image_dedup import DuplicateIndex, image_fingerprint
+from keyword_tagger import get_default_tagger
+from sheet_writer import IncrementalSheetWriter
+from ocr_journal import OcrJournal, journal_path
+from ocr_cache import OcrCache, prompt_version
+from ocr_backends import BACKENDS, get_backend
+from page_segmenter import DEFAULT_SEGMENT_DIR, SEGMENT_URL_PREFIX, SegmentStore
+from sheet_questions import SPREADSHEET_ID, list_year_tabs, fetch_tab_values, year_from_title
+from question_pipeline import (
+    run_pipeline, TokenBucket, DRIVE_REQUESTS_PER_SECOND, FETCH_CONCURRENCY,
+    FETCH_FAILED_TEXT, OCR_FAILED_TEXT
+)
+import vision_batch
 
-def extract_text_from_image_url(image_url):
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from drive_snapshot import DEFAULT_SNAPSHOT_PATH, open_snapshot, lookup_md5
+from google_clients import get_service, SHEETS_SCOPES
+
+# 正規化前後の OCR 時間を比較するために、元画像でも OCR する件数
+OCR_LATENCY_SAMPLE = 3
+# 途中結果をシートに書き込む間隔（行数・秒のどちらかに達したら）
+FLUSH_EVERY_ROWS = 50
+FLUSH_INTERVAL_SECONDS = 60
+# 読み書きする列（問題データ + 問題文・キーワード列）
+SHEET_RANGE = 'A:O'
+# 問題文・キーワードの列（K〜O列）
+TEXT_COLUMNS = ['問題文', '地理キーワード', '産業キーワード', '気候キーワード', '全キーワード']
+TEXT_COLUMN_START = 10
+# バッチジョブでの抽出（問題文・キーワード・地域・分野の JSON）のキャッシュのバージョン
+BATCH_VERSION = prompt_version(vision_batch.MODEL, vision_batch.EXTRACTION_PROMPT)
+
+async def fetch_normalized(image_url, image_pack, normalized_cache, snapshot, fetched_md5, segments=None):
     """
-    Claude APIを使用して画像から問題文を抽出
+    画像を取得・正規化し、(元画像, 正規化した画像, 元画像の md5) を返す
+
+    fetched_md5: この実行で取得済みの md5 → ファイルID（同じ内容の画像はダウンロードしない）
+    segments: ページから切り出した問題の画像（'segment:問題ID' の参照はここから読む）
     """
-    # Google Drive URLを直接アクセス可能なURLに変換
-    if 'drive.google.com' in image_url:
-        file_id = image_url.split('/d/')[1].split('/')[0]
-        direct_url = f"https://drive.google.com/uc?export=view&id={file_id}"
+    if image_url.startswith(SEGMENT_URL_PREFIX):
+        image = segments.crop(image_url[len(SEGMENT_URL_PREFIX):])
+        md5 = None
     else:
-        direct_url = image_url
+        file_id, direct_url = to_direct_url(image_url)
+        md5 = lookup_md5(snapshot, file_id) if file_id else None
+        
+        # 画像パックの読み書きはイベントループのスレッドで行う（SQLite接続のため）
+        # md5 が分からない画像は、画像パックにあっても Drive で更新されているかもしれないので
+        # ダウンロードし直す（image_pack.fetch_images と同じ）
+        image = image_pack.get(file_id, md5) if file_id and md5 else None
+        if image is None and md5 in fetched_md5:
+            image = image_pack.get(fetched_md5[md5], md5)
+        if image is None:
+            data = await asyncio.to_thread(download_image, direct_url)
+            try:
+                image = image_pack.put(file_id, data, md5) if file_id else data
+            except ValueError as e:
+                # スナップショットの後に更新された画像（md5 はダウンロードした内容から求め直す）
+                print(f"⚠️  {str(e)}")
+                image = image_pack.put(file_id, data)
+                md5 = None
+        if md5:
+            fetched_md5.setdefault(md5, file_id)
     
-    # 画像をダウンロード
-    response = requests.get(direct_url)
-    if response.status_code != 200:
-        return "画像の取得に失敗"
+    # OCR 前に縮小・再エンコード（元画像のハッシュごとにキャッシュ）
+    normalized = normalized_cache.get(image)
+    if normalized is None:
+        data = await asyncio.to_thread(normalize_image, image, normalized_cache.settings)
+        normalized = normalized_cache.put(image, data)
     
-    # Base64エンコード
-    image_base64 = base64.b64encode(response.content).decode('utf-8')
+    return image, normalized, md5 or hashlib.md5(image).hexdigest()
+
+async def extract_rows(targets, image_pack, normalized_cache, snapshot=None, on_result=None, dedup=None,
+                       ocr_cache=None, backend=None, segments=None):
+    """
+    (キー, 画像URL) のリストを 取得・正規化 → OCR → キーワード分析 のパイプラインで並行処理
+
+    on_result: 1行の分析が終わるたびに (行番号, 分析結果) で呼ばれる（コルーチンでもよい）
+    dedup: 重複画像のクラスタ（同じクラスタの画像は代表画像の OCR 結果を使う）
+    ocr_cache: OCR 結果の永続キャッシュ（画像・正規化設定・プロンプトが同じなら OCR しない）
+    backend: OCR エンジン（同時実行数とレート制限はエンジンに合わせる）
+    segments: ページから切り出した問題の画像
+    """
+    report = normalized_cache.report
+    settings = settings_key(normalized_cache.settings)
+    dedup = dedup if dedup is not None else DuplicateIndex()
+    backend = backend if backend is not None else get_backend()
+    # ダミーの結果を返すエンジンの結果はキャッシュに残さない
+    ocr_cache = ocr_cache if backend.cache_results else None
+    # ローカルのエンジンはレート制限しない
+    ocr_limiter = TokenBucket.per_minute(backend.requests_per_minute) if backend.requests_per_minute else None
+    # クラスタ番号 → 代表画像の OCR 結果の Future（失敗した場合は None）
+    cluster_texts = {}
+    # この実行で取得済みの md5 → ファイルID（同じ内容の画像はダウンロードしない）
+    fetched_md5 = {}
+    fetched = 0
+    
+    async def fetch(image_url):
+        nonlocal fetched
+        image, normalized, md5 = await fetch_normalized(image_url, image_pack, normalized_cache, snapshot,
+                                                        fetched_md5, segments)
+        
+        fingerprint = await asyncio.to_thread(image_fingerprint, normalized, md5)
+        
+        fetched += 1
+        return {
+            'url': image_url,
+            'original': image,
+            'normalized': normalized,
+            'fingerprint': fingerprint,
+            'compare': fetched <= OCR_LATENCY_SAMPLE
+        }
     
-    # Claude APIに送信（実際のAPIキーが必要）
-    # ここではダミーレスポンスを返す
-    return """
-    次の図は，ヨーロッパの農業地域を示している。
+    async def follow(leader_text):
+        question_text = await leader_text
+        if question_text is not None:
+            dedup.record_reuse()
+        return question_text
     
-    図中のA～Dの地域で見られる農業の特色について，次の記述のうち最も適当なものはどれか。
+    def reuse(images):
+        """
+        取得した画像をクラスタに割り当てる（OCR の前に行う）
+        
+        重複画像は OCR のワーカーの枠を使わずに代表画像の OCR を待ち、その結果を使う
+        （代表画像の OCR が失敗した場合は自分で OCR する）
+        """
+        cluster_id, is_leader = dedup.assign(images['url'], images['fingerprint'])
+        if not is_leader:
+            return asyncio.ensure_future(follow(cluster_texts[cluster_id]))
+        cluster_texts[cluster_id] = asyncio.get_running_loop().create_future()
+        images['cluster_id'] = cluster_id
+        return None
     
-    1. Aの地域では，冷涼な気候を利用した酪農業が盛んである。
-    2. Bの地域では，地中海性気候を利用した樹園地農業が行われている。  
-    3. Cの地域では，温暖湿潤な気候を利用した稲作が中心となっている。
-    4. Dの地域では，寒冷な気候のため農業は困難である。
-    """
+    async def ocr(images):
+        cluster_id = images.get('cluster_id')
+        question_text = None
+        try:
+            image_md5 = images['fingerprint'].md5
+            if ocr_cache is not None:
+                question_text = ocr_cache.get(image_md5, settings, backend.version)
+                if question_text is not None:
+                    return question_text
+            
+            if ocr_limiter:
+                await ocr_limiter.acquire()
+            if images['compare']:
+                _, seconds = await asyncio.to_thread(timed, backend.extract, images['original'])
+                report.record_ocr('original', seconds)
+            question_text, seconds = await asyncio.to_thread(timed, backend.extract, images['normalized'])
+            report.record_ocr('normalized', seconds)
+            if ocr_cache is not None:
+                ocr_cache.put(image_md5, settings, backend.version, question_text)
+            return question_text
+        finally:
+            if cluster_id is not None and not cluster_texts[cluster_id].done():
+                cluster_texts[cluster_id].set_result(question_text)
+    
+    if on_result is None:
+        def on_result(row_number, analysis):
+            print(f"問題{row_number}: 抽出完了")
+    
+    # OCR のレート制限は、キャッシュにない画像を OCR するときだけ ocr() の中でかける
+    return await run_pipeline(
+        targets, fetch, ocr, analyze_question_content,
+        fetch_limiter=TokenBucket(DRIVE_REQUESTS_PER_SECOND),
+        ocr_concurrency=backend.concurrency,
+        reuse=reuse,
+        on_result=on_result
+    )
 
-def analyze_question_content(question_text):
+async def extract_rows_bulk(targets, image_pack, normalized_cache, snapshot=None, on_result=None, ocr_cache=None,
+                            segments=None):
     """
-    問題文を分析してキーワードを抽出
+    (キー, 画像URL) のリストをバッチジョブで抽出する（大量のバックフィル用）
+
+    画像を取得・正規化し、キャッシュにないものを数百件ずつジョブにまとめて送る。
+    全ジョブを送ってから順に完了を待ち、結果を届いた順に1行ずつ on_result に渡す。
+    同じ内容の画像は1回だけリクエストする。
+    作成に失敗したジョブや結果が届かなかった画像の行は失敗として渡す（次回の実行で再試行する）。
     """
-    # 地理的キーワード
-    geographical_keywords = []
-    regions = ['ヨーロッパ', '日本', '北アメリカ', 'アフリカ', 'アジア', 'オセアニア']
-    for region in regions:
-        if region in question_text:
-            geographical_keywords.append(region)
+    settings = settings_key(normalized_cache.settings)
+    client = vision_batch.BatchClient()
+    fetch_limiter = TokenBucket(DRIVE_REQUESTS_PER_SECOND)
+    fetch_slots = asyncio.Semaphore(FETCH_CONCURRENCY)
+    fetched_md5 = {}
+    # md5 → (正規化した画像, その画像を使う行のキー)
+    pending = {}
+    
+    async def finish(key, analysis):
+        result = on_result(key, analysis) if on_result else None
+        if asyncio.iscoroutine(result):
+            await result
+    
+    async def finish_image(md5, analysis):
+        """その画像を使う全ての行に結果を渡す"""
+        _, keys = pending.pop(md5, (None, []))
+        for key in keys:
+            await finish(key, analysis)
+    
+    async def fetch(key, image_url):
+        async with fetch_slots:
+            try:
+                await fetch_limiter.acquire()
+                _, normalized, md5 = await fetch_normalized(image_url, image_pack, normalized_cache, snapshot,
+                                                            fetched_md5, segments)
+            except Exception as e:
+                print(f"❌ 画像取得エラー: {key} - {str(e)}")
+                await finish(key, analyze_question_content(FETCH_FAILED_TEXT))
+                return
+        
+        cached = ocr_cache.get(md5, settings, BATCH_VERSION) if ocr_cache is not None else None
+        if cached is not None:
+            await finish(key, analysis_from_extraction(json.loads(cached)))
+        else:
+            pending.setdefault(md5, (normalized, []))[1].append(key)
+    
+    await asyncio.gather(*(fetch(key, image_url) for key, image_url in targets))
+    
+    # ジョブをまとめて送っておき、サーバー側で並行して処理させる
+    images = [(md5, normalized) for md5, (normalized, _) in pending.items()]
+    batches = []
+    for batch_requests in vision_batch.chunk_requests(images):
+        md5s = [request['custom_id'] for request in batch_requests]
+        try:
+            batch = await asyncio.to_thread(client.create, batch_requests)
+        except Exception as e:
+            # 作成できたジョブの結果は待つ
+            print(f"❌ バッチの作成エラー: {len(batch_requests)}件 - {str(e)}")
+            for md5 in md5s:
+                await finish_image(md5, analyze_question_content(OCR_FAILED_TEXT))
+            continue
+        batches.append((batch, md5s))
+        print(f"📤 バッチ {batch['id']} を作成: {len(batch_requests)}件")
     
-    # 農業・産業キーワード  
-    industry_keywords = []
-    industries = ['農業', '酪農', '稲作', '工業', '漁業', '林業', '樹園地']
-    for industry in industries:
-        if industry in question_text:
-            industry_keywords.append(industry)
+    for batch, md5s in batches:
+        received = 0
+        try:
+            ended = await asyncio.to_thread(client.wait, batch['id'])
+            # 結果の JSONL は届いた分から反映する（全件を読み込むまで待たない）
+            results = client.iter_results(ended)
+            while True:
+                result = await asyncio.to_thread(next, results, None)
+                if result is None:
+                    break
+                md5, extraction, error = result
+                if extraction is not None:
+                    if ocr_cache is not None:
+                        ocr_cache.put(md5, settings, BATCH_VERSION, json.dumps(extraction, ensure_ascii=False))
+                    analysis = analysis_from_extraction(extraction)
+                else:
+                    print(f"❌ OCRエラー: {md5} - {error}")
+                    analysis = analyze_question_content(OCR_FAILED_TEXT)
+                await finish_image(md5, analysis)
+                received += 1
+        except Exception as e:
+            print(f"❌ バッチ {batch['id']} の結果の取得エラー: {str(e)}")
+        
+        # 結果が届かなかった画像の行は失敗として渡す
+        missing = [md5 for md5 in md5s if md5 in pending]
+        for md5 in missing:
+            await finish_image(md5, analyze_question_content(OCR_FAILED_TEXT))
+        print(f"📥 バッチ {batch['id']}: {received}件の結果を反映"
+              + (f"（結果のない{len(missing)}件は失敗）" if missing else ""))
+
+def analysis_from_extraction(extraction):
+    """
+    バッチジョブの抽出結果（questionText・keywords・regions・topics）を行の分析結果にする
+
+    キーワード列は問題文を辞書で分析したものに、モデルが挙げたキーワード・地域・分野を加える
+    """
+    analysis = analyze_question_content(extraction['questionText'])
+    full_keywords = [term for term in analysis['full_keywords'].split(',') if term]
+    for term in extraction['keywords'] + extraction['regions'] + extraction['topics']:
+        if term and term not in full_keywords:
+            full_keywords.append(term)
+    analysis['full_keywords'] = ','.join(full_keywords)
+    return analysis
+
+def analyze_question_content(question_text, tagger=None):
+    """
+    問題文を分析してキーワードを抽出（辞書の全用語を1回の走査で検出）
+    """
+    tags = (tagger or get_default_tagger()).tag(question_text)
     
-    # 気候キーワード
-    climate_keywords = []
-    climates = ['地中海性気候', '温暖湿潤', '冷涼', '寒冷', '乾燥']
-    for climate in climates:
-        if climate in question_text:
-            climate_keywords.append(climate)
+    # 地理的キーワード・農業・産業キーワード・気候キーワード
+    geographical_keywords = tags.pop('region', [])
+    industry_keywords = tags.pop('industry', [])
+    climate_keywords = tags.pop('climate', [])
+    # 地形・人口など、その他のカテゴリ
+    other_keywords = [term for terms in tags.values() for term in terms]
     
     return {
         'question_text': question_text,
         'geographical_keywords': ','.join(geographical_keywords),
         'industry_keywords': ','.join(industry_keywords),
         'climate_keywords': ','.join(climate_keywords),
-        'full_keywords': ','.join(geographical_keywords + industry_keywords + climate_keywords)
+        'full_keywords': ','.join(geographical_keywords + industry_keywords + climate_keywords + other_keywords)
     }
 
-def update_spreadsheet_with_text_data():
+def apply_analysis(row, analysis):
     """
-    スプレッドシートに問題文データを追加
+    分析結果を問題文・キーワード列（K〜O列）に反映
     """
-    # Google Sheets API設定
-    credentials_info = {
-        "type": "service_account",
-        "project_id": "mineral-hangar-473809-r7",
-        # ... 認証情報
-    }
+    # 行を拡張
+    while len(row) < TEXT_COLUMN_START + len(TEXT_COLUMNS):
+        row.append('')
     
-    credentials = Credentials.from_service_account_info(credentials_info)
-    service = build('sheets', 'v4', credentials=credentials)
+    row[TEXT_COLUMN_START:TEXT_COLUMN_START + len(TEXT_COLUMNS)] = [
+        analysis['question_text'],
+        analysis['geographical_keywords'],
+        analysis['industry_keywords'],
+        analysis['climate_keywords'],
+        analysis['full_keywords']
+    ]
+
+def is_current_segment(segment, image_url, snapshot):
+    """切り出しが行の今の画像（画像URLのファイルのスナップショットの md5）から作られたか"""
+    if segment is None:
+        return False
+    page_md5 = lookup_md5(snapshot, to_direct_url(image_url)[0])
+    return page_md5 is not None and segment['page_md5'] == page_md5
+
+def prepare_tab(values, journal, segments=None, snapshot=None):
+    """
+    タブの値にヘッダー列を追加し、ジャーナルで完了済みの行は結果を反映する
+
+    ページから切り出した画像がある問題は、切り出した元のページが行の今の画像と同じ
+    （スナップショットの md5 と一致する）場合だけ、画像URLの代わりに切り出した画像を参照する
+    戻り値: (未処理の (行番号, 画像URL) のリスト, 完了済みでスキップした行数)
+    """
+    header = values[0]
+    while len(header) < TEXT_COLUMN_START:
+        header.append('')
+    header[TEXT_COLUMN_START:TEXT_COLUMN_START + len(TEXT_COLUMNS)] = TEXT_COLUMNS
     
-    spreadsheet_id = '17cxHniOQP2C7QKCV8nqnn3IKEcd1HwWiDgExGb6FfEE'
-    sheet_name = '2024年共通テスト地理B'
+    targets = []
+    resumed = 0
+    for i, row in enumerate(values[1:], 1):
+        if len(row) <= 8 or not row[8]:
+            continue
+        analysis = journal.get(row[0], row[8])
+        if analysis is not None:
+            apply_analysis(row, analysis)
+            resumed += 1
+        elif segments is not None and is_current_segment(segments.get(row[0]), row[8], snapshot):
+            targets.append((i, SEGMENT_URL_PREFIX + row[0]))
+        else:
+            targets.append((i, row[8]))
+    return targets, resumed
+
+def interleave(lists):
+    """各タブの対象を交互に並べる（全タブが同時に進むように）"""
+    return [item for items in itertools.zip_longest(*lists) for item in items if item is not None]
+
+def update_spreadsheet_with_text_data(spreadsheet_id=SPREADSHEET_ID, bulk=False, ocr_backend=None):
+    """
+    スプレッドシートの全年度タブに問題文データを追加
+
+    bulk: True の場合は1枚ずつではなくバッチジョブでまとめて抽出する
+    ocr_backend: OCR エンジンの名前（省略時は環境変数 OCR_BACKEND、なければ claude）
+    """
+    backend = get_backend(ocr_backend)
+    service = get_service('sheets', 'v4', scopes=SHEETS_SCOPES)
+    
+    # 年度タブを1回の spreadsheets.get で探し、1回の values.batchGet でまとめて取得
+    # （差分を取るため、書き込む列まで読む）
+    titles = list_year_tabs(service, spreadsheet_id)
+    tab_values = fetch_tab_values(service, titles, spreadsheet_id, cell_range=SHEET_RANGE)
+    
+    # ダウンロード済み画像のパックと、md5 参照用のDriveスナップショット
+    image_pack = ImagePack()
+    normalized_cache = NormalizedImageCache()
+    dedup = DuplicateIndex()
+    ocr_cache = OcrCache()
+    snapshot = open_snapshot(DEFAULT_SNAPSHOT_PATH) if os.path.exists(DEFAULT_SNAPSHOT_PATH) else None
+    # segment-exam-pages.py で切り出した問題の画像
+    segments = SegmentStore() if os.path.exists(DEFAULT_SEGMENT_DIR) else None
+    # ダミーの結果を返すエンジンの結果はジャーナルにも残さない（次回の実行で抽出し直す）
+    record_results = bulk or backend.cache_results
+    if not record_results:
+        print(f"⚠️  OCR エンジン {backend.name} はダミーの問題文を返すため、結果をキャッシュ・ジャーナルに残しません")
+    if segments is not None and snapshot is None:
+        print("⚠️  Driveスナップショットがないため、切り出した画像が今のページのものか確かめられません"
+              "（ページ全体を OCR します）")
+    
+    # タブごとの状態（前回の実行で完了した行の記録と、途中結果の書き込み）
+    tabs = {}
+    tab_targets = []
+    for title, values in tab_values.items():
+        if not values:
+            continue
+        
+        journal = OcrJournal(journal_path(spreadsheet_id, title))
+        writer = IncrementalSheetWriter(
+            service, spreadsheet_id, title, values,
+            every_rows=FLUSH_EVERY_ROWS, interval_seconds=FLUSH_INTERVAL_SECONDS
+        )
+        targets, resumed = prepare_tab(values, journal, segments, snapshot)
+        tabs[title] = {'values': values, 'journal': journal, 'writer': writer}
+        tab_targets.append([((title, i), image_url) for i, image_url in targets])
+        
+        print(f"📑 {title}（{year_from_title(title)}年）: {len(targets)}問題"
+              + (f"（完了済みの{resumed}問題をスキップ）" if resumed else ""))
+    
+    # 全タブの行を1本のパイプラインに流す（レート制限は全タブで共有）
+    targets = interleave(tab_targets)
+    print(f"{len(targets)}問題の文章を抽出中...")
+    
+    async def run():
+        # サービスの HTTP セッションはスレッドセーフではないため、書き込みは1つずつ行う
+        flush_lock = asyncio.Lock()
+        
+        async def on_result(key, analysis):
+            title, i = key
+            tab = tabs[title]
+            row = tab['values'][i]
+            apply_analysis(row, analysis)
+            
+            # 失敗した行は記録せず、次回の実行で再試行する
+            if record_results and analysis['question_text'] not in (FETCH_FAILED_TEXT, OCR_FAILED_TEXT):
+                tab['journal'].record(row[0], row[8], analysis)
+            print(f"{title} 問題{i}: 抽出完了")
+            
+            # 一定の行数・時間ごとに途中結果を差分で書き込む
+            if tab['writer'].mark_row():
+                async with flush_lock:
+                    # 書き込み中も他の行が更新されるので、この時点の内容を複製して渡す
+                    current = [list(row) for row in tab['values']]
+                    cells, ranges = await asyncio.to_thread(tab['writer'].flush, current)
+                print(f"💾 {title} の途中結果を書き込み: {cells}セル（{ranges}範囲）")
+        
+        if bulk:
+            await extract_rows_bulk(targets, image_pack, normalized_cache, snapshot, on_result, ocr_cache,
+                                    segments)
+        else:
+            await extract_rows(targets, image_pack, normalized_cache, snapshot, on_result, dedup, ocr_cache,
+                               backend, segments)
     
-    # 既存データを取得
-    result = service.spreadsheets().values().get(
-        spreadsheetId=spreadsheet_id,
-        range=f'{sheet_name}!A:J'
-    ).execute()
+    if targets:
+        asyncio.run(run())
     
-    values = result.get('values', [])
+    normalized_cache.report.print_summary()
+    if not bulk:
+        dedup.print_summary()
+        print(f"   📝 重複レポート: {dedup.write_report()}")
+    ocr_cache.print_summary()
+    ocr_cache.close()
+    backend.close()
+    normalized_cache.close()
+    image_pack.close()
+    if snapshot is not None:
+        snapshot.close()
+    if segments is not None:
+        segments.close()
     
-    # ヘッダー行を更新（新しい列を追加）
-    if len(values) > 0:
-        header = values[0]
-        # 問題文・キーワード列を追加
-        new_columns = ['問題文', '地理キーワード', '産業キーワード', '気候キーワード', '全キーワード']
-        header.extend(new_columns)
+    for title, tab in tabs.items():
+        # 最後の途中書き込み以降に変更されたセルだけを1回の batchUpdate で書き込む
+        updated_cells, updated_ranges = tab['writer'].flush(tab['values'])
+        print(f"📝 {title}: {updated_cells}セル（{updated_ranges}範囲）を更新")
         
-        # 各問題について処理
-        for i, row in enumerate(values[1:], 1):
-            if len(row) > 8 and row[8]:  # 画像URLがある場合
-                image_url = row[8]
-                print(f"問題{i}: {row[0]} の文章を抽出中...")
-                
-                # 問題文を抽出
-                question_text = extract_text_from_image_url(image_url)
-                analysis = analyze_question_content(question_text)
-                
-                # 行を拡張
-                while len(row) < len(header):
-                    row.append('')
-                
-                # 新しいデータを追加
-                row[-5] = analysis['question_text']
-                row[-4] = analysis['geographical_keywords']
-                row[-3] = analysis['industry_keywords'] 
-                row[-2] = analysis['climate_keywords']
-                row[-1] = analysis['full_keywords']
-                
-                time.sleep(1)  # API制限対策
-    
-    # スプレッドシートを更新
-    service.spreadsheets().values().update(
-        spreadsheetId=spreadsheet_id,
-        range=f'{sheet_name}!A:O',  # O列まで拡張
-        valueInputOption='RAW',
-        body={'values': values}
-    ).execute()
+        # 全ての結果をシートに書き込めたのでジャーナルは不要
+        tab['journal'].finish()
     
     print("スプレッドシート更新完了!")
 
 if __name__ == "__main__":
-    update_spreadsheet_with_text_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='問題画像から文章を抽出してスプレッドシートに追加')
+    parser.add_argument('--bulk', action='store_true',
+                        help='バッチジョブでまとめて抽出する（ANTHROPIC_BASE_URL でモックサーバーも指定できる）')
+    parser.add_argument('--ocr-backend', choices=sorted(BACKENDS),
+                        help='OCR エンジン（省略時は環境変数 OCR_BACKEND、なければ claude）')
+    args = parser.parse_args()
+    if args.bulk and args.ocr_backend not in (None, 'claude'):
+        parser.error('--bulk は claude でのみ使えます')
+    update_spreadsheet_with_text_data(bulk=args.bulk, ocr_backend=args.ocr_backend)
\ No newline at end of file
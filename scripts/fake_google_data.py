@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+ベンチマーク用の合成データ（Drive のフォルダツリー・年度タブのスプレッドシート・GAS プロジェクト）
+
+スクリプトに書かれている実際の ID（親フォルダ・スプレッドシート・GAS プロジェクト）を
+そのまま使うので、スクリプトを変更せずに偽サーバーに向けて実行できる
+"""
+
+import hashlib
+import json
+import random
+from datetime import datetime, timedelta
+
+# スクリプトに書かれている ID
+ROOT_FOLDER_ID = '1BDfVPQSQkTMABOM6Fr8qyTZIS1COhtWu'
+SPREADSHEET_ID = '17cxHniOQP2C7QKCV8nqnn3IKEcd1HwWiDgExGb6FfEE'
+SCRIPT_ID = '1uVSR--THzuhHDKePsK5kXlnL3U_6ONeVNrI3fDB4XMsS66VcyUtW6zHO'
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+
+# 既定の規模（画像10万枚・年度タブ20枚）
+DEFAULT_IMAGES = 100_000
+DEFAULT_YEARS = 20
+LAST_YEAR = 2025
+SECTIONS_PER_YEAR = 6
+
+SHEET_HEADER = ['問題ID', '大問', '分野タグ', '正答', '正答率', '配点', 'ノート', '作成日', '画像URL',
+                'OCRキーワード', '問題文']
+CATEGORIES = ['地形', '気候', '農業', '工業', '人口', '都市', '交通', '貿易', '環境', '民族']
+
+GAS_SOURCE = '''function doGet(e) {
+  return HtmlService.createHtmlOutputFromFile('index');
+}
+
+function convertImageUrl(driveUrl) {
+  if (!driveUrl) return '';
+  var match = driveUrl.match(/\\/file\\/d\\/([a-zA-Z0-9-_]+)/);
+  if (match) {
+    return 'https://drive.google.com/uc?id=' + match[1];
+  }
+  return driveUrl;
+}
+'''
+
+
+def _file_id(rng):
+    """Drive らしい33文字のID"""
+    alphabet = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
+    return '1' + ''.join(rng.choice(alphabet) for _ in range(32))
+
+
+def _modified_time(rng, base):
+    return (base + timedelta(seconds=rng.randint(0, 365 * 24 * 3600))).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+def generate_dataset(images=DEFAULT_IMAGES, years=DEFAULT_YEARS, seed=0):
+    """
+    合成データを辞書で返す
+
+    Drive: 親フォルダ / 年度 / 第N問 / 画像（画像は年度・大問に均等に配置）
+    Sheets: 年度ごとのタブに、画像1枚につき1問
+    """
+    rng = random.Random(seed)
+    base_time = datetime(2024, 1, 1)
+    year_list = list(range(LAST_YEAR - years + 1, LAST_YEAR + 1))
+
+    files = [{
+        'id': ROOT_FOLDER_ID,
+        'name': '地理問題データベース',
+        'mimeType': FOLDER_MIME_TYPE,
+        'parents': ['root'],
+        'modifiedTime': _modified_time(rng, base_time)
+    }]
+    tabs = {}
+
+    per_year = images // len(year_list)
+    extra = images % len(year_list)
+    for year_index, year in enumerate(year_list):
+        year_folder = {
+            'id': _file_id(rng),
+            'name': f'{year}年',
+            'mimeType': FOLDER_MIME_TYPE,
+            'parents': [ROOT_FOLDER_ID],
+            'modifiedTime': _modified_time(rng, base_time)
+        }
+        files.append(year_folder)
+
+        sections = []
+        for section in range(1, SECTIONS_PER_YEAR + 1):
+            folder = {
+                'id': _file_id(rng),
+                'name': f'第{section}問',
+                'mimeType': FOLDER_MIME_TYPE,
+                'parents': [year_folder['id']],
+                'modifiedTime': _modified_time(rng, base_time)
+            }
+            files.append(folder)
+            sections.append(folder)
+
+        rows = [list(SHEET_HEADER)]
+        count = per_year + (1 if year_index < extra else 0)
+        for number in range(count):
+            section = number % SECTIONS_PER_YEAR + 1
+            question = number // SECTIONS_PER_YEAR + 1
+            name = f'{year}_geo_{section}_{question}.png'
+            image = {
+                'id': _file_id(rng),
+                'name': name,
+                'mimeType': 'image/png',
+                'parents': [sections[section - 1]['id']],
+                'size': str(rng.randint(80_000, 900_000)),
+                'md5Checksum': hashlib.md5(name.encode('utf-8')).hexdigest(),
+                'modifiedTime': _modified_time(rng, base_time)
+            }
+            files.append(image)
+            rows.append([
+                f'{year}_geo_{section}_{question}',
+                f'第{section}問',
+                ','.join(rng.sample(CATEGORIES, rng.randint(1, 3))),
+                str(rng.randint(1, 4)),
+                f'{rng.randint(20, 95)}%',
+                '3',
+                '',
+                f'{year}/01/{rng.randint(10, 28)}',
+                f"https://drive.google.com/file/d/{image['id']}/view?usp=drivesdk"
+            ])
+        tabs[f'{year}年共通テスト地理B'] = rows
+
+    return {
+        'drive': {'files': files},
+        'sheets': {SPREADSHEET_ID: {'tabs': tabs}},
+        'scripts': {
+            SCRIPT_ID: {
+                'files': [
+                    {'name': 'appsscript', 'type': 'JSON', 'source': '{"timeZone": "Asia/Tokyo"}'},
+                    {'name': 'Code', 'type': 'SERVER_JS', 'source': GAS_SOURCE}
+                ]
+            }
+        }
+    }
+
+
+def save_dataset(dataset, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(dataset, f, ensure_ascii=False)
+
+
+def load_dataset(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,767 @@
+#!/usr/bin/env python3
+"""
+ベンチマーク用の Google API 偽サーバー（Drive v3 / Sheets v4 / Apps Script v1）
+
+スクリプトが使うエンドポイントだけを、合成データ（fake_google_data.py）の上で実装する。
+応答の遅延・API ごとの毎分クォータ・429 エラーの注入を設定でき、
+エンドポイントごとの呼び出し回数・ステータス・転送バイト数を集計する。
+
+google_clients.py は環境変数 GOOGLE_API_ENDPOINT が設定されていればこのサーバーに接続する。
+
+管理用エンドポイント:
+  GET  /__stats   集計結果
+  POST /__reset   集計をリセット
+  POST /__config  遅延・クォータ・エラー率を変更（JSON）
+  POST /__mutate  画像を {"modify": n} 件更新して changes に積む
+"""
+
+import argparse
+import collections
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from fake_google_data import FOLDER_MIME_TYPE, generate_dataset, load_dataset, DEFAULT_IMAGES, DEFAULT_YEARS
+
+# Drive のバッチリクエストは1回あたり100件まで
+MAX_BATCH_PARTS = 100
+QUOTA_WINDOW_SECONDS = 60
+
+DEFAULT_DRIVE_FIELDS = 'kind,id,name,mimeType'
+DEFAULT_LIST_FIELDS = 'nextPageToken,files(kind,id,name,mimeType)'
+
+
+class ApiError(Exception):
+    """Google API 形式のエラー応答"""
+
+    def __init__(self, code, message, reason, status):
+        super().__init__(message)
+        self.code = code
+        self.body = {
+            'error': {
+                'code': code,
+                'message': message,
+                'errors': [{'message': message, 'domain': 'global', 'reason': reason}],
+                'status': status
+            }
+        }
+
+
+def rate_limit_error(api):
+    return ApiError(429, f'Quota exceeded for quota metric {api} requests per minute.',
+                    'rateLimitExceeded', 'RESOURCE_EXHAUSTED')
+
+
+def not_found(what):
+    return ApiError(404, f'{what} not found.', 'notFound', 'NOT_FOUND')
+
+
+# --- fields パラメータ --------------------------------------------------------
+
+def lower_headers(headers):
+    """ヘッダー名の大文字小文字を区別せずに引けるよう、キーを小文字に揃える"""
+    return {key.lower(): value for key, value in headers.items()}
+
+
+def _split_top_level(text):
+    """括弧の外のカンマで分割"""
+    parts, depth, current = [], 0, ''
+    for char in text:
+        if char == ',' and depth == 0:
+            parts.append(current)
+            current = ''
+            continue
+        depth += (char == '(') - (char == ')')
+        current += char
+    parts.append(current)
+    return [part.strip() for part in parts if part.strip()]
+
+
+def _merge(tree, other):
+    if tree is None or other is None:
+        return None
+    merged = dict(tree)
+    for key, value in other.items():
+        merged[key] = _merge(merged[key], value) if key in merged else value
+    return merged
+
+
+def parse_fields(fields):
+    """'a,b(c,d),e.f' を {'a': None, 'b': {'c': None, 'd': None}, 'e': {'f': None}} にする"""
+    tree = {}
+    for part in _split_top_level(fields):
+        paren = part.find('(')
+        dot = part.find('.')
+        if dot != -1 and (paren == -1 or dot < paren):
+            name, sub = part[:dot], parse_fields(part[dot + 1:])
+        elif paren != -1:
+            name, sub = part[:paren], parse_fields(part[paren + 1:part.rindex(')')])
+        else:
+            name, sub = part, None
+        tree[name] = _merge(tree[name], sub) if name in tree else sub
+    return tree
+
+
+def project(value, tree):
+    """fields の木に含まれる項目だけを残す"""
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [project(item, tree) for item in value]
+    if isinstance(value, dict):
+        return {key: project(value[key], sub) for key, sub in tree.items() if key in value}
+    return value
+
+
+# --- A1 表記 ------------------------------------------------------------------
+
+A1_CELLS = re.compile(r'^([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?$')
+
+
+def _column_index(letters):
+    index = 0
+    for char in letters:
+        index = index * 26 + ord(char) - ord('A') + 1
+    return index - 1
+
+
+def parse_a1(range_text, default_sheet):
+    """A1 表記を (タブ名, 開始行, 開始列, 終了行, 終了列) にする（0始まり・終了は含まない・None は端まで）"""
+    if '!' in range_text:
+        sheet, cells = range_text.rsplit('!', 1)
+    elif A1_CELLS.match(range_text.upper()):
+        # タブ名のない範囲は最初のタブ
+        sheet, cells = '', range_text
+    else:
+        sheet, cells = range_text, ''
+    if sheet.startswith("'") and sheet.endswith("'"):
+        sheet = sheet[1:-1].replace("''", "'")
+    if not sheet:
+        sheet = default_sheet
+
+    match = A1_CELLS.match(cells.upper()) if cells else None
+    if not match:
+        return sheet, 0, 0, None, None
+    start_col, start_row, end_col, end_row = match.groups()
+    if end_col is None and end_row is None:
+        end_col, end_row = start_col, start_row
+    return (
+        sheet,
+        int(start_row) - 1 if start_row else 0,
+        _column_index(start_col) if start_col else 0,
+        int(end_row) if end_row else None,
+        _column_index(end_col) + 1 if end_col else None
+    )
+
+
+# --- 偽サーバー本体 -------------------------------------------------------------
+
+class FakeGoogleServer:
+    """合成データの上で Drive / Sheets / Apps Script の API に応答するサーバー"""
+
+    def __init__(self, dataset, latency_ms=0, latency_jitter_ms=0, batch_item_latency_ms=0,
+                 quotas=None, error_rate=0.0, host='127.0.0.1', port=0, seed=0):
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.batch_item_latency_ms = batch_item_latency_ms
+        self.quotas = dict(quotas or {})   # API名 → 毎分のリクエスト数
+        self.error_rate = error_rate       # ランダムに 429 を返す割合
+        self.rng = random.Random(seed)
+        self.lock = threading.RLock()
+
+        self._load(dataset)
+        self.reset_stats()
+
+        server = self
+        self.httpd = ThreadingHTTPServer((host, port), type('Handler', (_Handler,), {'fake': server}))
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    def _load(self, dataset):
+        self.files = {item['id']: dict(item) for item in dataset['drive']['files']}
+        self.children = collections.defaultdict(list)
+        for item in dataset['drive']['files']:
+            for parent_id in item.get('parents', []):
+                self.children[parent_id].append(item['id'])
+        self.permissions = collections.defaultdict(list)
+        self.changes = []
+        self.spreadsheets = {
+            spreadsheet_id: {title: [list(row) for row in rows] for title, rows in sheet['tabs'].items()}
+            for spreadsheet_id, sheet in dataset['sheets'].items()
+        }
+        self.scripts = {script_id: dict(script) for script_id, script in dataset['scripts'].items()}
+        self.deployments = collections.defaultdict(list)
+        self.quota_windows = collections.defaultdict(collections.deque)
+
+    # --- 起動・停止 ---
+
+    @property
+    def endpoint(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self.endpoint
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --- 設定・集計 ---
+
+    def configure(self, latency_ms=None, latency_jitter_ms=None, batch_item_latency_ms=None,
+                  quotas=None, error_rate=None):
+        with self.lock:
+            if latency_ms is not None:
+                self.latency_ms = latency_ms
+            if latency_jitter_ms is not None:
+                self.latency_jitter_ms = latency_jitter_ms
+            if batch_item_latency_ms is not None:
+                self.batch_item_latency_ms = batch_item_latency_ms
+            if quotas is not None:
+                self.quotas = dict(quotas)
+            if error_rate is not None:
+                self.error_rate = error_rate
+
+    def reset_stats(self):
+        with self.lock:
+            self.http_stats = {'requests': 0, 'bytes_in': 0, 'bytes_out': 0}
+            # バッチリクエストごとの件数（API名 → 件数のリスト）
+            self.batch_sizes = collections.defaultdict(list)
+            self.endpoint_stats = collections.defaultdict(
+                lambda: {'calls': 0, 'bytes_out': 0, 'status': collections.Counter()})
+
+    def stats(self):
+        with self.lock:
+            endpoints = {
+                name: {'calls': stat['calls'], 'bytes_out': stat['bytes_out'], 'status': dict(stat['status'])}
+                for name, stat in sorted(self.endpoint_stats.items())
+            }
+            return {
+                'http': dict(self.http_stats),
+                'api_calls': sum(stat['calls'] for name, stat in endpoints.items() if not name.endswith('.batch')),
+                'rate_limited': sum(stat['status'].get(429, 0) for stat in endpoints.values()),
+                'batch_sizes': {api: list(sizes) for api, sizes in self.batch_sizes.items()},
+                'endpoints': endpoints
+            }
+
+    def _record(self, name, status, bytes_out):
+        with self.lock:
+            stat = self.endpoint_stats[name]
+            stat['calls'] += 1
+            stat['bytes_out'] += bytes_out
+            stat['status'][status] += 1
+
+    def _sleep(self, extra_ms=0):
+        with self.lock:
+            delay = self.latency_ms + extra_ms
+            if self.latency_jitter_ms:
+                delay += self.rng.uniform(-self.latency_jitter_ms, self.latency_jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def _check_quota(self, api):
+        """毎分のクォータと 429 の注入"""
+        with self.lock:
+            if self.error_rate and self.rng.random() < self.error_rate:
+                raise rate_limit_error(api)
+            limit = self.quotas.get(api)
+            if not limit:
+                return
+            now = time.monotonic()
+            window = self.quota_windows[api]
+            while window and now - window[0] >= QUOTA_WINDOW_SECONDS:
+                window.popleft()
+            if len(window) >= limit:
+                raise rate_limit_error(api)
+            window.append(now)
+
+    # --- ルーティング ---
+
+    def handle(self, method, raw_path, headers, body):
+        """1つの API リクエストを処理して (ステータス, 応答ヘッダー, 応答本文) を返す
+
+        headers のキーは小文字に揃えて渡す（httplib2 は content-type を小文字で送る）。
+        """
+        url = urlsplit(raw_path)
+        path = url.path
+        query = parse_qs(url.query, keep_blank_values=True)
+
+        if path.startswith('/batch'):
+            return self._handle_batch(path, headers, body)
+
+        # URL が長すぎる GET は、googleapiclient がクエリを本文に移した POST で送ってくる
+        override = headers.get('x-http-method-override')
+        if method == 'POST' and override:
+            method = override
+            if headers.get('content-type', '').startswith('application/x-www-form-urlencoded'):
+                query.update(parse_qs(body.decode('utf-8'), keep_blank_values=True))
+                body = b''
+
+        route = self._route(method, path)
+        if route is None:
+            return self._error_response('unknown', ApiError(404, f'{method} {path} is not implemented.',
+                                                           'notFound', 'NOT_FOUND'))
+        name, api, handler, args = route
+        try:
+            self._check_quota(api)
+            payload = json.loads(body) if body else {}
+            with self.lock:
+                result = handler(query, payload, *args)
+        except ApiError as error:
+            return self._error_response(name, error)
+
+        data = json.dumps(result, ensure_ascii=False).encode('utf-8')
+        self._record(name, 200, len(data))
+        return 200, {'Content-Type': 'application/json; charset=UTF-8'}, data
+
+    def _error_response(self, name, error):
+        data = json.dumps(error.body).encode('utf-8')
+        self._record(name, error.code, len(data))
+        return error.code, {'Content-Type': 'application/json; charset=UTF-8'}, data
+
+    def _route(self, method, path):
+        routes = [
+            ('GET', r'/drive/v3/files', 'drive.files.list', 'drive', self._drive_list),
+            ('GET', r'/drive/v3/files/([^/]+)', 'drive.files.get', 'drive', self._drive_get),
+            ('POST', r'/drive/v3/files/([^/]+)/permissions', 'drive.permissions.create', 'drive',
+             self._drive_create_permission),
+            ('GET', r'/drive/v3/files/([^/]+)/permissions', 'drive.permissions.list', 'drive',
+             self._drive_list_permissions),
+            ('GET', r'/drive/v3/changes/startPageToken', 'drive.changes.getStartPageToken', 'drive',
+             self._drive_start_page_token),
+            ('GET', r'/drive/v3/changes', 'drive.changes.list', 'drive', self._drive_changes),
+            ('GET', r'/v4/spreadsheets/([^/]+)', 'sheets.spreadsheets.get', 'sheets', self._sheets_get),
+            ('GET', r'/v4/spreadsheets/([^/]+)/values:batchGet', 'sheets.values.batchGet', 'sheets',
+             self._sheets_batch_get),
+            ('POST', r'/v4/spreadsheets/([^/]+)/values:batchUpdate', 'sheets.values.batchUpdate', 'sheets',
+             self._sheets_batch_update),
+            ('GET', r'/v4/spreadsheets/([^/]+)/values/([^/]+)', 'sheets.values.get', 'sheets',
+             self._sheets_values_get),
+            ('PUT', r'/v4/spreadsheets/([^/]+)/values/([^/]+)', 'sheets.values.update', 'sheets',
+             self._sheets_values_update),
+            ('POST', r'/v1/projects', 'script.projects.create', 'script', self._script_create),
+            ('GET', r'/v1/projects/([^/]+)/content', 'script.projects.getContent', 'script',
+             self._script_get_content),
+            ('PUT', r'/v1/projects/([^/]+)/content', 'script.projects.updateContent', 'script',
+             self._script_update_content),
+            ('POST', r'/v1/projects/([^/]+)/versions', 'script.projects.versions.create', 'script',
+             self._script_create_version),
+            ('POST', r'/v1/projects/([^/]+)/deployments', 'script.projects.deployments.create', 'script',
+             self._script_create_deployment),
+            ('GET', r'/v1/projects/([^/]+)/deployments', 'script.projects.deployments.list', 'script',
+             self._script_list_deployments),
+            ('POST', r'/v1/scripts/([^/]+):run', 'script.scripts.run', 'script', self._script_run),
+        ]
+        for route_method, pattern, name, api, handler in routes:
+            match = re.fullmatch(pattern, path)
+            if route_method == method and match:
+                return name, api, handler, [unquote(group) for group in match.groups()]
+        return None
+
+    # --- バッチ ---
+
+    def _handle_batch(self, path, headers, body):
+        """multipart/mixed のバッチリクエストを分解して1件ずつ処理する"""
+        match = re.search(r'boundary="?([^";]+)"?', headers.get('content-type', ''))
+        if not match:
+            return self._error_response('batch', ApiError(400, 'Missing boundary.', 'badRequest', 'INVALID_ARGUMENT'))
+        boundary = match.group(1)
+        text = body.decode('utf-8').replace('\r\n', '\n')
+        parts = [part.strip('\n') for part in text.split(f'--{boundary}')[1:]]
+        parts = [part for part in parts if part and part != '--']
+
+        api = 'drive' if path.startswith('/batch/drive') else 'sheets'
+        if len(parts) > MAX_BATCH_PARTS:
+            return self._error_response(f'{api}.batch', ApiError(
+                400, f'A batch request cannot contain more than {MAX_BATCH_PARTS} requests.',
+                'batchSizeTooLarge', 'INVALID_ARGUMENT'))
+
+        with self.lock:
+            self.batch_sizes[api].append(len(parts))
+        self._sleep(self.batch_item_latency_ms * len(parts))
+        response_boundary = f'batch_{self.rng.getrandbits(64):016x}'
+        chunks = []
+        for part in parts:
+            part_headers, _, http_request = part.partition('\n\n')
+            # email パッケージは長い Content-ID を折り返して送るので、1行に戻してから読む
+            part_headers = re.sub(r'\n[ \t]+', ' ', part_headers)
+            content_id = re.search(r'Content-ID:\s*<([^>]*)>', part_headers, re.IGNORECASE)
+            request_head, _, request_body = http_request.partition('\n\n')
+            request_lines = request_head.split('\n')
+            method, request_path = request_lines[0].split(' ')[:2]
+            inner_headers = lower_headers(dict(line.split(': ', 1) for line in request_lines[1:] if ': ' in line))
+
+            status, _, data = self.handle(method, request_path, inner_headers, request_body.encode('utf-8'))
+            chunks.append(
+                f'--{response_boundary}\r\n'
+                f'Content-Type: application/http\r\n'
+                f'Content-ID: <response-{content_id.group(1) if content_id else ""}>\r\n\r\n'
+                f'HTTP/1.1 {status} {"OK" if status == 200 else "Error"}\r\n'
+                f'Content-Type: application/json; charset=UTF-8\r\n\r\n'
+                f'{data.decode("utf-8")}\r\n'
+            )
+        chunks.append(f'--{response_boundary}--\r\n')
+        data = ''.join(chunks).encode('utf-8')
+        self._record(f'{api}.batch', 200, len(data))
+        return 200, {'Content-Type': f'multipart/mixed; boundary={response_boundary}'}, data
+
+    # --- Drive v3 ---
+
+    def _drive_item(self, file_id):
+        item = dict(self.files[file_id])
+        item['kind'] = 'drive#file'
+        item['permissions'] = list(self.permissions[file_id])
+        return item
+
+    def _drive_list(self, query, payload):
+        q = query.get('q', [''])[0]
+        parents = re.findall(r"'([^']+)' in parents", q)
+        mime_equals = re.search(r"mimeType\s*=\s*'([^']+)'", q)
+        mime_not_equals = re.search(r"mimeType\s*!=\s*'([^']+)'", q)
+        mime_contains = re.search(r"mimeType\s+contains\s+'([^']+)'", q)
+        name_contains = re.search(r"name\s+contains\s+'([^']+)'", q)
+
+        candidates = [child for parent in parents for child in self.children.get(parent, [])] if parents \
+            else list(self.files)
+        matched = []
+        for file_id in candidates:
+            item = self.files[file_id]
+            if mime_equals and item['mimeType'] != mime_equals.group(1):
+                continue
+            if mime_not_equals and item['mimeType'] == mime_not_equals.group(1):
+                continue
+            if mime_contains and mime_contains.group(1) not in item['mimeType']:
+                continue
+            if name_contains and name_contains.group(1) not in item['name']:
+                continue
+            matched.append(file_id)
+
+        page_size = min(int(query.get('pageSize', ['100'])[0]), 1000)
+        offset = int(query.get('pageToken', ['0'])[0] or 0)
+        page = matched[offset:offset + page_size]
+        result = {'kind': 'drive#fileList', 'files': [self._drive_item(file_id) for file_id in page]}
+        if offset + page_size < len(matched):
+            result['nextPageToken'] = str(offset + page_size)
+        return project(result, parse_fields(query.get('fields', [DEFAULT_LIST_FIELDS])[0]))
+
+    def _drive_get(self, query, payload, file_id):
+        if file_id not in self.files:
+            raise not_found(f'File: {file_id}')
+        return project(self._drive_item(file_id), parse_fields(query.get('fields', [DEFAULT_DRIVE_FIELDS])[0]))
+
+    def _record_change(self, file_id):
+        self.changes.append({
+            'kind': 'drive#change',
+            'changeType': 'file',
+            'fileId': file_id,
+            'removed': False,
+            'time': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+            'file': self._drive_item(file_id)
+        })
+
+    def _drive_create_permission(self, query, payload, file_id):
+        if file_id not in self.files:
+            raise not_found(f'File: {file_id}')
+        permission = {
+            'kind': 'drive#permission',
+            'id': 'anyoneWithLink' if payload.get('type') == 'anyone' else f'perm{len(self.permissions[file_id])}',
+            'type': payload.get('type'),
+            'role': payload.get('role')
+        }
+        self.permissions[file_id].append(permission)
+        self._record_change(file_id)
+        return project(permission, parse_fields(query.get('fields', ['kind,id,type,role'])[0]))
+
+    def _drive_list_permissions(self, query, payload, file_id):
+        if file_id not in self.files:
+            raise not_found(f'File: {file_id}')
+        result = {'kind': 'drive#permissionList', 'permissions': list(self.permissions[file_id])}
+        return project(result, parse_fields(query.get('fields', ['kind,permissions'])[0]))
+
+    def _drive_start_page_token(self, query, payload):
+        return {'kind': 'drive#startPageToken', 'startPageToken': str(len(self.changes) + 1)}
+
+    def _drive_changes(self, query, payload):
+        start = int(query.get('pageToken', ['1'])[0]) - 1
+        page_size = min(int(query.get('pageSize', ['100'])[0]), 1000)
+        page = self.changes[start:start + page_size]
+        result = {'kind': 'drive#changeList', 'changes': page}
+        if start + page_size < len(self.changes):
+            result['nextPageToken'] = str(start + page_size + 1)
+        else:
+            result['newStartPageToken'] = str(len(self.changes) + 1)
+        return project(result, parse_fields(query.get('fields', ['*'])[0])) \
+            if query.get('fields') else result
+
+    def mutate(self, modify=0):
+        """画像を modify 件更新し、changes に積む（差分同期のベンチマーク用）"""
+        with self.lock:
+            images = [file_id for file_id, item in self.files.items() if item['mimeType'] != FOLDER_MIME_TYPE]
+            for file_id in self.rng.sample(images, min(modify, len(images))):
+                self.files[file_id]['modifiedTime'] = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+                self._record_change(file_id)
+            return {'changes': len(self.changes)}
+
+    # --- Sheets v4 ---
+
+    def _spreadsheet(self, spreadsheet_id):
+        if spreadsheet_id not in self.spreadsheets:
+            raise not_found(f'Spreadsheet: {spreadsheet_id}')
+        return self.spreadsheets[spreadsheet_id]
+
+    def _sheets_get(self, query, payload, spreadsheet_id):
+        tabs = self._spreadsheet(spreadsheet_id)
+        result = {
+            'spreadsheetId': spreadsheet_id,
+            'properties': {'title': '共通テスト地理問題データベース', 'locale': 'ja_JP'},
+            'sheets': [
+                {'properties': {
+                    'sheetId': index,
+                    'title': title,
+                    'index': index,
+                    'sheetType': 'GRID',
+                    'gridProperties': {'rowCount': max(len(rows), 1000),
+                                       'columnCount': max((len(row) for row in rows), default=26)}
+                }}
+                for index, (title, rows) in enumerate(tabs.items())
+            ]
+        }
+        fields = query.get('fields')
+        return project(result, parse_fields(fields[0])) if fields else result
+
+    def _read_range(self, spreadsheet_id, range_text):
+        tabs = self._spreadsheet(spreadsheet_id)
+        sheet, start_row, start_col, end_row, end_col = parse_a1(range_text, next(iter(tabs)))
+        if sheet not in tabs:
+            raise ApiError(400, f'Unable to parse range: {range_text}', 'badRequest', 'INVALID_ARGUMENT')
+        rows = [row[start_col:end_col] for row in tabs[sheet][start_row:end_row]]
+        # 実際の API と同じく、末尾の空セル・空行は返さない
+        for row in rows:
+            while row and row[-1] == '':
+                row.pop()
+        while rows and not rows[-1]:
+            rows.pop()
+        value_range = {'range': range_text, 'majorDimension': 'ROWS'}
+        if rows:
+            value_range['values'] = rows
+        return value_range
+
+    def _sheets_values_get(self, query, payload, spreadsheet_id, range_text):
+        return self._read_range(spreadsheet_id, range_text)
+
+    def _sheets_batch_get(self, query, payload, spreadsheet_id):
+        result = {
+            'spreadsheetId': spreadsheet_id,
+            'valueRanges': [self._read_range(spreadsheet_id, range_text) for range_text in query.get('ranges', [])]
+        }
+        fields = query.get('fields')
+        return project(result, parse_fields(fields[0])) if fields else result
+
+    def _write_range(self, spreadsheet_id, range_text, values):
+        tabs = self._spreadsheet(spreadsheet_id)
+        sheet, start_row, start_col, _, _ = parse_a1(range_text, next(iter(tabs)))
+        if sheet not in tabs:
+            raise ApiError(400, f'Unable to parse range: {range_text}', 'badRequest', 'INVALID_ARGUMENT')
+        rows = tabs[sheet]
+        cells = 0
+        for row_offset, row_values in enumerate(values):
+            row_index = start_row + row_offset
+            while len(rows) <= row_index:
+                rows.append([])
+            row = rows[row_index]
+            for col_offset, value in enumerate(row_values):
+                col_index = start_col + col_offset
+                while len(row) <= col_index:
+                    row.append('')
+                row[col_index] = '' if value is None else str(value)
+                cells += 1
+        return {
+            'spreadsheetId': spreadsheet_id,
+            'updatedRange': range_text,
+            'updatedRows': len(values),
+            'updatedColumns': max((len(row) for row in values), default=0),
+            'updatedCells': cells
+        }
+
+    def _sheets_values_update(self, query, payload, spreadsheet_id, range_text):
+        return self._write_range(spreadsheet_id, range_text, payload.get('values', []))
+
+    def _sheets_batch_update(self, query, payload, spreadsheet_id):
+        responses = [self._write_range(spreadsheet_id, data['range'], data.get('values', []))
+                     for data in payload.get('data', [])]
+        return {
+            'spreadsheetId': spreadsheet_id,
+            'totalUpdatedRows': sum(response['updatedRows'] for response in responses),
+            'totalUpdatedColumns': sum(response['updatedColumns'] for response in responses),
+            'totalUpdatedCells': sum(response['updatedCells'] for response in responses),
+            'totalUpdatedSheets': len({parse_a1(data['range'], '')[0] for data in payload.get('data', [])}),
+            'responses': responses
+        }
+
+    # --- Apps Script v1 ---
+
+    def _script(self, script_id):
+        if script_id not in self.scripts:
+            raise not_found(f'Script: {script_id}')
+        return self.scripts[script_id]
+
+    def _script_create(self, query, payload):
+        script_id = f'1fake{self.rng.getrandbits(128):032x}'
+        self.scripts[script_id] = {'title': payload.get('title', ''), 'files': []}
+        return {'scriptId': script_id, 'title': payload.get('title', '')}
+
+    def _script_get_content(self, query, payload, script_id):
+        return {'scriptId': script_id, 'files': self._script(script_id)['files']}
+
+    def _script_update_content(self, query, payload, script_id):
+        self._script(script_id)['files'] = payload.get('files', [])
+        return {'scriptId': script_id, 'files': payload.get('files', [])}
+
+    def _script_create_version(self, query, payload, script_id):
+        script = self._script(script_id)
+        script['version'] = script.get('version', 0) + 1
+        return {'scriptId': script_id, 'versionNumber': script['version'],
+                'description': payload.get('description', '')}
+
+    def _script_create_deployment(self, query, payload, script_id):
+        self._script(script_id)
+        deployment = {
+            'deploymentId': f'AKfy{self.rng.getrandbits(160):040x}',
+            'deploymentConfig': dict(payload.get('deploymentConfig', {}), scriptId=script_id)
+        }
+        self.deployments[script_id].append(deployment)
+        return deployment
+
+    def _script_list_deployments(self, query, payload, script_id):
+        self._script(script_id)
+        return {'deployments': self.deployments[script_id]}
+
+    def _script_run(self, query, payload, script_id):
+        self._script(script_id)
+        return {
+            'done': True,
+            'response': {
+                '@type': 'type.googleapis.com/google.apps.script.v1.ExecutionResponse',
+                'result': f"{payload.get('function')} executed"
+            }
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """HTTP/1.1（keep-alive）で FakeGoogleServer に処理を渡す"""
+
+    protocol_version = 'HTTP/1.1'
+    fake = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _dispatch(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        fake = self.fake
+        with fake.lock:
+            fake.http_stats['requests'] += 1
+            fake.http_stats['bytes_in'] += len(self.requestline) + len(str(self.headers)) + len(body)
+
+        if self.path.startswith('/__'):
+            status, headers, data = self._admin(method, body)
+        else:
+            fake._sleep()
+            status, headers, data = fake.handle(method, self.path, lower_headers(self.headers), body)
+
+        with fake.lock:
+            fake.http_stats['bytes_out'] += len(data)
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _admin(self, method, body):
+        fake = self.fake
+        payload = json.loads(body) if body else {}
+        path = urlsplit(self.path).path
+        if path == '/__stats':
+            result = fake.stats()
+        elif path == '/__reset' and method == 'POST':
+            fake.reset_stats()
+            result = {'ok': True}
+        elif path == '/__config' and method == 'POST':
+            fake.configure(**payload)
+            result = {'ok': True}
+        elif path == '/__mutate' and method == 'POST':
+            result = fake.mutate(**payload)
+        else:
+            return 404, {'Content-Type': 'application/json'}, b'{"error": "not found"}'
+        return 200, {'Content-Type': 'application/json'}, json.dumps(result, ensure_ascii=False).encode('utf-8')
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def do_PATCH(self):
+        self._dispatch('PATCH')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+
+def parse_quotas(values):
+    """['drive=12000', 'sheets=300'] を {'drive': 12000, 'sheets': 300} にする"""
+    quotas = {}
+    for value in values or []:
+        api, _, limit = value.partition('=')
+        quotas[api] = int(limit)
+    return quotas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Google API 偽サーバー（ベンチマーク用）')
+    parser.add_argument('--data', help='fake_google_data の JSON（省略時は生成）')
+    parser.add_argument('--images', type=int, default=DEFAULT_IMAGES)
+    parser.add_argument('--years', type=int, default=DEFAULT_YEARS)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--batch-item-latency-ms', type=float, default=0)
+    parser.add_argument('--quota', action='append', help='API ごとの毎分クォータ（例: sheets=300）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='ランダムに 429 を返す割合')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    dataset = load_dataset(args.data) if args.data else generate_dataset(args.images, args.years)
+    server = FakeGoogleServer(
+        dataset, latency_ms=args.latency_ms, latency_jitter_ms=args.jitter_ms,
+        batch_item_latency_ms=args.batch_item_latency_ms, quotas=parse_quotas(args.quota),
+        error_rate=args.error_rate, port=args.port
+    )
+    print(f"🧪 偽サーバーを起動しました: {server.endpoint}")
+    print(f"   export GOOGLE_API_ENDPOINT={server.endpoint}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
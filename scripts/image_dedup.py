@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+知覚ハッシュ（pHash・dHash）による問題画像の重複検出
+
+同じ地図・図表の再アップロードや再スキャン、小問間で共有される図を1つのクラスタにまとめ、
+OCR はクラスタごとに1回だけ行う。
+
+- md5 が同じ画像は完全一致
+- pHash・dHash のハミング距離がどちらも閾値以下で、縮小画像の画素差も小さいものは準重複
+  （文字だけの問題画像はレイアウトが似ているので、ハッシュだけでは判定しない）
+
+ハッシュの近傍検索には BK-tree を使う。
+"""
+
+import io
+import json
+from collections import namedtuple
+import numpy as np
+from PIL import Image
+
+DEFAULT_REPORT_PATH = '/Users/shun/geography-image-pack/dedup-report.json'
+
+# ハッシュは 8×8 = 64ビット
+HASH_SIZE = 8
+# pHash の DCT をかける縮小画像の一辺
+PHASH_IMAGE_SIZE = 32
+# 画素差で確認するための縮小画像の一辺
+THUMBNAIL_SIZE = 64
+
+# 準重複とみなす閾値（ハミング距離は 64ビット中のビット数、画素差は 0〜255 の平均絶対差）
+PHASH_MAX_DISTANCE = 6
+DHASH_MAX_DISTANCE = 8
+THUMBNAIL_MAX_DIFFERENCE = 12.0
+
+Fingerprint = namedtuple('Fingerprint', ['md5', 'phash', 'dhash', 'thumbnail'])
+
+
+def _dct_matrix(size):
+    """DCT-II の変換行列"""
+    k = np.arange(size)[:, None]
+    n = np.arange(size)[None, :]
+    matrix = np.cos(np.pi * (2 * n + 1) * k / (2 * size)) * np.sqrt(2 / size)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+_DCT = _dct_matrix(PHASH_IMAGE_SIZE)
+
+
+def _to_int(bits):
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), 'big')
+
+
+def dhash(gray):
+    """(HASH_SIZE, HASH_SIZE + 1) のグレースケール画像の横方向の輝度勾配ハッシュ"""
+    return _to_int(gray[:, 1:] > gray[:, :-1])
+
+
+def phash(gray):
+    """(PHASH_IMAGE_SIZE, PHASH_IMAGE_SIZE) のグレースケール画像の DCT 低周波成分のハッシュ"""
+    coefficients = _DCT @ gray @ _DCT.T
+    low = coefficients[:HASH_SIZE, :HASH_SIZE]
+    # 直流成分（全体の明るさ）は除いて中央値を求める
+    median = np.median(low.ravel()[1:])
+    return _to_int(low > median)
+
+
+def image_fingerprint(data, md5=None):
+    """画像のバイト列から指紋（md5・pHash・dHash・縮小画像）を計算"""
+    image = Image.open(io.BytesIO(bytes(data))).convert('L')
+
+    def resized(width, height):
+        return np.asarray(image.resize((width, height), Image.LANCZOS), dtype=np.float32)
+
+    return Fingerprint(
+        md5=md5,
+        phash=phash(resized(PHASH_IMAGE_SIZE, PHASH_IMAGE_SIZE)),
+        dhash=dhash(resized(HASH_SIZE + 1, HASH_SIZE)),
+        thumbnail=resized(THUMBNAIL_SIZE, THUMBNAIL_SIZE).astype(np.uint8)
+    )
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class BKTree:
+    """ハミング距離の BK-tree（距離 d 以内のハッシュを全件比較せずに探す）"""
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, value, item):
+        self.size += 1
+        node = [value, [item], {}]
+        if self.root is None:
+            self.root = node
+            return
+        current = self.root
+        while True:
+            distance = hamming(value, current[0])
+            if distance == 0:
+                current[1].append(item)
+                return
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def search(self, value, max_distance):
+        """距離 max_distance 以内の (距離, 項目) を近い順に返す"""
+        found = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node_value, items, children = stack.pop()
+            distance = hamming(value, node_value)
+            if distance <= max_distance:
+                found.extend((distance, item) for item in items)
+            # 三角不等式により、子の距離が [d - max, d + max] の枝だけを調べればよい
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        found.sort(key=lambda pair: pair[0])
+        return found
+
+
+class DuplicateIndex:
+    """画像をクラスタに分け、OCR を省略できた数を集計する"""
+
+    def __init__(self, phash_max_distance=PHASH_MAX_DISTANCE, dhash_max_distance=DHASH_MAX_DISTANCE,
+                 thumbnail_max_difference=THUMBNAIL_MAX_DIFFERENCE):
+        self.phash_max_distance = phash_max_distance
+        self.dhash_max_distance = dhash_max_distance
+        self.thumbnail_max_difference = thumbnail_max_difference
+        self.tree = BKTree()
+        self.by_md5 = {}
+        self.clusters = []
+        self.reused = 0
+
+    def _near_duplicate(self, fingerprint):
+        """準重複の代表画像のクラスタ番号と距離を返す（なければ None）"""
+        for distance, cluster_id in self.tree.search(fingerprint.phash, self.phash_max_distance):
+            leader = self.clusters[cluster_id]['fingerprint']
+            if hamming(fingerprint.dhash, leader.dhash) > self.dhash_max_distance:
+                continue
+            difference = float(np.abs(fingerprint.thumbnail.astype(np.int16) - leader.thumbnail).mean())
+            if difference <= self.thumbnail_max_difference:
+                return cluster_id, distance
+        return None
+
+    def assign(self, key, fingerprint):
+        """
+        画像をクラスタに割り当て、(クラスタ番号, 代表画像かどうか) を返す
+
+        代表画像になったものだけを OCR し、他のメンバーはその結果を使う
+        """
+        cluster_id = self.by_md5.get(fingerprint.md5) if fingerprint.md5 else None
+        kind, distance = 'exact', 0
+        if cluster_id is None:
+            match = self._near_duplicate(fingerprint)
+            if match is not None:
+                (cluster_id, distance), kind = match, 'near'
+
+        if cluster_id is None:
+            cluster_id = len(self.clusters)
+            self.clusters.append({'leader': key, 'fingerprint': fingerprint, 'members': []})
+            self.tree.add(fingerprint.phash, cluster_id)
+            if fingerprint.md5:
+                self.by_md5[fingerprint.md5] = cluster_id
+            return cluster_id, True
+
+        self.clusters[cluster_id]['members'].append({'key': key, 'kind': kind, 'distance': distance})
+        if fingerprint.md5:
+            self.by_md5.setdefault(fingerprint.md5, cluster_id)
+        return cluster_id, False
+
+    def record_reuse(self):
+        """代表画像の OCR 結果を使った（OCR を1回省略した）"""
+        self.reused += 1
+
+    def summary(self):
+        members = [member for cluster in self.clusters for member in cluster['members']]
+        return {
+            'images': len(self.clusters) + len(members),
+            'clusters': len(self.clusters),
+            'exact_duplicates': sum(1 for member in members if member['kind'] == 'exact'),
+            'near_duplicates': sum(1 for member in members if member['kind'] == 'near'),
+            'ocr_calls_saved': self.reused,
+            'duplicate_clusters': [
+                {'leader': str(cluster['leader']),
+                 'members': [dict(member, key=str(member['key'])) for member in cluster['members']]}
+                for cluster in self.clusters if cluster['members']
+            ]
+        }
+
+    def print_summary(self):
+        summary = self.summary()
+        print(f"\n🪞 重複画像: {summary['images']}枚 → {summary['clusters']}クラスタ"
+              f"（完全一致 {summary['exact_duplicates']}枚・準重複 {summary['near_duplicates']}枚）")
+        print(f"   省略した OCR: {summary['ocr_calls_saved']}回")
+
+    def write_report(self, path=DEFAULT_REPORT_PATH):
+        """重複のあったクラスタの一覧を JSON で書き出す"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+        return path
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+OCR に送る前の問題画像の正規化
+
+長辺の縮小、（安全な場合の）グレースケール化、傾き補正とコントラスト補正を行い、
+コンパクトな形式で再エンコードする。結果は元画像のハッシュと設定ごとにキャッシュする。
+"""
+
+import hashlib
+import io
+import json
+import time
+import numpy as np
+from PIL import Image
+from image_pack import ImagePack
+
+DEFAULT_CACHE_DIR = '/Users/shun/geography-image-pack/normalized'
+
+DEFAULT_SETTINGS = {
+    'max_edge': 1600,      # 長辺の最大ピクセル数
+    'format': 'WEBP',      # 再エンコード形式
+    'quality': 80,         # 再エンコード品質
+    'grayscale': True,     # 色の少ない画像はグレースケールにする
+    'deskew': True,        # 傾き補正
+    'contrast': True,      # コントラスト補正
+}
+
+# チャンネル間の平均差がこれ以下ならグレースケール化しても情報を失わない
+GRAYSCALE_CHROMA_THRESHOLD = 8
+# 傾き補正で探索する角度（度）
+MAX_SKEW_ANGLE = 5.0
+SKEW_ANGLE_STEP = 0.5
+# 傾き推定に使う暗いピクセルの最大数
+MAX_SKEW_POINTS = 100_000
+
+
+def settings_key(settings):
+    """設定を安定した文字列にする（キャッシュキー用）"""
+    return json.dumps(settings, sort_keys=True, separators=(',', ':'))
+
+
+def is_grayscale_safe(rgb):
+    """色の情報がほとんどない（地図の色分けなどがない）画像かどうか"""
+    rgb = rgb.astype(np.int16)
+    chroma = np.abs(rgb - rgb.mean(axis=2, keepdims=True)).mean()
+    return chroma <= GRAYSCALE_CHROMA_THRESHOLD
+
+
+def estimate_skew(gray):
+    """
+    射影プロファイルで傾き（度）を推定
+
+    暗いピクセルの座標を全候補角度でまとめて回転し、行ごとのヒストグラムの
+    変化が最も鋭くなる（文字の行が水平に揃う）角度を選ぶ
+    """
+    ys, xs = np.nonzero(gray < 128)
+    if len(ys) < 100:
+        return 0.0
+    if len(ys) > MAX_SKEW_POINTS:
+        index = np.random.default_rng(0).choice(len(ys), MAX_SKEW_POINTS, replace=False)
+        ys, xs = ys[index], xs[index]
+
+    angles = np.deg2rad(np.arange(-MAX_SKEW_ANGLE, MAX_SKEW_ANGLE + SKEW_ANGLE_STEP, SKEW_ANGLE_STEP))
+    # (角度数 × 点数) の回転後の行番号
+    rotated = ys[None, :] * np.cos(angles)[:, None] - xs[None, :] * np.sin(angles)[:, None]
+    rows = np.round(rotated - rotated.min(axis=1, keepdims=True)).astype(np.int64)
+
+    height = int(rows.max()) + 1
+    offsets = np.arange(len(angles))[:, None] * height
+    histograms = np.bincount((rows + offsets).ravel(), minlength=len(angles) * height)
+    histograms = histograms.reshape(len(angles), height).astype(np.float64)
+
+    scores = (np.diff(histograms, axis=1) ** 2).sum(axis=1)
+    return float(np.rad2deg(angles[np.argmax(scores)]))
+
+
+def stretch_contrast(pixels, low_percentile=2, high_percentile=98):
+    """パーセンタイルで輝度の範囲を 0〜255 に引き伸ばす（チャンネル共通）"""
+    low, high = np.percentile(pixels, [low_percentile, high_percentile])
+    if high - low < 1:
+        return pixels
+    stretched = (pixels.astype(np.float32) - low) * (255.0 / (high - low))
+    return np.clip(stretched, 0, 255).astype(np.uint8)
+
+
+def normalize_image(data, settings=DEFAULT_SETTINGS):
+    """画像のバイト列を正規化し、再エンコードしたバイト列を返す"""
+    image = Image.open(io.BytesIO(data))
+    image = image.convert('RGB')
+
+    # 長辺を縮小
+    if max(image.size) > settings['max_edge']:
+        image.thumbnail((settings['max_edge'], settings['max_edge']), Image.LANCZOS)
+
+    pixels = np.asarray(image)
+    if settings['grayscale'] and is_grayscale_safe(pixels):
+        pixels = np.asarray(image.convert('L'))
+
+    if settings['contrast']:
+        pixels = stretch_contrast(pixels)
+
+    image = Image.fromarray(pixels)
+
+    if settings['deskew']:
+        gray = pixels if pixels.ndim == 2 else np.asarray(image.convert('L'))
+        angle = estimate_skew(gray)
+        if angle:
+            fill = 255 if image.mode == 'L' else (255, 255, 255)
+            image = image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=fill)
+
+    output = io.BytesIO()
+    image.save(output, format=settings['format'], quality=settings['quality'])
+    return output.getvalue()
+
+
+class NormalizationReport:
+    """削減できたバイト数と OCR の所要時間を集計"""
+
+    def __init__(self):
+        self.images = 0
+        self.cached = 0
+        self.source_bytes = 0
+        self.normalized_bytes = 0
+        self.ocr_seconds = {'original': [], 'normalized': []}
+
+    def record_image(self, source_size, normalized_size, cached):
+        self.images += 1
+        self.cached += int(cached)
+        self.source_bytes += source_size
+        self.normalized_bytes += normalized_size
+
+    def record_ocr(self, kind, seconds):
+        self.ocr_seconds[kind].append(seconds)
+
+    def print_summary(self):
+        saved = self.source_bytes - self.normalized_bytes
+        ratio = saved / self.source_bytes * 100 if self.source_bytes else 0
+        print(f"\n🗜️  画像の正規化: {self.images}枚（キャッシュ利用 {self.cached}枚）")
+        print(f"   元のサイズ: {self.source_bytes:,} bytes → 正規化後: {self.normalized_bytes:,} bytes")
+        print(f"   削減: {saved:,} bytes ({ratio:.1f}%)")
+        for kind, label in [('original', '正規化前'), ('normalized', '正規化後')]:
+            seconds = self.ocr_seconds[kind]
+            if seconds:
+                print(f"   OCR平均時間（{label}）: {sum(seconds) / len(seconds) * 1000:.0f} ms ({len(seconds)}件)")
+
+
+class NormalizedImageCache:
+    """元画像のハッシュと設定をキーにした正規化済み画像のキャッシュ"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, settings=DEFAULT_SETTINGS, report=None):
+        self.pack = ImagePack(cache_dir)
+        self.settings = settings
+        self.key_suffix = hashlib.md5(settings_key(settings).encode('utf-8')).hexdigest()
+        self.report = report or NormalizationReport()
+
+    def key(self, source):
+        return f"{hashlib.md5(source).hexdigest()}:{self.key_suffix}"
+
+    def get(self, source):
+        """キャッシュ済みの正規化画像を返す（なければ None）"""
+        cached = self.pack.get(self.key(source))
+        if cached is not None:
+            self.report.record_image(len(source), len(cached), cached=True)
+        return cached
+
+    def put(self, source, normalized):
+        self.report.record_image(len(source), len(normalized), cached=False)
+        return self.pack.put(self.key(source), normalized)
+
+    def get_or_normalize(self, source):
+        """同期処理用: キャッシュになければ正規化して保存"""
+        cached = self.get(source)
+        if cached is not None:
+            return cached
+        return self.put(source, normalize_image(source, self.settings))
+
+    def close(self):
+        self.pack.close()
+
+
+def timed(function, *args):
+    """関数を実行し、(戻り値, 所要秒数) を返す"""
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
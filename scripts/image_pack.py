@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+ダウンロードした問題画像を保存するローカルの画像パック
+
+画像は (Drive ファイルID, md5Checksum) をキーに、追記専用の大きなパックファイルへ
+まとめて保存し、オフセットの索引を SQLite に持つ。読み出しは mmap 経由で
+コピーせずに memoryview として返す。
+"""
+
+import hashlib
+import mmap
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+DEFAULT_PACK_DIR = '/Users/shun/geography-image-pack'
+# 画像ダウンロードのタイムアウト（接続, 読み込み）秒と同時ダウンロード数
+REQUEST_TIMEOUT = (10, 60)
+DOWNLOAD_CONCURRENCY = 8
+# 1つのパックファイルの最大サイズ（超えたら次のパックへ）
+MAX_PACK_SIZE = 1024 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    file_id TEXT NOT NULL,
+    md5 TEXT NOT NULL,
+    pack INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    added_at REAL NOT NULL DEFAULT (julianday('now')),
+    PRIMARY KEY (file_id, md5)
+);
+"""
+
+
+def to_direct_url(image_url):
+    """Google Drive URLを直接アクセス可能なURLに変換し、(ファイルID, URL) を返す"""
+    if 'drive.google.com' in image_url:
+        file_id = image_url.split('/d/')[1].split('/')[0]
+        return file_id, f"https://drive.google.com/uc?export=view&id={file_id}"
+    return None, image_url
+
+
+def download_image(direct_url):
+    """画像をダウンロード（タイムアウトあり）"""
+    response = requests.get(direct_url, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.content
+
+
+def fetch_images(image_pack, sources, concurrency=DOWNLOAD_CONCURRENCY):
+    """
+    (画像URL, md5 or None) の画像を画像パックから読むか、並行してダウンロードする
+
+    md5 が分からない画像は、画像パックにあっても Drive で更新されているかもしれないので
+    ダウンロードし直す（内容が同じなら画像パックには追記しない）
+    戻り値: {画像URL: バイト列}（取得できなかった画像は含まない）
+    """
+    images = {}
+    missing = []
+    for image_url, md5 in sources:
+        file_id, direct_url = to_direct_url(image_url)
+        image = image_pack.get(file_id, md5) if file_id and md5 else None
+        if image is not None:
+            images[image_url] = image
+        else:
+            missing.append((image_url, file_id, direct_url, md5))
+
+    def fetch(item):
+        image_url, _, direct_url, _ = item
+        try:
+            return download_image(direct_url)
+        except Exception as e:
+            print(f"❌ 画像取得エラー: {image_url} - {str(e)}")
+            return None
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        # 画像パックの書き込みはこのスレッドで行う（SQLite接続のため）
+        for (image_url, file_id, _, md5), data in zip(missing, executor.map(fetch, missing)):
+            if data is None:
+                continue
+            try:
+                images[image_url] = image_pack.put(file_id, data, md5) if file_id else data
+            except ValueError as e:
+                # スナップショットの後に更新された画像
+                print(f"⚠️  {str(e)}")
+                images[image_url] = image_pack.put(file_id, data)
+    return images
+
+
+class ImagePack:
+    """(ファイルID, md5) をキーにした追記専用の画像ストア"""
+
+    def __init__(self, pack_dir=DEFAULT_PACK_DIR, max_pack_size=MAX_PACK_SIZE):
+        os.makedirs(pack_dir, exist_ok=True)
+        self.pack_dir = pack_dir
+        self.max_pack_size = max_pack_size
+
+        self.index = sqlite3.connect(os.path.join(pack_dir, 'index.sqlite3'))
+        self.index.execute('PRAGMA journal_mode=WAL')
+        self.index.executescript(SCHEMA)
+
+        # 追記先のパック番号（既存の最後のパックから続ける）
+        row = self.index.execute('SELECT MAX(pack) FROM images').fetchone()
+        self.current_pack = row[0] or 0
+        self.writer = None
+        self.maps = {}
+
+    def _pack_path(self, pack):
+        return os.path.join(self.pack_dir, f'pack-{pack:05d}.pack')
+
+    def _open_writer(self, size):
+        """追記用のパックファイルを開く（上限を超える場合は次のパックへ）"""
+        if self.writer is None:
+            self.writer = open(self._pack_path(self.current_pack), 'ab')
+
+        if self.writer.tell() > 0 and self.writer.tell() + size > self.max_pack_size:
+            self.writer.close()
+            self.current_pack += 1
+            self.writer = open(self._pack_path(self.current_pack), 'ab')
+
+        return self.writer
+
+    def _view(self, pack, offset, length):
+        """パックを mmap し、指定範囲をコピーせずに返す"""
+        mapped = self.maps.get(pack)
+        if mapped is None or offset + length > len(mapped):
+            # 追記でファイルが伸びた場合はマップし直す
+            # （古いマップは参照中の memoryview がなくなった時点で解放される）
+            with open(self._pack_path(pack), 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.maps[pack] = mapped
+        return memoryview(mapped)[offset:offset + length]
+
+    def get(self, file_id, md5=None):
+        """
+        画像を memoryview で返す（なければ None）
+
+        md5 を省略した場合はそのファイルIDで最後に保存した画像を返す
+        """
+        if md5 is not None:
+            row = self.index.execute(
+                'SELECT pack, offset, length FROM images WHERE file_id = ? AND md5 = ?',
+                (file_id, md5)
+            ).fetchone()
+        else:
+            row = self.index.execute(
+                'SELECT pack, offset, length FROM images WHERE file_id = ? ORDER BY added_at DESC LIMIT 1',
+                (file_id,)
+            ).fetchone()
+
+        if row is None:
+            return None
+        return self._view(*row)
+
+    def put(self, file_id, data, md5=None):
+        """画像を追記して memoryview を返す（md5 を指定した場合は内容を検証）"""
+        actual_md5 = hashlib.md5(data).hexdigest()
+        if md5 is not None and md5 != actual_md5:
+            raise ValueError(f"md5 が一致しません: {file_id} ({md5} != {actual_md5})")
+
+        existing = self.get(file_id, actual_md5)
+        if existing is not None:
+            return existing
+
+        writer = self._open_writer(len(data))
+        offset = writer.tell()
+        writer.write(data)
+        writer.flush()
+
+        with self.index:
+            self.index.execute(
+                'INSERT INTO images (file_id, md5, pack, offset, length) VALUES (?, ?, ?, ?, ?)',
+                (file_id, actual_md5, self.current_pack, offset, len(data))
+            )
+
+        return self._view(self.current_pack, offset, len(data))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        self.maps.clear()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
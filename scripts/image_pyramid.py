@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+問題画像の複数解像度の派生画像（WebP・AVIF）を public/images/questions に書き出す
+
+一覧では小さい画像、拡大表示では大きい画像を使えるように、幅 320・768・1600px の
+派生画像を作る。ファイル名には元画像のハッシュを含めるので、CDN・ブラウザで
+永続的にキャッシュできる。マニフェストには問題IDごとに派生画像のURLとバイト数をまとめる。
+"""
+
+import io
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps, features
+
+DEFAULT_PYRAMID_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                   'public', 'images', 'questions')
+MANIFEST_NAME = 'manifest.json'
+# ブラウザから参照するパス（public/ 以下）
+PUBLIC_PATH = '/images/questions'
+
+# 派生画像の幅（元画像より大きくはしない）
+WIDTHS = (320, 768, 1600)
+# 形式ごとの保存オプション（AVIF は Pillow が対応している場合だけ作る）
+FORMATS = {
+    'avif': {'format': 'AVIF', 'quality': 55},
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 6},
+}
+
+# ファイル名に含めるハッシュの長さ
+HASH_LENGTH = 16
+
+DERIVATIVE_PATTERN = re.compile(r'^[0-9a-f]{%d}-\d+\.(%s)$' % (HASH_LENGTH, '|'.join(FORMATS)))
+
+
+def available_formats():
+    """この環境の Pillow で書き出せる形式"""
+    return [name for name in FORMATS if features.check(name)]
+
+
+def derivative_name(source_md5, width, format_name):
+    return f"{source_md5[:HASH_LENGTH]}-{width}.{format_name}"
+
+
+def render_derivatives(data, source_md5, output_dir, formats, widths=WIDTHS):
+    """
+    1枚の画像の派生画像を書き出し、マニフェストの項目を返す（ワーカープロセスで実行）
+
+    大きい幅から順に、1つ前の派生画像を縮小して作る
+    """
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+    image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    source_width, source_height = image.size
+
+    derivatives = {}
+    current = image
+    for width in sorted(widths, reverse=True):
+        actual = min(width, source_width)
+        height = max(1, round(source_height * actual / source_width))
+        if current.width != actual:
+            current = current.resize((actual, height), Image.LANCZOS)
+
+        entry = {'width': actual, 'height': height}
+        for format_name in formats:
+            name = derivative_name(source_md5, actual, format_name)
+            path = os.path.join(output_dir, name)
+            # 同じ元画像・幅のファイルは書き出し済み（元画像より大きい幅は同じファイルになる）
+            if not os.path.exists(path):
+                current.save(path + '.tmp', **FORMATS[format_name])
+                os.replace(path + '.tmp', path)
+            entry[format_name] = {'url': f'{PUBLIC_PATH}/{name}', 'bytes': os.path.getsize(path)}
+        derivatives[str(width)] = entry
+
+    return {
+        'source_md5': source_md5,
+        'width': source_width,
+        'height': source_height,
+        'derivatives': dict(sorted(derivatives.items(), key=lambda item: int(item[0])))
+    }
+
+
+def render_all(images, output_dir=DEFAULT_PYRAMID_DIR, formats=None, workers=None):
+    """
+    {元画像の md5: バイト列} の派生画像を CPU のコア数のプロセスで並行して作る
+
+    戻り値: {元画像の md5: マニフェストの項目}
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    formats = formats or available_formats()
+    items = list(images.items())
+    entries = {}
+    with ProcessPoolExecutor(workers or os.cpu_count() or 1) as executor:
+        futures = {
+            executor.submit(render_derivatives, bytes(data), source_md5, output_dir, formats): source_md5
+            for source_md5, data in items
+        }
+        for future, source_md5 in futures.items():
+            try:
+                entries[source_md5] = future.result()
+            except Exception as e:
+                print(f"❌ 派生画像の作成エラー: {source_md5} - {str(e)}")
+    return entries
+
+
+def load_manifest(output_dir=DEFAULT_PYRAMID_DIR):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {'images': {}}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def is_current(entry, source_md5, formats, output_dir=DEFAULT_PYRAMID_DIR):
+    """前回の項目が同じ元画像から全ての形式で作られていて、ファイルも残っているか"""
+    if not entry or entry.get('source_md5') != source_md5:
+        return False
+    return all(
+        format_name in derivative and os.path.exists(
+            os.path.join(output_dir, os.path.basename(derivative[format_name]['url'])))
+        for derivative in entry['derivatives'].values()
+        for format_name in formats
+    )
+
+
+def _referenced_files(manifest):
+    return {
+        os.path.basename(variant['url'])
+        for entry in manifest.get('images', {}).values()
+        for derivative in entry['derivatives'].values()
+        for format_name, variant in derivative.items() if format_name in FORMATS
+    }
+
+
+def write_manifest(images, previous, output_dir=DEFAULT_PYRAMID_DIR, formats=None):
+    """
+    {問題ID: 項目} のマニフェストを書き出し、マニフェストを返す
+
+    前回のマニフェストが参照する派生画像は、デプロイ中のページのために1世代だけ残す
+    """
+    manifest = {
+        'widths': list(WIDTHS),
+        'formats': formats or available_formats(),
+        'images': dict(sorted(images.items()))
+    }
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+    # どちらのマニフェストからも参照されなくなった派生画像を削除
+    keep = _referenced_files(manifest) | _referenced_files(previous)
+    for file_name in os.listdir(output_dir):
+        if DERIVATIVE_PATTERN.match(file_name) and file_name not in keep:
+            os.remove(os.path.join(output_dir, file_name))
+
+    return manifest
+
+
+def print_pyramid_summary(manifest):
+    """形式・幅ごとの合計サイズを表示"""
+    images = manifest['images'].values()
+    print(f"🖼️  派生画像: {len(manifest['images'])}問題")
+    for width in manifest['widths']:
+        sizes = []
+        for format_name in manifest['formats']:
+            total = sum(entry['derivatives'][str(width)][format_name]['bytes'] for entry in images
+                        if format_name in entry['derivatives'].get(str(width), {}))
+            sizes.append(f"{format_name} {total:,} bytes")
+        print(f"   {width}px: {', '.join(sizes)}")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Aho-Corasick 法による地理キーワードのタグ付け
+
+外部の辞書ファイル（カテゴリ<TAB>用語）からオートマトンを構築し、
+問題文を1回走査するだけで全ての用語を検出する。
+"""
+
+import os
+from collections import deque
+
+DEFAULT_DICTIONARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'geo-keywords.tsv')
+
+# 重なった一致のうち最長のものだけを残す（地中海性気候 に含まれる 気候 は数えない）
+LONGEST = 'longest'
+# 重なりも含めて全ての一致を返す
+OVERLAP = 'overlap'
+
+
+def load_dictionary(path=DEFAULT_DICTIONARY_PATH):
+    """辞書ファイルを読み込み、{用語: カテゴリ} を返す（# で始まる行は無視）"""
+    terms = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            category, term = line.split('\t', 1)
+            terms[term.strip()] = category.strip()
+    return terms
+
+
+class KeywordTagger:
+    """用語辞書から構築した Aho-Corasick オートマトン"""
+
+    def __init__(self, terms):
+        self.terms = list(terms)
+        self.categories = [terms[term] for term in self.terms]
+
+        # ノードごとの遷移・失敗リンク・一致する用語・出力リンク
+        self.goto = [{}]
+        self.fail = [0]
+        self.match = [-1]
+        self.output_link = [0]
+
+        for index, term in enumerate(self.terms):
+            node = 0
+            for char in term:
+                next_node = self.goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self.goto)
+                    self.goto[node][char] = next_node
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.match.append(-1)
+                    self.output_link.append(0)
+                node = next_node
+            self.match[node] = index
+
+        self._build_links()
+        # 辞書に現れる文字（それ以外の文字では必ず根に戻る）
+        self.alphabet = frozenset(char for term in self.terms for char in term)
+
+    def _build_links(self):
+        """幅優先で失敗リンクと出力リンクを設定"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+
+                # 失敗リンクを辿って最初に見つかる「用語の終わり」のノード
+                fail_node = self.fail[child]
+                self.output_link[child] = fail_node if self.match[fail_node] >= 0 else self.output_link[fail_node]
+
+    def find_all(self, text):
+        """全ての一致を (開始位置, 終了位置, 用語番号) のリストで返す（重なりを含む）"""
+        goto, fail, match, output_link = self.goto, self.fail, self.match, self.output_link
+        terms, alphabet = self.terms, self.alphabet
+        matches = []
+        node = 0
+
+        for position, char in enumerate(text):
+            if char not in alphabet:
+                node = 0
+                continue
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+
+            found = node if match[node] >= 0 else output_link[node]
+            while found:
+                index = match[found]
+                matches.append((position + 1 - len(terms[index]), position + 1, index))
+                found = output_link[found]
+
+        return matches
+
+    def find(self, text, mode=LONGEST):
+        """
+        一致を (開始位置, 終了位置, 用語, カテゴリ) のリストで返す
+
+        mode が LONGEST の場合は左から順に最長の一致を選び、重なる一致は捨てる
+        """
+        matches = self.find_all(text)
+
+        if mode == LONGEST:
+            matches.sort(key=lambda m: (m[0], m[0] - m[1]))
+            selected = []
+            end = 0
+            for start, stop, index in matches:
+                if start >= end:
+                    selected.append((start, stop, index))
+                    end = stop
+            matches = selected
+        else:
+            matches.sort()
+
+        return [(start, stop, self.terms[index], self.categories[index]) for start, stop, index in matches]
+
+    def tag(self, text, mode=LONGEST):
+        """カテゴリごとに、出現順・重複なしの用語リストを返す"""
+        tags = {}
+        for _, _, term, category in self.find(text, mode):
+            terms = tags.setdefault(category, [])
+            if term not in terms:
+                terms.append(term)
+        return tags
+
+    def tag_many(self, texts, mode=LONGEST):
+        """複数の文章をまとめてタグ付け"""
+        return [self.tag(text or '', mode) for text in texts]
+
+    def tag_rows(self, rows, column, mode=LONGEST):
+        """シートの全行（values().get の結果、ヘッダー行を除く）の指定列をタグ付け"""
+        return self.tag_many((row[column] if len(row) > column else '' for row in rows), mode)
+
+
+_default_tagger = None
+
+
+def get_default_tagger():
+    """既定の辞書から構築したタガー（初回のみ構築）"""
+    global _default_tagger
+    if _default_tagger is None:
+        _default_tagger = KeywordTagger(load_dictionary())
+    return _default_tagger
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+スプレッドシートの全年度タブを Supabase（Postgres）の questions テーブルに投入
+
+環境変数 DATABASE_URL（なければローカルの supabase start の DB）に接続する
+"""
+
+import os
+import sys
+import psycopg2
+from sheet_questions import SPREADSHEET_ID, list_year_tabs, fetch_tab_values, iter_questions
+from postgres_loader import DEFAULT_DATABASE_URL, load_questions, print_load_result
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from google_clients import get_service, SHEETS_READONLY_SCOPES
+
+# 1回の values.batchGet で読むタブ数（メモリに載せるのはこの分だけ）
+TABS_PER_REQUEST = 5
+
+def iter_sheet_questions(service, titles, spreadsheet_id=SPREADSHEET_ID):
+    """タブを数枚ずつ読み込み、問題データを順に返す"""
+    for start in range(0, len(titles), TABS_PER_REQUEST):
+        chunk = titles[start:start + TABS_PER_REQUEST]
+        print(f"📥 {', '.join(chunk)} を読み込み中...")
+        yield from iter_questions(fetch_tab_values(service, chunk, spreadsheet_id))
+
+def main():
+    service = get_service('sheets', 'v4', scopes=SHEETS_READONLY_SCOPES)
+    titles = list_year_tabs(service, SPREADSHEET_ID)
+    print(f"📑 年度タブ: {', '.join(titles)}")
+
+    database_url = os.environ.get('DATABASE_URL', DEFAULT_DATABASE_URL)
+    conn = psycopg2.connect(database_url)
+    try:
+        result = load_questions(conn, iter_sheet_questions(service, titles))
+        print_load_result(result)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Message Batches API のローカルのモックサーバー（オフラインでの確認用）
+
+ジョブは作成から --processing-seconds 秒後に完了し、画像ごとに
+画像の md5 から決まる架空の問題文・キーワードを返す。
+--error-rate の割合のリクエストは errored になる。
+--create-failures を指定すると、最初のその回数のジョブ作成を 529 overloaded_error で失敗させる。
+
+  python3 scripts/mock_batch_server.py --port 8766
+  ANTHROPIC_BASE_URL=http://127.0.0.1:8766 python3 scripts/extract-question-text.py --bulk
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REGIONS = ['ヨーロッパ', '東南アジア', '南アメリカ', 'アフリカ', '北アメリカ', 'オセアニア']
+TOPICS = ['農業', '気候', '工業', '人口', '地形', '交通']
+KEYWORDS = ['地中海性気候', '酪農', '季節風', '三角州', 'プランテーション', '偏西風', '混合農業', '氷河']
+
+
+def fake_extraction(image_data):
+    """画像の内容から決まる架空の抽出結果"""
+    digest = hashlib.md5(base64.b64decode(image_data)).hexdigest()
+    rng = random.Random(digest)
+    region = rng.choice(REGIONS)
+    topic = rng.choice(TOPICS)
+    return {
+        'questionText': f"次の図は，{region}の{topic}に関する資料である。最も適当なものを選べ。（{digest[:8]}）",
+        'keywords': rng.sample(KEYWORDS, 3),
+        'regions': [region],
+        'topics': [topic]
+    }
+
+
+class MockBatchServer:
+    """作成されたジョブを覚えておき、時間が経ったら完了にする"""
+
+    def __init__(self, processing_seconds=2.0, error_rate=0.0, host='127.0.0.1', port=0, seed=0,
+                 create_failures=0):
+        self.processing_seconds = processing_seconds
+        self.error_rate = error_rate
+        self.create_failures = create_failures
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.batches = {}
+
+        self.httpd = ThreadingHTTPServer((host, port), type('Handler', (_Handler,), {'mock': self}))
+        self.httpd.daemon_threads = True
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reject_create(self):
+        """ジョブ作成を失敗させる回数が残っていれば1回分使って True を返す"""
+        with self.lock:
+            if self.create_failures <= 0:
+                return False
+            self.create_failures -= 1
+            return True
+
+    def create(self, body):
+        batch_id = f'msgbatch_{uuid.uuid4().hex[:24]}'
+        results = []
+        for request in body['requests']:
+            if self.rng.random() < self.error_rate:
+                result = {'type': 'errored', 'error': {'type': 'overloaded_error', 'message': 'Overloaded'}}
+            else:
+                image = next(block for block in request['params']['messages'][0]['content']
+                             if block['type'] == 'image')
+                text = json.dumps(fake_extraction(image['source']['data']), ensure_ascii=False)
+                result = {'type': 'succeeded', 'message': {
+                    'id': f'msg_{uuid.uuid4().hex[:24]}',
+                    'type': 'message',
+                    'role': 'assistant',
+                    'model': request['params']['model'],
+                    'content': [{'type': 'text', 'text': text}],
+                    'stop_reason': 'end_turn'
+                }}
+            results.append({'custom_id': request['custom_id'], 'result': result})
+        with self.lock:
+            self.batches[batch_id] = {'created': time.time(), 'results': results}
+        return self.describe(batch_id)
+
+    def describe(self, batch_id):
+        with self.lock:
+            batch = self.batches.get(batch_id)
+        if batch is None:
+            return None
+        ended = time.time() - batch['created'] >= self.processing_seconds
+        results = batch['results']
+        succeeded = sum(1 for entry in results if entry['result']['type'] == 'succeeded')
+        return {
+            'id': batch_id,
+            'type': 'message_batch',
+            'processing_status': 'ended' if ended else 'in_progress',
+            'request_counts': {
+                'processing': 0 if ended else len(results),
+                'succeeded': succeeded if ended else 0,
+                'errored': len(results) - succeeded if ended else 0,
+                'canceled': 0,
+                'expired': 0
+            },
+            'created_at': datetime.fromtimestamp(batch['created'], timezone.utc).isoformat(),
+            'results_url': f'{self.base_url}/v1/messages/batches/{batch_id}/results' if ended else None
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    mock = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, data, content_type='application/json'):
+        body = data if isinstance(data, bytes) else json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+        if self.path == '/v1/messages/batches' and self.mock.reject_create():
+            self._send(529, {'type': 'error', 'error': {'type': 'overloaded_error', 'message': 'Overloaded'}})
+        elif self.path == '/v1/messages/batches':
+            self._send(200, self.mock.create(body))
+        else:
+            self._send(404, {'type': 'error', 'error': {'type': 'not_found_error', 'message': self.path}})
+
+    def do_GET(self):
+        parts = self.path.strip('/').split('/')
+        if parts[:3] != ['v1', 'messages', 'batches'] or len(parts) < 4:
+            return self._send(404, {'type': 'error', 'error': {'type': 'not_found_error', 'message': self.path}})
+        batch = self.mock.describe(parts[3])
+        if batch is None:
+            return self._send(404, {'type': 'error', 'error': {'type': 'not_found_error', 'message': parts[3]}})
+        if len(parts) == 4:
+            return self._send(200, batch)
+        if batch['processing_status'] != 'ended':
+            return self._send(400, {'type': 'error', 'error': {'type': 'invalid_request_error',
+                                                              'message': 'Batch is still in progress'}})
+        with self.mock.lock:
+            results = self.mock.batches[parts[3]]['results']
+        lines = ''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in results)
+        self._send(200, lines.encode('utf-8'), 'application/binary')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Message Batches API のモックサーバー')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--processing-seconds', type=float, default=2.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--create-failures', type=int, default=0)
+    args = parser.parse_args()
+
+    server = MockBatchServer(args.processing_seconds, args.error_rate, port=args.port,
+                             create_failures=args.create_failures)
+    print(f"🧪 モックサーバーを起動しました: {server.base_url}")
+    print(f"   export ANTHROPIC_BASE_URL={server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
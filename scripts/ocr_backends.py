@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+OCR エンジンの切り替え
+
+- claude: 画像を Claude API に送って問題文を抽出する（既定）
+- tesseract: ローカルの Tesseract（日本語 jpn）で抽出する（APIキー不要・オフラインで動く）
+
+Tesseract は CPU で処理するので、ProcessPoolExecutor の各ワーカーで
+エンジンを1つずつ初期化して使い回し、全コアで並行して OCR する。
+画像は共有メモリに置いて名前だけをワーカーに渡す（画像を pickle してパイプで送らない）。
+
+環境変数 OCR_BACKEND か --ocr-backend で選ぶ。
+"""
+
+import base64
+import functools
+import io
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from PIL import Image
+from ocr_cache import prompt_version
+from question_pipeline import OCR_CONCURRENCY, OCR_REQUESTS_PER_MINUTE
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+BACKEND_ENV = 'OCR_BACKEND'
+DEFAULT_BACKEND = 'claude'
+
+# Claude のモデルとプロンプト（変えると OCR キャッシュのキーが変わり、全画像を OCR し直す）
+OCR_MODEL = "claude-3-5-sonnet-20241022"
+OCR_PROMPT = "この地理の問題画像から問題文の全文を抽出してください。"
+
+# Tesseract の言語データとページ分割モード（6 = 1つのテキストブロックとして読む）
+TESSERACT_LANG = 'jpn'
+TESSERACT_PSM = 6
+
+# Tesseract は日本語の文字の間に空白を入れるので取り除く
+CJK_SPACE_PATTERN = re.compile(r'(?<=[^\x00-\x7f]) +(?=[^\x00-\x7f])')
+
+
+class ClaudeBackend:
+    """Claude API で問題文を抽出する（APIのクォータに合わせてレート制限する）"""
+
+    name = 'claude'
+    concurrency = OCR_CONCURRENCY
+    requests_per_minute = OCR_REQUESTS_PER_MINUTE
+    # extract はまだダミーの問題文を返す。OCR キャッシュやジャーナルに残すと、API をつないだ後も
+    # 正しい結果として使われてしまうので保存しない（API をつないだら True にする）
+    cache_results = False
+
+    def __init__(self):
+        # ダミーの結果が本物のバージョンのキーで保存されないよう、別のバージョンにしておく
+        self.version = 'stub:' + prompt_version(OCR_MODEL, OCR_PROMPT)
+
+    def extract(self, image):
+        """
+        Claude APIを使用して画像から問題文を抽出
+        """
+        # Base64エンコード
+        image_base64 = base64.b64encode(image).decode('utf-8')
+
+        # Claude APIに送信（実際のAPIキーが必要）
+        # ここではダミーレスポンスを返す
+        return """
+    次の図は，ヨーロッパの農業地域を示している。
+
+    図中のA～Dの地域で見られる農業の特色について，次の記述のうち最も適当なものはどれか。
+
+    1. Aの地域では，冷涼な気候を利用した酪農業が盛んである。
+    2. Bの地域では，地中海性気候を利用した樹園地農業が行われている。
+    3. Cの地域では，温暖湿潤な気候を利用した稲作が中心となっている。
+    4. Dの地域では，寒冷な気候のため農業は困難である。
+    """
+
+    def close(self):
+        pass
+
+
+class _TesserocrEngine:
+    """tesserocr の API を1つ開いたまま使い回す（画像ごとに言語データを読み込まない）"""
+
+    def __init__(self, lang, psm):
+        self.api = tesserocr.PyTessBaseAPI(lang=lang, psm=psm)
+
+    def recognize(self, image):
+        self.api.SetImage(image)
+        return self.api.GetUTF8Text()
+
+
+class _PytesseractEngine:
+    """tesserocr がない場合は pytesseract で tesseract コマンドを呼ぶ"""
+
+    def __init__(self, lang, psm):
+        self.lang = lang
+        self.config = f'--psm {psm}'
+
+    def recognize(self, image):
+        return pytesseract.image_to_string(image, lang=self.lang, config=self.config)
+
+
+def tesseract_version():
+    """インストールされている Tesseract のバージョン（なければ RuntimeError）"""
+    if tesserocr is not None:
+        return tesserocr.tesseract_version().split()[1]
+    if pytesseract is not None:
+        return str(pytesseract.get_tesseract_version())
+    raise RuntimeError("Tesseract を使うには tesserocr か pytesseract をインストールしてください")
+
+
+# ワーカープロセスごとのエンジン
+_engine = None
+
+
+def _init_worker(lang, psm):
+    global _engine
+    _engine = _TesserocrEngine(lang, psm) if tesserocr is not None else _PytesseractEngine(lang, psm)
+
+
+def _recognize_shared(name, size):
+    """共有メモリ上の画像を OCR する（ワーカープロセスで実行）"""
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        data = bytes(shm.buf[:size])
+    finally:
+        shm.close()
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    text = _engine.recognize(image)
+    return CJK_SPACE_PATTERN.sub('', text).strip()
+
+
+class TesseractBackend:
+    """ローカルの Tesseract で問題文を抽出する（ワーカープロセスごとに1つのエンジン）"""
+
+    name = 'tesseract'
+    # ローカルなのでレート制限はしない
+    requests_per_minute = None
+    cache_results = True
+
+    def __init__(self, lang=TESSERACT_LANG, psm=TESSERACT_PSM, workers=None):
+        self.concurrency = workers or os.cpu_count() or 1
+        self.version = f"tesseract-{tesseract_version()}:{lang}:psm{psm}"
+        self.executor = ProcessPoolExecutor(self.concurrency, initializer=_init_worker, initargs=(lang, psm))
+
+    def extract(self, image):
+        """画像を共有メモリに置いてワーカーで OCR し、終わったら解放する"""
+        size = len(image)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, size))
+        try:
+            shm.buf[:size] = image
+            return self.executor.submit(_recognize_shared, shm.name, size).result()
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def close(self):
+        self.executor.shutdown()
+
+
+BACKENDS = {
+    'claude': ClaudeBackend,
+    'tesseract': TesseractBackend,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _create_backend(name):
+    return BACKENDS[name]()
+
+
+def get_backend(name=None):
+    """名前（省略時は環境変数 OCR_BACKEND）から OCR エンジンを返す（プロセス内で1つ）"""
+    name = name or os.environ.get(BACKEND_ENV) or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"不明な OCR エンジン: {name}（{', '.join(BACKENDS)} のいずれか）")
+    return _create_backend(name)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+OCR 結果の永続キャッシュ（SQLite）
+
+キーは (元画像の md5, 正規化設定, プロンプト・モデルのバージョン)。画像もプロンプトも
+変わっていなければ、再実行しても OCR を呼ばずに前回の結果を使う。
+合計サイズが上限を超えたら、最後に使われた時刻の古いものから削除する（LRU）。
+
+app/api/extract-text/route.ts（lib/ocrCache.ts）も同じスキーマのファイルを使える。
+
+  python3 scripts/ocr_cache.py   # ヒット率などの統計を表示
+"""
+
+import hashlib
+import sqlite3
+import sys
+import threading
+import time
+
+DEFAULT_CACHE_PATH = '/Users/shun/geography-image-pack/ocr-cache.sqlite3'
+# キャッシュの合計サイズの上限（結果の文字列のバイト数）
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# 上限を超えたときに、この割合まで減らす（削除のたびに1件ずつ消さないように）
+EVICT_TO_RATIO = 0.9
+
+# 正規化せずに OCR した画像の設定キー
+ORIGINAL_SETTINGS = 'original'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ocr_results (
+    image_md5 TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    result TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (image_md5, settings, prompt_version)
+);
+CREATE INDEX IF NOT EXISTS idx_ocr_results_last_used ON ocr_results(last_used_at);
+CREATE TABLE IF NOT EXISTS ocr_stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def prompt_version(model, prompt):
+    """モデル名とプロンプトからキャッシュのバージョンを作る（どちらかが変われば別のキー）"""
+    return f"{model}:{hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16]}"
+
+
+class OcrCache:
+    """(画像の md5, 正規化設定, プロンプトのバージョン) をキーにした OCR 結果のキャッシュ"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.total_bytes = self.conn.execute('SELECT COALESCE(SUM(bytes), 0) FROM ocr_results').fetchone()[0]
+        # この実行での統計
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _add_stat(self, name, value=1):
+        self.conn.execute(
+            'INSERT INTO ocr_stats (name, value) VALUES (?, ?) '
+            'ON CONFLICT (name) DO UPDATE SET value = value + excluded.value',
+            (name, value)
+        )
+
+    def get(self, image_md5, settings, version):
+        """キャッシュ済みの OCR 結果を返す（なければ None）"""
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                'SELECT result FROM ocr_results WHERE image_md5 = ? AND settings = ? AND prompt_version = ?',
+                (image_md5, settings, version)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                self._add_stat('misses')
+                return None
+            self.conn.execute(
+                'UPDATE ocr_results SET last_used_at = ?, hits = hits + 1 '
+                'WHERE image_md5 = ? AND settings = ? AND prompt_version = ?',
+                (time.time(), image_md5, settings, version)
+            )
+            self.hits += 1
+            self._add_stat('hits')
+            return row[0]
+
+    def put(self, image_md5, settings, version, result):
+        """OCR 結果を保存し、上限を超えたら古いものから削除する"""
+        size = len(result.encode('utf-8'))
+        now = time.time()
+        with self.lock, self.conn:
+            previous = self.conn.execute(
+                'SELECT bytes FROM ocr_results WHERE image_md5 = ? AND settings = ? AND prompt_version = ?',
+                (image_md5, settings, version)
+            ).fetchone()
+            self.conn.execute(
+                'INSERT OR REPLACE INTO ocr_results '
+                '(image_md5, settings, prompt_version, result, bytes, created_at, last_used_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (image_md5, settings, version, result, size, now, now)
+            )
+            self.total_bytes += size - (previous[0] if previous else 0)
+            if self.total_bytes > self.max_bytes:
+                self._evict(int(self.max_bytes * EVICT_TO_RATIO))
+
+    def _evict(self, target_bytes):
+        """合計サイズが target_bytes 以下になるまで、最後に使われた時刻の古いものから削除"""
+        cursor = self.conn.execute(
+            'SELECT image_md5, settings, prompt_version, bytes FROM ocr_results ORDER BY last_used_at'
+        )
+        evicted = []
+        for image_md5, settings, version, size in cursor:
+            if self.total_bytes <= target_bytes:
+                break
+            evicted.append((image_md5, settings, version))
+            self.total_bytes -= size
+        self.conn.executemany(
+            'DELETE FROM ocr_results WHERE image_md5 = ? AND settings = ? AND prompt_version = ?', evicted
+        )
+        self.evictions += len(evicted)
+        self._add_stat('evictions', len(evicted))
+
+    def stats(self):
+        """この実行と累計のヒット率・件数・サイズ"""
+        with self.lock:
+            entries = self.conn.execute('SELECT COUNT(*) FROM ocr_results').fetchone()[0]
+            lifetime = dict(self.conn.execute('SELECT name, value FROM ocr_stats').fetchall())
+        lifetime_lookups = lifetime.get('hits', 0) + lifetime.get('misses', 0)
+        lookups = self.hits + self.misses
+        return {
+            'entries': entries,
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'lifetime_hits': lifetime.get('hits', 0),
+            'lifetime_misses': lifetime.get('misses', 0),
+            'lifetime_hit_rate': lifetime.get('hits', 0) / lifetime_lookups if lifetime_lookups else 0.0,
+            'lifetime_evictions': lifetime.get('evictions', 0)
+        }
+
+    def print_summary(self):
+        stats = self.stats()
+        print(f"\n🗃️  OCR キャッシュ: ヒット {stats['hits']}件 / ミス {stats['misses']}件"
+              f"（ヒット率 {stats['hit_rate'] * 100:.1f}%）")
+        print(f"   {stats['entries']:,}件・{stats['bytes']:,} / {stats['max_bytes']:,} bytes"
+              f"（削除 {stats['evictions']}件、累計ヒット率 {stats['lifetime_hit_rate'] * 100:.1f}%）")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CACHE_PATH
+    with OcrCache(path) as cache:
+        stats = cache.stats()
+        print(f"🗃️  {path}")
+        print(f"   {stats['entries']:,}件・{stats['bytes']:,} / {stats['max_bytes']:,} bytes")
+        print(f"   累計: ヒット {stats['lifetime_hits']:,}件 / ミス {stats['lifetime_misses']:,}件"
+              f"（ヒット率 {stats['lifetime_hit_rate'] * 100:.1f}%）、削除 {stats['lifetime_evictions']:,}件")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+OCR バッチ処理のチェックポイント用ジャーナル
+
+完了した行を1行ずつ JSON Lines の追記専用ファイルに書き出し（行ごとに fsync）、
+再実行時は完了済みの行を飛ばして続きから処理する
+"""
+
+import hashlib
+import json
+import os
+import time
+
+DEFAULT_JOURNAL_DIR = '/Users/shun/geography-ocr-journal'
+
+
+def journal_path(spreadsheet_id, sheet_name, journal_dir=DEFAULT_JOURNAL_DIR):
+    """シートごとのジャーナルファイルのパス"""
+    sheet_key = hashlib.sha1(sheet_name.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(journal_dir, f'{spreadsheet_id}-{sheet_key}.jsonl')
+
+
+class OcrJournal:
+    """(問題ID, 画像URL) ごとの完了記録"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._truncate_partial_line()
+        self.completed = self._load()
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def _truncate_partial_line(self):
+        """書き込み途中で中断された最終行を切り捨てる（次の追記と繋がらないように）"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b'\n'):
+                f.truncate(data.rfind(b'\n') + 1)
+
+    def _load(self):
+        """既存のジャーナルを読み込む（途中で切れた最終行は無視）"""
+        completed = {}
+        if not os.path.exists(self.path):
+            return completed
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                completed[entry['question_id']] = entry
+        return completed
+
+    def get(self, question_id, image_url):
+        """完了済みなら分析結果を返す（画像URLが変わっていれば未完了扱い）"""
+        entry = self.completed.get(question_id)
+        if entry is not None and entry['image_url'] == image_url:
+            return entry['analysis']
+        return None
+
+    def record(self, question_id, image_url, analysis):
+        """完了した行を追記し、ディスクまで書き出す"""
+        entry = {
+            'question_id': question_id,
+            'image_url': image_url,
+            'analysis': analysis,
+            'completed_at': time.time()
+        }
+        self.file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.completed[question_id] = entry
+
+    def close(self):
+        self.file.close()
+
+    def finish(self):
+        """全ての結果をシートに書き込めたらジャーナルを削除"""
+        self.close()
+        os.remove(self.path)
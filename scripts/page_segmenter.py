@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+試験の1ページ分の画像を問題ごとの領域に分割する
+
+1. 大津の方法で二値化し、縦の射影プロファイルの広い空白で段組みを分ける
+2. 横の射影プロファイルで行を求める
+3. 左端から始まる短い文字のかたまりの後に空白が続く行（「問1　…」の行頭）を
+   問題番号のアンカーとし、アンカーごとに問題の領域にする
+4. アンカーが見つからない場合は、行間の広い空白で領域に分ける
+
+同じページを指している複数の行（問題）に、上から順に領域を割り当てる。
+切り出した画像と領域の座標は問題IDごとに SegmentStore に保存する。
+"""
+
+import hashlib
+import io
+import os
+import sqlite3
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from PIL import Image
+from image_pack import ImagePack
+
+DEFAULT_SEGMENT_DIR = '/Users/shun/geography-image-pack/segments'
+# 切り出した画像を指す画像URLの代わりの参照（'segment:問題ID'）
+SEGMENT_URL_PREFIX = 'segment:'
+
+# 段組みの間とみなす空白の幅（ページ幅に対する割合）
+COLUMN_GAP_RATIO = 0.04
+# 行の中で文字のかたまりをつなぐ隙間（行の高さに対する割合）
+WORD_GAP_RATIO = 0.3
+# 問題番号のアンカー: 左端からのずれ・ラベルの最大幅・ラベルの後の空白（行の高さに対する割合）
+ANCHOR_INDENT_RATIO = 0.5
+ANCHOR_LABEL_MAX_RATIO = 3.5
+ANCHOR_GAP_RATIO = 0.8
+# アンカーがない場合に領域を分ける行間（行の高さに対する割合）
+BLOCK_GAP_RATIO = 2.0
+# 射影プロファイルで空白とみなす画素数（ゴミを無視する）
+NOISE_PIXELS = 2
+# 切り出す領域の余白（ピクセル）
+PADDING = 8
+
+# 領域の座標は (左, 上, 右, 下)
+PageSegments = namedtuple('PageSegments', ['size', 'anchored', 'blocks'])
+
+
+def otsu_threshold(gray):
+    """大津の方法で二値化の閾値を求める（この値より暗い画素が文字）"""
+    histogram = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256)
+    counts = np.cumsum(histogram)
+    sums = np.cumsum(histogram * levels)
+    total, total_sum = counts[-1], sums[-1]
+
+    background = total - counts
+    valid = (counts > 0) & (background > 0)
+    mean_dark = sums / np.maximum(counts, 1)
+    mean_light = (total_sum - sums) / np.maximum(background, 1)
+    between = np.where(valid, counts * background * (mean_dark - mean_light) ** 2, 0)
+    return int(np.argmax(between)) + 1
+
+
+def runs(profile, min_gap=1, noise=NOISE_PIXELS):
+    """射影プロファイルの文字のある区間を (始点, 終点) で返す（min_gap 未満の空白はつなぐ）"""
+    filled = np.concatenate([[False], profile > noise, [False]])
+    edges = np.flatnonzero(np.diff(filled.astype(np.int8)))
+    merged = []
+    for start, end in zip(edges[::2], edges[1::2]):
+        if merged and start - merged[-1][1] < min_gap:
+            merged[-1][1] = int(end)
+        else:
+            merged.append([int(start), int(end)])
+    return [tuple(run) for run in merged]
+
+
+def find_columns(ink):
+    """縦の射影プロファイルの広い空白で段組みを分ける"""
+    width = ink.shape[1]
+    return runs(ink.sum(axis=0), min_gap=max(1, int(width * COLUMN_GAP_RATIO)))
+
+
+def find_lines(ink, left, right):
+    """段の中の行を (上, 下, 左端, 右端, ラベルの後に空白があるか) で返す"""
+    column = ink[:, left:right]
+    lines = []
+    for top, bottom in runs(column.sum(axis=1), min_gap=2):
+        height = bottom - top
+        words = runs(column[top:bottom].sum(axis=0), min_gap=max(1, int(height * WORD_GAP_RATIO)), noise=0)
+        if not words:
+            continue
+        labelled = (
+            len(words) > 1
+            and words[0][1] - words[0][0] <= height * ANCHOR_LABEL_MAX_RATIO
+            and words[1][0] - words[0][1] >= height * ANCHOR_GAP_RATIO
+        )
+        lines.append((top, bottom, left + words[0][0], left + words[-1][1], labelled))
+    return lines
+
+
+def _bbox(lines, size):
+    width, height = size
+    return (
+        max(0, min(line[2] for line in lines) - PADDING),
+        max(0, lines[0][0] - PADDING),
+        min(width, max(line[3] for line in lines) + PADDING),
+        min(height, lines[-1][1] + PADDING)
+    )
+
+
+def segment_lines(lines, size):
+    """1つの段の行を (アンカーごとの領域, 空白で分けた領域) にする"""
+    if not lines:
+        return [], []
+    line_height = float(np.median([bottom - top for top, bottom, *_ in lines]))
+    margin = min(line[2] for line in lines)
+
+    # 問題番号のアンカー（アンカーより前の行はリード文・共通の図なので含めない）
+    anchors = [
+        i for i, (_, _, x0, _, labelled) in enumerate(lines)
+        if labelled and x0 - margin <= line_height * ANCHOR_INDENT_RATIO
+    ]
+    anchored = [
+        _bbox(lines[start:end], size)
+        for start, end in zip(anchors, anchors[1:] + [len(lines)])
+    ]
+
+    # 行間の広い空白で分ける
+    blocks, start = [], 0
+    for i in range(1, len(lines)):
+        if lines[i][0] - lines[i - 1][1] >= line_height * BLOCK_GAP_RATIO:
+            blocks.append(_bbox(lines[start:i], size))
+            start = i
+    blocks.append(_bbox(lines[start:], size))
+    return anchored, blocks
+
+
+def segment_page(data):
+    """ページ画像のバイト列を問題の領域に分ける（段ごとに上から順）"""
+    image = Image.open(io.BytesIO(bytes(data)))
+    gray = np.asarray(image.convert('L'))
+    ink = gray < otsu_threshold(gray)
+
+    anchored, blocks = [], []
+    for left, right in find_columns(ink):
+        column_anchored, column_blocks = segment_lines(find_lines(ink, left, right), image.size)
+        anchored.extend(column_anchored)
+        blocks.extend(column_blocks)
+    return PageSegments(image.size, anchored, blocks)
+
+
+def segment_pages(pages, workers=None):
+    """複数のページを CPU のコア数のプロセスで並行して分割し、順に返す"""
+    with ProcessPoolExecutor(workers or os.cpu_count() or 1) as executor:
+        yield from executor.map(segment_page, [bytes(page) for page in pages], chunksize=4)
+
+
+def choose_segments(segments, count):
+    """
+    count 問分の領域を選び、(方法, 領域のリスト) を返す（数が合わなければ None）
+
+    問題番号のアンカーで分けた結果を優先する
+    """
+    if len(segments.anchored) == count:
+        return 'anchor', segments.anchored
+    if len(segments.blocks) == count:
+        return 'whitespace', segments.blocks
+    return None
+
+
+def crop(data, bbox):
+    """ページ画像から領域を切り出して PNG で返す（OCR 前の正規化は別に行う）"""
+    image = Image.open(io.BytesIO(bytes(data)))
+    output = io.BytesIO()
+    image.crop(bbox).save(output, format='PNG')
+    return output.getvalue()
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    question_id TEXT PRIMARY KEY,
+    page_md5 TEXT NOT NULL,
+    page_width INTEGER NOT NULL,
+    page_height INTEGER NOT NULL,
+    x0 INTEGER NOT NULL,
+    y0 INTEGER NOT NULL,
+    x1 INTEGER NOT NULL,
+    y1 INTEGER NOT NULL,
+    method TEXT NOT NULL,
+    crop_md5 TEXT NOT NULL
+);
+"""
+
+
+class SegmentStore:
+    """問題IDごとの切り出し画像（画像パック）と、元のページ上の領域"""
+
+    def __init__(self, segment_dir=DEFAULT_SEGMENT_DIR):
+        self.pack = ImagePack(segment_dir)
+        self.conn = sqlite3.connect(os.path.join(segment_dir, 'segments.sqlite3'))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def get(self, question_id):
+        """問題の領域を辞書で返す（なければ None）"""
+        row = self.conn.execute('SELECT * FROM segments WHERE question_id = ?', (question_id,)).fetchone()
+        return dict(row) if row else None
+
+    def crop(self, question_id):
+        """切り出した画像を memoryview で返す（なければ None）"""
+        segment = self.get(question_id)
+        return self.pack.get(question_id, segment['crop_md5']) if segment else None
+
+    def put(self, question_id, page_md5, page_size, bbox, method, data):
+        stored = self.pack.put(question_id, data)
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO segments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (question_id, page_md5, *page_size, *bbox, method, hashlib.md5(data).hexdigest())
+            )
+        return stored
+
+    def delete(self, question_ids):
+        """問題の領域を削除する（切り出した画像はパックに残るが参照されなくなる）"""
+        with self.conn:
+            self.conn.executemany('DELETE FROM segments WHERE question_id = ?',
+                                  [(question_id,) for question_id in question_ids])
+
+    def close(self):
+        self.conn.close()
+        self.pack.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+問題データのローカル SQLite レプリカと全文検索
+
+問題文（K列）とOCRキーワード（J列）に FTS5 の trigram インデックスを張り、
+年度・分野タグ・問題IDにも索引を持たせる。
+trigram で引けない1〜2文字の検索語（気候、農業など）は、問題文とキーワードの
+1文字・2文字の並びを集めた FTS5 の索引（rowid だけを持つ）から候補を引く。
+"""
+
+import operator
+import sqlite3
+from sheet_questions import split_categories
+
+DEFAULT_INDEX_PATH = '/Users/shun/geography-questions.sqlite3'
+
+# trigram トークナイザーは3文字未満の検索語を扱えない
+MIN_FTS_QUERY_LENGTH = 3
+# 年度・分野タグで絞った候補がこの件数以下なら、全文検索より候補を直接照合する方が速い
+DIRECT_MATCH_LIMIT = 2000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    rowid INTEGER PRIMARY KEY,
+    question_id TEXT NOT NULL,
+    sheet TEXT NOT NULL,
+    year INTEGER,
+    category TEXT,
+    answer TEXT,
+    correct_rate TEXT,
+    notes TEXT,
+    created_date TEXT,
+    image_url TEXT,
+    keywords TEXT,
+    question_text TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_questions_question_id ON questions(question_id);
+CREATE INDEX IF NOT EXISTS idx_questions_year ON questions(year);
+
+-- 分野タグは1問に複数あるため別テーブルに分ける（年度での絞り込みも索引で行う）
+CREATE TABLE IF NOT EXISTS question_categories (
+    category TEXT NOT NULL,
+    year INTEGER,
+    question_rowid INTEGER NOT NULL,
+    PRIMARY KEY (category, year, question_rowid)
+) WITHOUT ROWID;
+
+-- 3文字未満の検索語用に、問題文とキーワードの1文字・2文字の並びと、先頭に年度を付けた語
+-- （2024気候 など）を空白区切りで入れる
+-- （本文は持たず rowid だけを返す。ascii トークナイザーは ASCII 以外の文字で区切らない）
+CREATE VIRTUAL TABLE IF NOT EXISTS questions_grams USING fts5(
+    grams,
+    content='',
+    detail='none',
+    tokenize='ascii'
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+    question_text,
+    keywords,
+    content='questions',
+    content_rowid='rowid',
+    tokenize='trigram'
+);
+"""
+
+QUESTION_FIELDS = ['question_id', 'sheet', 'year', 'category', 'answer', 'correct_rate',
+                   'notes', 'created_date', 'image_url', 'keywords', 'question_text']
+
+
+def open_index(db_path=DEFAULT_INDEX_PATH):
+    """レプリカDBを開く（なければ作成）"""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def rebuild_index(conn, questions):
+    """問題データ全体でレプリカを作り直し、件数を返す"""
+    placeholders = ', '.join('?' for _ in QUESTION_FIELDS)
+    count = 0
+
+    with conn:
+        conn.execute('DELETE FROM questions')
+        conn.execute('DELETE FROM question_categories')
+        conn.execute("INSERT INTO questions_grams(questions_grams) VALUES ('delete-all')")
+
+        for question in questions:
+            cursor = conn.execute(
+                f"INSERT INTO questions ({', '.join(QUESTION_FIELDS)}) VALUES ({placeholders})",
+                [question[field] for field in QUESTION_FIELDS]
+            )
+            rowid = cursor.lastrowid
+            year = question['year']
+            conn.executemany(
+                'INSERT OR IGNORE INTO question_categories (category, year, question_rowid) VALUES (?, ?, ?)',
+                [(category, year, rowid) for category in split_categories(question['category'])]
+            )
+            conn.execute(
+                'INSERT INTO questions_grams (rowid, grams) VALUES (?, ?)',
+                (rowid, _short_grams(year, question['question_text'], question['keywords']))
+            )
+            count += 1
+
+        # 外部コンテンツ型の FTS インデックスを一括で再構築
+        conn.execute("INSERT INTO questions_fts(questions_fts) VALUES ('rebuild')")
+
+    conn.execute('PRAGMA optimize')
+    return count
+
+
+def _is_token_char(ch):
+    """ascii トークナイザーが語の一部として扱う文字（ASCII の英数字か ASCII 以外）か"""
+    return ch.isalnum() or not ch.isascii()
+
+
+def _year_gram(year, gram):
+    """年度で絞り込むための語（例: 2024気候）。記号を含む並びは区切られてしまうので作らない"""
+    if year is None or not all(map(_is_token_char, gram)):
+        return None
+    return f'{year}{gram}'
+
+
+def _short_grams(year, *texts):
+    """
+    文字列に含まれる1文字・2文字の並び（空白を含むものは除く）と、
+    その先頭に年度を付けた語を空白区切りで返す
+    """
+    grams = set()
+    for text in texts:
+        for chunk in (text or '').split():
+            grams.update(chunk)
+            grams.update(map(operator.add, chunk, chunk[1:]))
+    year_grams = {_year_gram(year, gram) for gram in grams} - {None}
+    return ' '.join(grams | year_grams)
+
+
+def _fts_phrase(text):
+    """検索語を FTS5 のフレーズとしてエスケープ"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _count_candidates(conn, year, category):
+    """年度・分野タグで絞り込んだ候補数を索引だけで数える"""
+    if category:
+        sql = 'SELECT COUNT(*) FROM question_categories WHERE category = ?'
+        params = [category]
+        if year is not None:
+            sql += ' AND year = ?'
+            params.append(year)
+    else:
+        sql = 'SELECT COUNT(*) FROM questions WHERE year = ?'
+        params = [year]
+    return conn.execute(sql, params).fetchone()[0]
+
+
+def search_questions(conn, text=None, year=None, category=None, question_id=None, limit=50):
+    """
+    問題を検索して辞書のリストを返す
+
+    text: 問題文・キーワードの部分一致（3文字以上は trigram 全文検索、
+          それ未満は1文字・2文字の索引で候補を引いてから部分一致を確認）
+    year: 年度、category: 分野タグ、question_id: 問題ID
+
+    最も絞り込める索引から行を順に読み、LIMIT に達した時点で打ち切る
+    （CROSS JOIN で起点の表を外側のループに固定する）
+    """
+    year = int(year) if year is not None else None
+    long_text = bool(text) and len(text) >= MIN_FTS_QUERY_LENGTH
+    short_text = bool(text) and not long_text and any(map(_is_token_char, text))
+    conditions = []
+    params = []
+
+    # 全文検索と年度・分野タグを併用する場合、候補が少なければ候補側から照合する
+    direct_match = (
+        long_text and not question_id and (category or year is not None) and
+        _count_candidates(conn, year, category) <= DIRECT_MATCH_LIMIT
+    )
+
+    # 起点となる索引を選ぶ
+    if question_id:
+        source = 'questions q'
+        conditions.append('q.question_id = ?')
+        params.append(question_id)
+    elif long_text and not direct_match:
+        source = 'questions_fts f CROSS JOIN questions q ON q.rowid = f.rowid'
+        conditions.append('questions_fts MATCH ?')
+        params.append(_fts_phrase(text))
+    elif short_text:
+        # 年度の指定があれば、年度付きの語で索引の中で絞り込む
+        source = 'questions_grams g CROSS JOIN questions q ON q.rowid = g.rowid'
+        conditions.append('questions_grams MATCH ?')
+        params.append(_fts_phrase(_year_gram(year, text) or text))
+    elif category:
+        source = 'question_categories c CROSS JOIN questions q ON q.rowid = c.question_rowid'
+        conditions.append('c.category = ?')
+        params.append(category)
+        if year is not None:
+            conditions.append('c.year = ?')
+            params.append(year)
+    else:
+        source = 'questions q'
+
+    # 残りの条件は候補ごとに確認する
+    # （短い検索語は索引が大文字小文字や記号を区別しないので、索引で引いた候補も照合し直す）
+    if text and (direct_match or not long_text):
+        conditions.append('(instr(q.question_text, ?) > 0 OR instr(q.keywords, ?) > 0)')
+        params += [text, text]
+    elif question_id and long_text:
+        conditions.append('q.rowid IN (SELECT rowid FROM questions_fts WHERE questions_fts MATCH ?)')
+        params.append(_fts_phrase(text))
+    if category and source.startswith(('questions q', 'questions_fts', 'questions_grams')):
+        conditions.append('EXISTS (SELECT 1 FROM question_categories c2 WHERE c2.category = ? '
+                          'AND c2.year IS q.year AND c2.question_rowid = q.rowid)')
+        params.append(category)
+    if year is not None:
+        conditions.append('q.year = ?')
+        params.append(year)
+
+    where = ' AND '.join(conditions) if conditions else '1'
+    rows = conn.execute(f'SELECT q.* FROM {source} WHERE {where} LIMIT ?', params + [limit])
+    return [dict(row) for row in rows]
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+画像取得・OCR・キーワード分析を並行して流す asyncio パイプライン
+
+各ステージは独立した同時実行数を持ち、外部APIの呼び出しは
+実際のクォータに合わせたトークンバケットで制限する。
+OCR 待ちの間も次の画像を先読みしておく。
+"""
+
+import asyncio
+import time
+
+# ステージごとの同時実行数
+FETCH_CONCURRENCY = 8
+OCR_CONCURRENCY = 4
+ANALYZE_CONCURRENCY = 2
+# OCR 待ちとして先読みしておく画像の数
+PREFETCH_DEPTH = 16
+
+# 実際のクォータ（Drive のダウンロードは毎秒、OCR は毎分のリクエスト数）
+DRIVE_REQUESTS_PER_SECOND = 20
+OCR_REQUESTS_PER_MINUTE = 50
+
+# タイムアウト（秒）
+OCR_TIMEOUT = 120
+
+FETCH_FAILED_TEXT = "画像の取得に失敗"
+OCR_FAILED_TEXT = "文章の抽出に失敗"
+
+
+class TokenBucket:
+    """トークンバケット方式のレート制限（複数のワーカーで共有する）"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate  # 1秒あたりに補充するトークン数
+        self.capacity = capacity if capacity is not None else max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    @classmethod
+    def per_minute(cls, requests_per_minute, capacity=None):
+        return cls(requests_per_minute / 60, capacity)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, tokens=1):
+        """トークンが貯まるまで待ってから消費する"""
+        async with self.lock:
+            self._refill()
+            while self.tokens < tokens:
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= tokens
+
+
+async def run_pipeline(items, fetch, ocr, analyze,
+                       fetch_limiter=None, ocr_limiter=None,
+                       fetch_concurrency=FETCH_CONCURRENCY,
+                       ocr_concurrency=OCR_CONCURRENCY,
+                       analyze_concurrency=ANALYZE_CONCURRENCY,
+                       prefetch=PREFETCH_DEPTH,
+                       ocr_timeout=OCR_TIMEOUT,
+                       reuse=None,
+                       on_result=None):
+    """
+    (キー, 画像URL) のリストを 取得 → OCR → 分析 の順に並行処理し、{キー: 分析結果} を返す
+
+    fetch: async (画像URL) -> 画像のバイト列
+    ocr: async (画像) -> 問題文
+    analyze: (問題文) -> 分析結果（イベントループを止めないようにスレッドで実行する）
+    ocr_timeout: これを過ぎた OCR は失敗として次のステージに流す
+      スレッドで実行中の OCR は取り消せないので、終わるまでそのワーカーは次の画像を取らない
+      （タイムアウトしても OCR の同時実行数・レート制限を超えない）
+    reuse: (画像) -> 他の行の問題文を待つ Future か None（重複画像など）
+      Future を返した行は OCR のワーカーの枠を使わずに待ち、結果が None なら自分で OCR する
+    on_result: (キー, 分析結果) を受け取るコールバック（進捗表示・途中保存用）
+    """
+    fetch_queue = asyncio.Queue()
+    ocr_queue = asyncio.Queue(maxsize=prefetch)
+    analyze_queue = asyncio.Queue(maxsize=prefetch)
+    results = {}
+    # 他の行の結果を待っている行
+    waiting = set()
+
+    # 行は後のステージから OCR に戻ることもあるので、全ての行の分析が終わるまで待つ
+    remaining = 0
+    finished = asyncio.Event()
+    for item in items:
+        fetch_queue.put_nowait(item)
+        remaining += 1
+    if remaining == 0:
+        finished.set()
+
+    async def wait_for_reuse(key, image, future):
+        try:
+            question_text = await future
+        except Exception:
+            question_text = None
+        if question_text is None:
+            await ocr_queue.put((key, image))
+        else:
+            await analyze_queue.put((key, question_text))
+
+    async def fetch_worker():
+        while True:
+            key, image_url = await fetch_queue.get()
+            try:
+                if fetch_limiter:
+                    await fetch_limiter.acquire()
+                image = await fetch(image_url)
+            except Exception as e:
+                print(f"❌ 画像取得エラー: {key} - {str(e)}")
+                await analyze_queue.put((key, FETCH_FAILED_TEXT))
+            else:
+                future = reuse(image) if reuse else None
+                if future is None:
+                    await ocr_queue.put((key, image))
+                else:
+                    task = asyncio.create_task(wait_for_reuse(key, image, future))
+                    waiting.add(task)
+                    task.add_done_callback(waiting.discard)
+            finally:
+                fetch_queue.task_done()
+
+    async def ocr_worker():
+        while True:
+            key, image = await ocr_queue.get()
+            task = None
+            try:
+                if ocr_limiter:
+                    await ocr_limiter.acquire()
+                task = asyncio.ensure_future(ocr(image))
+                question_text = await asyncio.wait_for(asyncio.shield(task), ocr_timeout)
+            except asyncio.TimeoutError:
+                print(f"❌ OCRタイムアウト: {key}（{ocr_timeout}秒）")
+                question_text = OCR_FAILED_TEXT
+            except Exception as e:
+                print(f"❌ OCRエラー: {key} - {str(e)}")
+                question_text = OCR_FAILED_TEXT
+            await analyze_queue.put((key, question_text))
+            if task is not None and not task.done():
+                # タイムアウトした OCR が終わるまで、このワーカーの枠を空けない
+                await asyncio.gather(task, return_exceptions=True)
+            ocr_queue.task_done()
+
+    async def analyze_worker():
+        nonlocal remaining
+        while True:
+            key, question_text = await analyze_queue.get()
+            try:
+                results[key] = await asyncio.to_thread(analyze, question_text)
+                if on_result:
+                    # コールバックはコルーチンでもよい（途中結果の書き込みなど）
+                    callback_result = on_result(key, results[key])
+                    if asyncio.iscoroutine(callback_result):
+                        await callback_result
+            except Exception as e:
+                print(f"❌ 分析エラー: {key} - {str(e)}")
+            finally:
+                analyze_queue.task_done()
+                remaining -= 1
+                if remaining == 0:
+                    finished.set()
+
+    workers = (
+        [asyncio.create_task(fetch_worker()) for _ in range(fetch_concurrency)] +
+        [asyncio.create_task(ocr_worker()) for _ in range(ocr_concurrency)] +
+        [asyncio.create_task(analyze_worker()) for _ in range(analyze_concurrency)]
+    )
+
+    try:
+        await finished.wait()
+    finally:
+        tasks = workers + list(waiting)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return results
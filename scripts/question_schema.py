@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+検索向けの questions テーブル定義（Postgres / Supabase）
+
+- 分野タグは text[] で持ち GIN インデックスで複数タグ検索
+- 正答率は数値（'75%' → 75.00）
+- 問題文・キーワードは pg_trgm の GIN インデックスで部分一致検索（日本語は単語に区切れないため）
+- 年度で RANGE パーティション分割（年度指定の検索は該当年度だけを読む）
+
+パーティションテーブルの一意制約にはパーティションキーを含める必要があるため、
+主キーは (year, question_id) とする（問題IDは年度を含むので実質的に同じ）
+"""
+
+# パーティションを用意しておく年度の範囲（範囲外は DEFAULT パーティションに入る）
+FIRST_PARTITION_YEAR = 2006
+LAST_PARTITION_YEAR = 2035
+
+# 分野タグの文字列（'地形,農業' など）を text[] に変換する式
+CATEGORIES_FROM_TEXT_SQL = (
+    "ARRAY(SELECT btrim(tag) FROM regexp_split_to_table(COALESCE({column}, ''), '[,、，]') AS tag "
+    "WHERE btrim(tag) <> '')"
+)
+
+# 正答率の文字列（'75%' など）を数値に変換する式
+CORRECT_RATE_FROM_TEXT_SQL = "NULLIF(regexp_replace({column}, '[^0-9.]', '', 'g'), '')::NUMERIC(5, 2)"
+
+SEARCH_SCHEMA_SQL = f"""
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- 地理問題データベーステーブル（年度でパーティション分割）
+CREATE TABLE questions (
+    id BIGSERIAL,
+    question_id VARCHAR(50) NOT NULL,
+    year SMALLINT NOT NULL,
+    category VARCHAR(100),
+    categories TEXT[] NOT NULL DEFAULT '{{}}',
+    answer VARCHAR(10),
+    correct_rate NUMERIC(5, 2),
+    image_url TEXT,
+    question_text TEXT,
+    keywords TEXT,
+    created_date TIMESTAMP DEFAULT NOW(),
+    notes TEXT,
+    PRIMARY KEY (year, question_id)
+) PARTITION BY RANGE (year);
+
+DO $$
+BEGIN
+    FOR y IN {FIRST_PARTITION_YEAR}..{LAST_PARTITION_YEAR} LOOP
+        EXECUTE format('CREATE TABLE questions_%s PARTITION OF questions FOR VALUES FROM (%s) TO (%s)', y, y, y + 1);
+    END LOOP;
+END $$;
+CREATE TABLE questions_default PARTITION OF questions DEFAULT;
+
+-- 問題検索用のインデックス（親テーブルに作ると全パーティションに作られる）
+CREATE INDEX idx_questions_categories ON questions USING GIN (categories);
+CREATE INDEX idx_questions_question_text_trgm ON questions USING GIN (question_text gin_trgm_ops);
+CREATE INDEX idx_questions_keywords_trgm ON questions USING GIN (keywords gin_trgm_ops);
+CREATE INDEX idx_questions_year_correct_rate ON questions (year, correct_rate);
+CREATE INDEX idx_questions_question_id ON questions (question_id);
+
+-- 行レベルセキュリティを有効化（誰でも読み取り可能）
+ALTER TABLE questions ENABLE ROW LEVEL SECURITY;
+
+-- 読み取り専用ポリシー
+CREATE POLICY "Anyone can read questions" ON questions
+    FOR SELECT USING (true);
+"""
+
+# 001 の questions テーブルを残したまま名前を変える（制約・シーケンス名の衝突を避ける）
+RENAME_LEGACY_SQL = """
+ALTER TABLE questions RENAME TO questions_legacy;
+ALTER INDEX questions_pkey RENAME TO questions_legacy_pkey;
+ALTER INDEX questions_question_id_key RENAME TO questions_legacy_question_id_key;
+ALTER SEQUENCE questions_id_seq RENAME TO questions_legacy_id_seq;
+ALTER INDEX IF EXISTS idx_questions_year RENAME TO idx_questions_legacy_year;
+ALTER INDEX IF EXISTS idx_questions_category RENAME TO idx_questions_legacy_category;
+ALTER INDEX IF EXISTS idx_questions_question_id RENAME TO idx_questions_legacy_question_id;
+"""
+
+COPY_FROM_LEGACY_SQL = f"""
+INSERT INTO questions (question_id, year, category, categories, answer, correct_rate, image_url, created_date, notes)
+SELECT
+    question_id,
+    COALESCE(year, NULLIF(substring(question_id FROM '^(\\d{{4}})'), '')::SMALLINT),
+    category,
+    {CATEGORIES_FROM_TEXT_SQL.format(column='category')},
+    answer,
+    {CORRECT_RATE_FROM_TEXT_SQL.format(column='correct_rate')},
+    image_url,
+    created_date,
+    notes
+FROM questions_legacy
+WHERE COALESCE(year, NULLIF(substring(question_id FROM '^(\\d{{4}})'), '')::SMALLINT) IS NOT NULL
+ON CONFLICT (year, question_id) DO NOTHING;
+"""
+
+# 001 の後に適用する移行（既存データは新しいテーブルに移し、旧テーブルは残す）
+# supabase db push はファイルごとにトランザクションで実行する
+MIGRATION_SQL = f"""
+-- 検索向けの questions テーブルに移行
+{RENAME_LEGACY_SQL}
+{SEARCH_SCHEMA_SQL}
+{COPY_FROM_LEGACY_SQL}
+ANALYZE questions;
+"""
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+問題データを年度別・分野別の JSON シャードに分けて書き出す（ビルド時に実行）
+
+シャードのファイル名には内容のハッシュを含めるので、CDN・ブラウザで永続的に
+キャッシュできる。どのシャードがあるかは小さなマニフェストにまとめる。
+圧縮は配信時に Next.js / CDN が Accept-Encoding に合わせて行うので、圧縮済みのファイルは置かない
+（マニフェストには gzip したときのサイズを目安として記録する）。
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+from sheet_questions import split_categories
+
+DEFAULT_SHARD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 'public', 'data', 'questions')
+MANIFEST_NAME = 'manifest.json'
+# ブラウザから参照するパス（public/ 以下）
+PUBLIC_PATH = '/data/questions'
+
+# ファイル名に含めるハッシュの長さ
+HASH_LENGTH = 16
+# 以前のビルドで書き出していた圧縮済みファイル
+SIDECAR_PATTERN = re.compile(r'\.json\.(gz|br)$')
+
+DRIVE_FILE_PATTERN = re.compile(r'/file/d/([a-zA-Z0-9-_]+)')
+
+
+def direct_image_url(drive_url):
+    """Google Drive URL を直接表示可能なURLに変換（route.ts と同じ変換）"""
+    if not drive_url:
+        return ''
+    match = DRIVE_FILE_PATTERN.search(drive_url)
+    if match:
+        return f"https://drive.google.com/uc?export=view&id={match.group(1)}"
+    return drive_url
+
+
+def to_client_question(question):
+    """問題データをフロントエンドの Question 型（/api/questions と同じ形）に変換"""
+    return {
+        'id': question['question_id'],
+        'questionId': question['question_id'],
+        'category': question['category'],
+        'answer': question['answer'],
+        'correctRate': question['correct_rate'],
+        'imageUrl': direct_image_url(question['image_url']),
+        'year': str(question['year']),
+        'notes': question['notes'],
+        'createdDate': question['created_date'],
+        'imageFile': question['image_url'],
+        'questionText': question['keywords'],
+        'fullQuestionText': question['question_text']
+    }
+
+
+def _write_shard(shard_dir, prefix, questions):
+    """シャードを内容ハッシュ付きのファイル名で書き出し、マニフェストの項目を返す"""
+    data = json.dumps(questions, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    content_hash = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    file_name = f'{prefix}.{content_hash}.json'
+    path = os.path.join(shard_dir, file_name)
+
+    # 同じ内容のシャードは前回のビルドで書き出し済み
+    if not os.path.exists(path):
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    return {
+        'file': f'{PUBLIC_PATH}/{file_name}',
+        'count': len(questions),
+        'bytes': len(data),
+        'gzip_bytes': len(gzip.compress(data, mtime=0))
+    }
+
+
+def _referenced_files(manifest):
+    """マニフェストが参照するシャードのファイル名"""
+    entries = list(manifest.get('years', {}).values()) + list(manifest.get('categories', {}).values())
+    return {os.path.basename(entry['file']) for entry in entries}
+
+
+def build_shards(questions, shard_dir=DEFAULT_SHARD_DIR):
+    """
+    問題データを年度別・分野別のシャードとマニフェストに書き出し、マニフェストを返す
+
+    前回のマニフェストが参照するシャードは、デプロイ中のページのために1世代だけ残す
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    manifest_path = os.path.join(shard_dir, MANIFEST_NAME)
+    previous = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+
+    # 問題ID順に並べ、同じデータからは常に同じシャード（= 同じハッシュ）になるようにする
+    by_year = {}
+    by_category = {}
+    for question in sorted(questions, key=lambda q: (q['year'] or 0, q['question_id'])):
+        client_question = to_client_question(question)
+        by_year.setdefault(str(question['year']), []).append(client_question)
+        for category in split_categories(question['category']):
+            by_category.setdefault(category, []).append(client_question)
+
+    manifest = {
+        'years': {
+            year: _write_shard(shard_dir, f'year-{year}', shard)
+            for year, shard in sorted(by_year.items(), reverse=True)
+        },
+        'categories': {
+            category: _write_shard(shard_dir, f'category-{hashlib.sha1(category.encode("utf-8")).hexdigest()[:8]}', shard)
+            for category, shard in sorted(by_category.items())
+        }
+    }
+    manifest['count'] = sum(entry['count'] for entry in manifest['years'].values())
+
+    with open(manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+    # どちらのマニフェストからも参照されなくなった古いシャードと、以前のビルドの圧縮済みファイルを削除
+    keep = _referenced_files(manifest) | _referenced_files(previous)
+    for file_name in os.listdir(shard_dir):
+        if (SIDECAR_PATTERN.search(file_name) or
+                (file_name.endswith('.json') and file_name != MANIFEST_NAME and file_name not in keep)):
+            os.remove(os.path.join(shard_dir, file_name))
+
+    return manifest
+
+
+def print_shard_summary(manifest):
+    """シャードの件数とサイズを表示"""
+    for label, group in (('年度', manifest['years']), ('分野', manifest['categories'])):
+        total = sum(entry['bytes'] for entry in group.values())
+        total_gzip = sum(entry['gzip_bytes'] for entry in group.values())
+        print(f"📦 {label}別: {len(group)}シャード, {total:,} bytes (gzip {total_gzip:,})")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+問題データ全体の列指向スナップショット（Parquet）
+
+スプレッドシートの行を毎回 dict に変換し直す代わりに、分析・検索インデックス作成・
+移行処理はスナップショットから必要な列だけをメモリマップで読む。
+文字列列は辞書エンコードし、zstd で圧縮する。
+"""
+
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sheet_questions import split_categories, split_keywords
+
+DEFAULT_SNAPSHOT_DIR = '/Users/shun/geography-question-snapshots'
+MANIFEST_NAME = 'latest.json'
+
+# 列構成を変えたら上げる
+SNAPSHOT_FORMAT_VERSION = 1
+
+# 1つの行グループ（= 1回の書き込み）に入れる行数
+ROW_GROUP_SIZE = 10_000
+ZSTD_LEVEL = 9
+
+SCHEMA = pa.schema([
+    pa.field('question_id', pa.string(), nullable=False),
+    pa.field('sheet', pa.string()),
+    pa.field('year', pa.int16()),
+    pa.field('category', pa.string()),
+    pa.field('categories', pa.list_(pa.string())),
+    pa.field('answer', pa.string()),
+    pa.field('correct_rate', pa.string()),
+    pa.field('notes', pa.string()),
+    pa.field('created_date', pa.string()),
+    pa.field('image_url', pa.string()),
+    pa.field('keywords', pa.string()),
+    pa.field('keyword_list', pa.list_(pa.string())),
+    pa.field('question_text', pa.string())
+])
+
+# 値の種類が少ない列（読み込み時も DictionaryArray のまま扱う）
+DICTIONARY_COLUMNS = ['sheet', 'category', 'answer', 'correct_rate', 'created_date']
+
+
+def _to_record(question):
+    """問題データの辞書をスナップショットの1行に変換"""
+    record = {name: question.get(name) or None for name in SCHEMA.names}
+    record['question_id'] = question['question_id']
+    record['year'] = question.get('year')
+    record['categories'] = split_categories(question.get('category'))
+    record['keyword_list'] = split_keywords(question.get('keywords'))
+    return record
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_manifest(snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    """最新スナップショットの情報（なければ None）"""
+    path = os.path.join(snapshot_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_snapshot(questions, snapshot_dir=DEFAULT_SNAPSHOT_DIR, source=None):
+    """
+    問題データを新しいバージョンのスナップショットとして書き出し、マニフェストを返す
+
+    行は ROW_GROUP_SIZE 件ずつ書き出すので、全件をメモリに載せない。
+    内容が前回と同じなら新しいファイルは残さず、前回のマニフェストを返す
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    version = datetime.now().strftime('%Y%m%d%H%M%S')
+    file_name = f'questions-{version}.parquet'
+    path = os.path.join(snapshot_dir, file_name)
+    temp_path = path + '.tmp'
+
+    schema = SCHEMA.with_metadata({
+        b'snapshot_format_version': str(SNAPSHOT_FORMAT_VERSION).encode(),
+        b'snapshot_version': version.encode(),
+        b'source': json.dumps(source or {}, ensure_ascii=False).encode('utf-8')
+    })
+
+    started = time.perf_counter()
+    rows = 0
+    # 作成日時のメタデータに左右されないよう、行データだけのハッシュで前回と比較する
+    content_digest = hashlib.sha256()
+    # 文字列列はすべて辞書エンコード（問題文のように値がほぼ一意の列は
+    # 辞書ページが上限を超えた時点で Parquet が自動的に通常のエンコードに切り替える）
+    with pq.ParquetWriter(temp_path, schema,
+                          compression='zstd', compression_level=ZSTD_LEVEL,
+                          use_dictionary=True) as writer:
+        batch = []
+        for question in questions:
+            record = _to_record(question)
+            content_digest.update(json.dumps(record, ensure_ascii=False, sort_keys=True).encode('utf-8'))
+            batch.append(record)
+            if len(batch) >= ROW_GROUP_SIZE:
+                writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+                rows += len(batch)
+                batch = []
+        if batch:
+            writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+            rows += len(batch)
+
+    content_hash = content_digest.hexdigest()
+    previous = read_manifest(snapshot_dir)
+    if previous and previous.get('content_hash') == content_hash:
+        os.remove(temp_path)
+        print(f"📦 内容に変更がないため、前回のスナップショットを使います: {previous['file']}")
+        return previous
+
+    os.replace(temp_path, path)
+    manifest = {
+        'file': file_name,
+        'snapshot_version': version,
+        'snapshot_format_version': SNAPSHOT_FORMAT_VERSION,
+        'rows': rows,
+        'bytes': os.path.getsize(path),
+        'sha256': _file_sha256(path),
+        'content_hash': content_hash,
+        'source': source or {},
+        'created_at': datetime.now().isoformat()
+    }
+    manifest_temp = os.path.join(snapshot_dir, MANIFEST_NAME + '.tmp')
+    with open(manifest_temp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(manifest_temp, os.path.join(snapshot_dir, MANIFEST_NAME))
+
+    print(f"📦 スナップショットを作成: {file_name}（{rows:,}行, {manifest['bytes']:,} bytes, "
+          f"{time.perf_counter() - started:.1f} 秒）")
+    return manifest
+
+
+def snapshot_path(snapshot_dir=DEFAULT_SNAPSHOT_DIR):
+    """最新スナップショットのファイルパス"""
+    manifest = read_manifest(snapshot_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"スナップショットがありません: {snapshot_dir}")
+    return os.path.join(snapshot_dir, manifest['file'])
+
+
+def read_snapshot(columns=None, snapshot_dir=DEFAULT_SNAPSHOT_DIR, filters=None):
+    """
+    最新スナップショットを pyarrow.Table で読む
+
+    columns を指定すればその列だけを読み（問題文を読まない処理は問題文列に触れない）、
+    filters（例: [('year', '=', 2024)]）で行グループ単位に絞り込む
+    """
+    read_dictionary = [name for name in DICTIONARY_COLUMNS if columns is None or name in columns]
+    return pq.read_table(snapshot_path(snapshot_dir), columns=columns, filters=filters,
+                         memory_map=True, read_dictionary=read_dictionary)
+
+
+def iter_snapshot_questions(columns=None, snapshot_dir=DEFAULT_SNAPSHOT_DIR, batch_size=ROW_GROUP_SIZE):
+    """スナップショットの行を辞書で順に返す（バッチ単位で読むのでメモリ使用量は一定）"""
+    parquet_file = pq.ParquetFile(snapshot_path(snapshot_dir), memory_map=True)
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+        yield from batch.to_pylist()
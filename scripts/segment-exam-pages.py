@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+試験の1ページ分の画像を問題ごとに切り出す
+
+複数の問題（行）が同じページ画像を指している場合、ページを問題の領域に分けて
+上から順に割り当て、切り出した画像と領域を問題IDごとに保存する。
+extract-question-text.py は、切り出した元のページが今の画像と同じ（md5 が同じ）なら
+ページ全体の代わりに切り出した画像を OCR する。
+
+前回と同じページ（md5 が同じ）で全ての問題が切り出し済みなら分割しない。
+問題数と領域の数が合わないページは、前回の切り出しを削除してページ全体を使わせる。
+"""
+
+import hashlib
+import os
+import sys
+from collections import defaultdict
+from image_pack import ImagePack, fetch_images, to_direct_url
+from page_segmenter import SegmentStore, segment_pages, choose_segments, crop
+from sheet_questions import SPREADSHEET_ID, list_year_tabs, fetch_tab_values, iter_questions
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from drive_snapshot import DEFAULT_SNAPSHOT_PATH, open_snapshot, lookup_md5
+from google_clients import get_service, SHEETS_READONLY_SCOPES
+
+def shared_pages(questions):
+    """{画像URL: [問題ID, ...]} のうち、複数の問題が指しているページだけを返す"""
+    pages = defaultdict(list)
+    for question in questions:
+        if question['image_url']:
+            pages[question['image_url']].append(question['question_id'])
+    return {image_url: question_ids for image_url, question_ids in pages.items() if len(question_ids) > 1}
+
+def segment_exam_pages(spreadsheet_id=SPREADSHEET_ID, workers=None):
+    """全年度タブで複数の問題が指しているページを分割して保存"""
+    service = get_service('sheets', 'v4', scopes=SHEETS_READONLY_SCOPES)
+    titles = list_year_tabs(service, spreadsheet_id)
+    tab_values = fetch_tab_values(service, titles, spreadsheet_id)
+    pages = shared_pages(iter_questions(tab_values))
+    print(f"📄 複数の問題を含むページ: {len(pages)}枚（{sum(len(ids) for ids in pages.values())}問題）")
+
+    image_pack = ImagePack()
+    store = SegmentStore()
+    # スナップショットの md5 と同じ画像だけを画像パックから使う（変わったページはダウンロードし直す）
+    snapshot = open_snapshot(DEFAULT_SNAPSHOT_PATH) if os.path.exists(DEFAULT_SNAPSHOT_PATH) else None
+    images = fetch_images(image_pack, ((image_url, lookup_md5(snapshot, to_direct_url(image_url)[0]))
+                                       for image_url in pages))
+
+    # 前回と同じページで全ての問題が切り出し済みなら分割しない
+    targets = []
+    skipped = 0
+    for image_url, data in images.items():
+        page_md5 = hashlib.md5(data).hexdigest()
+        question_ids = pages[image_url]
+        if all((store.get(question_id) or {}).get('page_md5') == page_md5 for question_id in question_ids):
+            skipped += 1
+        else:
+            targets.append((image_url, page_md5, data))
+    print(f"✂️  {len(targets)}ページを分割中...（変更のない{skipped}ページをスキップ）")
+
+    counts = defaultdict(int)
+    for (image_url, page_md5, data), segments in zip(targets, segment_pages([data for _, _, data in targets],
+                                                                            workers)):
+        question_ids = pages[image_url]
+        chosen = choose_segments(segments, len(question_ids))
+        if chosen is None:
+            counts['mismatch'] += 1
+            print(f"⚠️  問題数と領域の数が合いません: {question_ids[0]} ほか（{len(question_ids)}問題・"
+                  f"アンカー {len(segments.anchored)}・空白 {len(segments.blocks)}）")
+            # 前回の切り出しは変わる前のページのものなので残さない
+            store.delete(question_ids)
+            continue
+
+        method, bboxes = chosen
+        counts[method] += 1
+        for question_id, bbox in zip(question_ids, bboxes):
+            store.put(question_id, page_md5, segments.size, bbox, method, crop(data, bbox))
+
+    print(f"\n✅ 分割完了: アンカー {counts['anchor']}ページ・空白 {counts['whitespace']}ページ"
+          f"・分割できず {counts['mismatch']}ページ")
+    store.close()
+    image_pack.close()
+    if snapshot is not None:
+        snapshot.close()
+    return dict(counts)
+
+if __name__ == "__main__":
+    segment_exam_pages()
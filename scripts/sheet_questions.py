@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+スプレッドシートの年度別タブから問題データを読み込む
+"""
+
+import re
+
+SPREADSHEET_ID = '17cxHniOQP2C7QKCV8nqnn3IKEcd1HwWiDgExGb6FfEE'
+
+# 問題データの列（app/api/questions/route.ts と同じ並び）
+QUESTION_RANGE = 'A:K'
+COLUMNS = {
+    'question_id': 0,    # A列: 問題ID
+    'category': 2,       # C列: 分野タグ（地形,農業など）
+    'answer': 3,         # D列: 正答
+    'correct_rate': 4,   # E列: 正答率
+    'notes': 6,          # G列: ノート
+    'created_date': 7,   # H列: 作成日
+    'image_url': 8,      # I列: 画像URL
+    'keywords': 9,       # J列: OCRキーワード
+    'question_text': 10  # K列: 問題文全文
+}
+
+YEAR_PATTERN = re.compile(r'(20\d{2})')
+
+
+def year_from_title(title):
+    """タブ名から年度を取得（例: '2024年共通テスト地理B' → 2024）"""
+    match = YEAR_PATTERN.search(title)
+    return int(match.group(1)) if match else None
+
+
+def list_year_tabs(service, spreadsheet_id=SPREADSHEET_ID):
+    """年度を含むタブ名の一覧を1回の spreadsheets.get で取得"""
+    spreadsheet = service.spreadsheets().get(
+        spreadsheetId=spreadsheet_id,
+        fields='sheets.properties.title'
+    ).execute()
+    titles = [sheet['properties']['title'] for sheet in spreadsheet.get('sheets', [])]
+    return [title for title in titles if year_from_title(title)]
+
+
+def fetch_tab_values(service, titles, spreadsheet_id=SPREADSHEET_ID, cell_range=QUESTION_RANGE):
+    """複数タブの値を1回の values.batchGet で取得し、{タブ名: 行のリスト} を返す"""
+    if not titles:
+        return {}
+    response = service.spreadsheets().values().batchGet(
+        spreadsheetId=spreadsheet_id,
+        ranges=[f"'{title}'!{cell_range}" for title in titles],
+        fields='valueRanges(values)'
+    ).execute()
+    return {
+        title: value_range.get('values', [])
+        for title, value_range in zip(titles, response.get('valueRanges', []))
+    }
+
+
+def parse_question_row(row, sheet, year):
+    """シートの1行を問題データの辞書に変換"""
+    question = {name: (row[index] if len(row) > index else '') for name, index in COLUMNS.items()}
+    question['sheet'] = sheet
+    question['year'] = year
+    return question
+
+
+def iter_questions(tab_values):
+    """{タブ名: 行のリスト} から問題データを順に返す（ヘッダー行と問題IDのない行は除く）"""
+    for title, rows in tab_values.items():
+        year = year_from_title(title)
+        for row in rows[1:]:
+            if row and row[0]:
+                yield parse_question_row(row, title, year)
+
+
+def split_categories(category):
+    """分野タグ（'地形,農業' など）をリストに分割"""
+    return [tag.strip() for tag in re.split(r'[,、，]', category or '') if tag.strip()]
+
+
+def split_keywords(keywords):
+    """OCRキーワード（カンマまたは空白区切り）をリストに分割"""
+    return [keyword for keyword in re.split(r'[,、，\s]+', keywords or '') if keyword]
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+スプレッドシートへの差分書き込み
+
+行ごとのハッシュで変更のあった行を見つけ、変更されたセルだけを
+最小限の矩形範囲にまとめて1回の values.batchUpdate で送る
+"""
+
+import hashlib
+import time
+
+
+def _cell(row, column):
+    """セルの値（範囲外は空文字）を文字列で返す"""
+    if column < len(row) and row[column] is not None:
+        return str(row[column])
+    return ''
+
+
+def row_hash(row):
+    """行の内容のハッシュ（末尾の空セルは無視）"""
+    values = [_cell(row, column) for column in range(len(row))]
+    while values and values[-1] == '':
+        values.pop()
+    return hashlib.sha1('\x1f'.join(values).encode('utf-8')).hexdigest()
+
+
+def diff_cells(original, updated):
+    """変更されたセルを {(行番号, 列番号): 値} で返す（0始まり）"""
+    original_hashes = [row_hash(row) for row in original]
+    changes = {}
+
+    for row_index, row in enumerate(updated):
+        old_row = original[row_index] if row_index < len(original) else []
+        if row_index < len(original) and original_hashes[row_index] == row_hash(row):
+            continue
+        for column in range(max(len(row), len(old_row))):
+            value = _cell(row, column)
+            if value != _cell(old_row, column):
+                changes[(row_index, column)] = value
+
+    return changes
+
+
+def column_letter(column):
+    """0始まりの列番号を A1 形式の列名に変換（0 → A, 26 → AA）"""
+    letters = ''
+    column += 1
+    while column:
+        column, remainder = divmod(column - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def cells_to_ranges(changes):
+    """
+    変更セルを矩形範囲にまとめ、(開始行, 開始列, 値の2次元リスト) のリストを返す
+
+    各行の連続した列をまとめた後、同じ列範囲が連続する行を縦にまとめる
+    """
+    # 行ごとに連続する列をまとめる
+    runs_by_row = {}
+    for row_index, column in sorted(changes):
+        runs = runs_by_row.setdefault(row_index, [])
+        if runs and runs[-1][1] == column:
+            runs[-1][1] = column + 1
+        else:
+            runs.append([column, column + 1])
+
+    # 同じ列範囲が続く行を縦にまとめる
+    open_blocks = {}
+    blocks = []
+    for row_index in sorted(runs_by_row):
+        for start, end in runs_by_row[row_index]:
+            block = open_blocks.get((start, end))
+            if block is not None and block['end_row'] == row_index:
+                block['end_row'] = row_index + 1
+            else:
+                block = {'start_row': row_index, 'end_row': row_index + 1, 'start': start, 'end': end}
+                open_blocks[(start, end)] = block
+                blocks.append(block)
+
+    return [
+        (
+            block['start_row'],
+            block['start'],
+            [
+                [changes[(row_index, column)] for column in range(block['start'], block['end'])]
+                for row_index in range(block['start_row'], block['end_row'])
+            ]
+        )
+        for block in blocks
+    ]
+
+
+def a1_range(sheet_name, start_row, start_column, values):
+    """矩形範囲を A1 表記にする"""
+    end_row = start_row + len(values)
+    end_column = start_column + len(values[0]) - 1
+    return (f"'{sheet_name}'!{column_letter(start_column)}{start_row + 1}:"
+            f"{column_letter(end_column)}{end_row}")
+
+
+def write_changes(service, spreadsheet_id, sheet_name, original, updated, value_input_option='RAW'):
+    """
+    original（読み込んだ値）と updated（編集後の値）の差分だけを書き込む
+
+    戻り値: (更新したセル数, 範囲の数)
+    """
+    changes = diff_cells(original, updated)
+    if not changes:
+        return 0, 0
+
+    data = [
+        {'range': a1_range(sheet_name, start_row, start_column, values), 'values': values}
+        for start_row, start_column, values in cells_to_ranges(changes)
+    ]
+
+    service.spreadsheets().values().batchUpdate(
+        spreadsheetId=spreadsheet_id,
+        body={
+            'valueInputOption': value_input_option,
+            'data': data
+        }
+    ).execute()
+
+    return len(changes), len(data)
+
+
+class IncrementalSheetWriter:
+    """
+    長時間の処理の途中結果を、一定の行数・時間ごとに差分で書き込む
+
+    前回書き込んだ内容を覚えておき、その後に変わったセルだけを送る
+    """
+
+    def __init__(self, service, spreadsheet_id, sheet_name, original,
+                 every_rows=50, interval_seconds=60):
+        self.service = service
+        self.spreadsheet_id = spreadsheet_id
+        self.sheet_name = sheet_name
+        self.written = [list(row) for row in original]
+        self.every_rows = every_rows
+        self.interval_seconds = interval_seconds
+        self.pending_rows = 0
+        self.last_flush = time.monotonic()
+
+    def mark_row(self):
+        """1行分の更新を記録し、書き込みが必要かどうかを返す"""
+        self.pending_rows += 1
+        return (self.pending_rows >= self.every_rows or
+                time.monotonic() - self.last_flush >= self.interval_seconds)
+
+    def flush(self, values):
+        """前回の書き込み以降の差分を書き込み、(セル数, 範囲の数) を返す"""
+        current = [list(row) for row in values]
+        result = write_changes(self.service, self.spreadsheet_id, self.sheet_name, self.written, current)
+        self.written = current
+        self.pending_rows = 0
+        self.last_flush = time.monotonic()
+        return result
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+全年度タブの問題データをローカルの SQLite レプリカ（全文検索付き）に同期
+"""
+
+import os
+import sys
+from sheet_questions import SPREADSHEET_ID, list_year_tabs, fetch_tab_values, iter_questions
+from question_index import DEFAULT_INDEX_PATH, open_index, rebuild_index, search_questions
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from google_clients import get_service, SHEETS_READONLY_SCOPES
+
+def sync_question_index(db_path=DEFAULT_INDEX_PATH):
+    """スプレッドシートの全年度タブを読み込んでレプリカを作り直す"""
+    service = get_service('sheets', 'v4', scopes=SHEETS_READONLY_SCOPES)
+
+    titles = list_year_tabs(service, SPREADSHEET_ID)
+    print(f"📑 年度タブ: {', '.join(titles)}")
+
+    tab_values = fetch_tab_values(service, titles, SPREADSHEET_ID)
+
+    conn = open_index(db_path)
+    count = rebuild_index(conn, iter_questions(tab_values))
+    print(f"✅ {count}問題を {db_path} に同期しました")
+    return conn
+
+def main():
+    conn = sync_question_index()
+
+    # 引数があれば検索して表示
+    if len(sys.argv) > 1:
+        query = sys.argv[1]
+        for question in search_questions(conn, text=query):
+            print(f"  {question['year']} {question['question_id']} [{question['category']}] {question['keywords']}")
+
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+画像からの問題文抽出をバッチジョブ（Message Batches API）でまとめて実行する
+
+数百件の抽出リクエストを1つのジョブにまとめて送り、完了をポーリングしてから
+結果（JSONL）をストリームで読み、1問ずつ
+{'questionText', 'keywords', 'regions', 'topics'} の形で返す。
+
+環境変数 ANTHROPIC_BASE_URL を設定すると接続先を差し替えられる
+（オフラインでは scripts/mock_batch_server.py を使う）。
+"""
+
+import base64
+import json
+import os
+import re
+import time
+import requests
+
+DEFAULT_BASE_URL = 'https://api.anthropic.com'
+API_VERSION = '2023-06-01'
+
+MODEL = 'claude-3-5-sonnet-20241022'
+MAX_TOKENS = 1000
+# app/api/extract-text/route.ts と同じプロンプト
+EXTRACTION_PROMPT = """この地理の問題画像から以下を抽出してJSONで返してください：
+
+{
+  "questionText": "問題文の全文",
+  "keywords": ["キーワード1", "キーワード2", ...],
+  "regions": ["地域名1", "地域名2", ...],
+  "topics": ["分野1", "分野2", ...]
+}
+
+地理的な専門用語、地域名、気候、産業、地形などのキーワードを網羅的に抽出してください。"""
+
+# 1つのジョブにまとめるリクエスト数と、リクエスト本文の合計サイズの上限
+BATCH_REQUESTS = 500
+BATCH_MAX_BYTES = 200 * 1024 * 1024
+POLL_INTERVAL_SECONDS = 30
+REQUEST_TIMEOUT = (10, 300)
+
+EXTRACTION_FIELDS = ['questionText', 'keywords', 'regions', 'topics']
+
+MEDIA_TYPES = {
+    b'\x89PNG': 'image/png',
+    b'\xff\xd8\xff': 'image/jpeg',
+    b'GIF8': 'image/gif',
+    b'RIFF': 'image/webp',
+}
+
+
+def media_type(image):
+    """画像のバイト列の先頭から MIME タイプを判定"""
+    head = bytes(image[:4])
+    for magic, mime_type in MEDIA_TYPES.items():
+        if head.startswith(magic):
+            return mime_type
+    return 'image/png'
+
+
+def build_request(custom_id, image):
+    """1枚の画像の抽出リクエスト"""
+    return {
+        'custom_id': custom_id,
+        'params': {
+            'model': MODEL,
+            'max_tokens': MAX_TOKENS,
+            'messages': [{
+                'role': 'user',
+                'content': [
+                    {'type': 'image', 'source': {
+                        'type': 'base64',
+                        'media_type': media_type(image),
+                        'data': base64.b64encode(image).decode('ascii')
+                    }},
+                    {'type': 'text', 'text': EXTRACTION_PROMPT}
+                ]
+            }]
+        }
+    }
+
+
+def parse_extraction(text):
+    """モデルの応答テキストを抽出結果の辞書にする（コードブロックで囲まれていてもよい）"""
+    match = re.search(r'\{.*\}', text, re.DOTALL)
+    data = json.loads(match.group(0) if match else text)
+    return {
+        'questionText': str(data.get('questionText', '')),
+        'keywords': list(data.get('keywords', [])),
+        'regions': list(data.get('regions', [])),
+        'topics': list(data.get('topics', []))
+    }
+
+
+class BatchClient:
+    """Message Batches API のクライアント（1つの HTTP セッションを使い回す）"""
+
+    def __init__(self, api_key=None, base_url=None):
+        self.base_url = (base_url or os.environ.get('ANTHROPIC_BASE_URL') or DEFAULT_BASE_URL).rstrip('/')
+        self.session = requests.Session()
+        self.session.headers.update({
+            'x-api-key': api_key or os.environ.get('ANTHROPIC_API_KEY', ''),
+            'anthropic-version': API_VERSION,
+            'content-type': 'application/json'
+        })
+
+    def create(self, batch_requests):
+        """ジョブを作成してバッチの情報を返す"""
+        response = self.session.post(f'{self.base_url}/v1/messages/batches',
+                                     json={'requests': batch_requests}, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+    def retrieve(self, batch_id):
+        response = self.session.get(f'{self.base_url}/v1/messages/batches/{batch_id}', timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+    def wait(self, batch_id, poll_interval=POLL_INTERVAL_SECONDS):
+        """ジョブが終わるまでポーリング"""
+        while True:
+            batch = self.retrieve(batch_id)
+            if batch['processing_status'] == 'ended':
+                return batch
+            counts = batch.get('request_counts', {})
+            print(f"⏳ バッチ {batch_id}: 処理中 {counts.get('processing', '?')}件・"
+                  f"完了 {counts.get('succeeded', 0)}件")
+            time.sleep(poll_interval)
+
+    def iter_results(self, batch):
+        """結果の JSONL をストリームで読み、(custom_id, 抽出結果 or None, エラー) を返す"""
+        results_url = batch.get('results_url') or f"{self.base_url}/v1/messages/batches/{batch['id']}/results"
+        with self.session.get(results_url, stream=True, timeout=REQUEST_TIMEOUT) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                entry = json.loads(line)
+                result = entry['result']
+                if result['type'] != 'succeeded':
+                    error = result.get('error', {}).get('message') or result['type']
+                    yield entry['custom_id'], None, error
+                    continue
+                text = ''.join(block.get('text', '') for block in result['message']['content'])
+                try:
+                    yield entry['custom_id'], parse_extraction(text), None
+                except ValueError as e:
+                    yield entry['custom_id'], None, f"JSON の解析に失敗: {e}"
+
+
+def chunk_requests(items, max_requests=BATCH_REQUESTS, max_bytes=BATCH_MAX_BYTES):
+    """(custom_id, 画像) を件数・サイズの上限ごとにリクエストのリストにまとめる"""
+    chunk, size = [], 0
+    for custom_id, image in items:
+        request = build_request(custom_id, image)
+        request_size = len(request['params']['messages'][0]['content'][0]['source']['data'])
+        if chunk and (len(chunk) >= max_requests or size + request_size > max_bytes):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(request)
+        size += request_size
+    if chunk:
+        yield chunk
@@ -0,0 +1,23 @@
+"""テストからルートと scripts/ のモジュールを import できるようにする"""
+
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+
+
+@pytest.fixture
+def extract_script():
+    """scripts/extract-question-text.py をモジュールとして読み込む"""
+    pytest.importorskip('requests')
+    pytest.importorskip('googleapiclient')
+    spec = importlib.util.spec_from_file_location(
+        'extract_question_text', os.path.join(ROOT, 'scripts', 'extract-question-text.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
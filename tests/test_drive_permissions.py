@@ -0,0 +1,109 @@
+"""make_files_public を偽の Google API サーバー（scripts/fake_google_server.py）に対して実行する"""
+
+import pytest
+
+pytest.importorskip('googleapiclient')
+pytest.importorskip('google_auth_httplib2')
+
+import google_clients
+import quota_governor
+from drive_permissions import make_files_public
+from fake_google_data import FOLDER_MIME_TYPE, generate_dataset
+from fake_google_server import FakeGoogleServer
+
+
+@pytest.fixture
+def server(monkeypatch):
+    with FakeGoogleServer(generate_dataset(images=250, years=1)) as server:
+        monkeypatch.setenv(google_clients.ENDPOINT_ENV, server.endpoint)
+        # テストごとに governor を作り直し、バックオフを短くする
+        monkeypatch.setattr(quota_governor, '_governors', {})
+        monkeypatch.setattr(quota_governor, 'BACKOFF_BASE_SECONDS', 0.01)
+        monkeypatch.setattr(quota_governor, 'BACKOFF_MAX_SECONDS', 0.05)
+        yield server
+
+
+def image_ids(server):
+    return [file_id for file_id, item in server.files.items() if item['mimeType'] != FOLDER_MIME_TYPE]
+
+
+def anyone_permissions(server, file_id):
+    return [permission for permission in server.permissions[file_id] if permission['type'] == 'anyone']
+
+
+def test_files_are_made_public_in_batches(server):
+    ids = image_ids(server)
+    reported = []
+
+    results = make_files_public(None, ids, batch_size=100, on_result=reported.append)
+
+    assert len(results) == len(ids)
+    assert reported == results
+    assert {result['status'] for result in results} == {'created'}
+    assert all(len(anyone_permissions(server, file_id)) == 1 for file_id in ids)
+    # 権限の確認と追加がそれぞれ 100件ずつのバッチになる
+    expected = sorted([100] * (len(ids) // 100) + [len(ids) % 100] * bool(len(ids) % 100))
+    endpoints = server.stats()['endpoints']
+    assert endpoints['drive.files.get']['calls'] == len(ids)
+    assert endpoints['drive.permissions.create']['calls'] == len(ids)
+    assert sorted(server.stats()['batch_sizes']['drive']) == sorted(expected * 2)
+    # バッチ自体が 400 で拒否されず、中の各リクエストが処理されている
+    assert dict(endpoints['drive.batch']['status']) == {200: len(expected) * 2}
+    assert dict(endpoints['drive.permissions.create']['status']) == {200: len(ids)}
+
+
+def test_public_files_are_skipped(server):
+    ids = image_ids(server)
+    make_files_public(None, ids[:30])
+    server.reset_stats()
+
+    results = make_files_public(None, ids[:50])
+
+    statuses = {result['id']: result['status'] for result in results}
+    assert [statuses[file_id] for file_id in ids[:30]] == ['already_public'] * 30
+    assert [statuses[file_id] for file_id in ids[30:50]] == ['created'] * 20
+    assert server.stats()['endpoints']['drive.permissions.create']['calls'] == 20
+    assert all(len(anyone_permissions(server, file_id)) == 1 for file_id in ids[:50])
+
+
+def test_batch_size_is_capped_at_api_limit(server):
+    ids = image_ids(server)
+
+    results = make_files_public(None, ids, batch_size=500, check_existing=False)
+
+    assert {result['status'] for result in results} == {'created'}
+    # Drive のバッチ上限（100件）を超えるとサーバーが 400 を返す
+    assert max(server.stats()['batch_sizes']['drive']) == 100
+    assert 'drive.batch' in server.stats()['endpoints']
+
+
+def test_rate_limited_items_are_retried(server):
+    ids = image_ids(server)[:120]
+    server.configure(error_rate=0.2)
+
+    results = make_files_public(None, ids, batch_size=40)
+
+    stats = server.stats()
+    assert stats['rate_limited'] > 0
+    assert {result['status'] for result in results} == {'created'}
+    # 429 になったファイルだけを再送するので、権限は1つずつしか作られない
+    assert all(len(anyone_permissions(server, file_id)) == 1 for file_id in ids)
+    # 再送のバッチは失敗したファイルだけなので、最初のバッチより小さい
+    sizes = stats['batch_sizes']['drive']
+    assert max(sizes) == 40
+    assert len(sizes) > 6 and min(sizes) < 40
+    assert quota_governor.get_governor('drive').stats['rate_limited'] > 0
+
+
+def test_missing_files_are_reported_as_errors(server):
+    ids = image_ids(server)[:5]
+    missing = 'missing-file-id'
+
+    results = make_files_public(None, ids + [missing, ids[0], {'id': missing, 'name': '存在しない画像'}])
+
+    assert len(results) == len(ids) + 1
+    statuses = {result['id']: result for result in results}
+    assert statuses[missing]['status'] == 'error'
+    assert 'not found' in statuses[missing]['error']
+    assert [statuses[file_id]['status'] for file_id in ids] == ['created'] * len(ids)
+    assert missing not in server.permissions
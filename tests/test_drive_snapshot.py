@@ -0,0 +1,114 @@
+"""スナップショットへの変更の反映とパスでの検索"""
+
+import pytest
+
+pytest.importorskip('googleapiclient')
+
+import drive_snapshot
+from drive_snapshot import FOLDER_MIME_TYPE, open_snapshot, query_files
+
+ROOT_ID = 'root'
+
+
+def folder(file_id, name, parent_id):
+    return {'id': file_id, 'name': name, 'mimeType': FOLDER_MIME_TYPE, 'parents': [parent_id]}
+
+
+def image(file_id, name, parent_id):
+    return {'id': file_id, 'name': name, 'mimeType': 'image/png', 'parents': [parent_id],
+            'md5Checksum': f'md5-{file_id}', 'modifiedTime': '2024-04-01T00:00:00.000Z'}
+
+
+@pytest.fixture
+def walked(monkeypatch):
+    """walk_drive_tree の代わりにツリー外のフォルダの中身を返し、走査したフォルダIDを記録する"""
+    outside = {
+        'moved': [('/2023/moved/old', folder('old', 'old', 'moved')),
+                  ('/2023/moved/old/c.png', image('c', 'c.png', 'old'))],
+    }
+    walked = []
+
+    def walk_drive_tree(creds, root_id, root_path='', fields=None):
+        walked.append(root_id)
+        for path, item in outside.get(root_id, []):
+            yield path.replace('/2023/moved', root_path, 1), item
+
+    monkeypatch.setattr(drive_snapshot, 'walk_drive_tree', walk_drive_tree)
+    return walked
+
+
+@pytest.fixture
+def conn(tmp_path, walked):
+    conn = open_snapshot(str(tmp_path / 'snapshot.sqlite3'))
+    conn.execute('INSERT INTO files (id, parent_id, path, name, mime_type) VALUES (?, NULL, ?, ?, ?)',
+                 (ROOT_ID, '', '', FOLDER_MIME_TYPE))
+    drive_snapshot._apply_changes(conn, None, [
+        {'fileId': item['id'], 'file': item} for item in [
+            folder('y2024', '2024', ROOT_ID), folder('y20245', '20245', ROOT_ID),
+            image('a', 'a.png', 'y2024'), image('b', 'b.png', 'y20245'),
+        ]
+    ])
+    yield conn
+    conn.close()
+
+
+def paths(files):
+    return [f['path'] for f in files]
+
+
+def test_path_prefix_matches_folder_boundary(conn):
+    assert paths(query_files(conn, path_prefix='/2024')) == ['/2024/a.png']
+    assert paths(query_files(conn, path_prefix='/2024/')) == ['/2024/a.png']
+    assert paths(query_files(conn, path_prefix='/2024', include_folders=True)) == ['/2024', '/2024/a.png']
+    assert paths(query_files(conn, path_prefix='/20245')) == ['/20245/b.png']
+    assert paths(query_files(conn, path_prefix='/202')) == []
+
+
+def test_folder_moved_into_tree_is_walked(conn, walked):
+    applied = drive_snapshot._apply_changes(conn, None, [
+        {'fileId': 'moved', 'file': folder('moved', 'moved', 'y2024')},
+    ])
+
+    assert applied == 3
+    assert walked[-1] == 'moved'
+    assert paths(query_files(conn, path_prefix='/2024/moved', include_folders=True)) == [
+        '/2024/moved', '/2024/moved/old', '/2024/moved/old/c.png']
+    assert drive_snapshot.lookup_md5(conn, 'c') == 'md5-c'
+
+
+def test_known_folder_is_not_walked_again(conn, walked):
+    count = len(walked)
+    drive_snapshot._apply_changes(conn, None, [
+        {'fileId': 'y2024', 'file': folder('y2024', '2024年', ROOT_ID)},
+    ])
+
+    assert len(walked) == count
+    assert paths(query_files(conn, path_prefix='/2024年')) == ['/2024年/a.png']
+
+
+@pytest.fixture
+def duplicate(conn):
+    """同じ親にある同名のフォルダ（Drive では作れる）"""
+    drive_snapshot._apply_changes(conn, None, [
+        {'fileId': item['id'], 'file': item} for item in [
+            folder('dup', '2024', ROOT_ID), image('d', 'd.png', 'dup'),
+        ]
+    ])
+    return conn
+
+
+def test_delete_keeps_same_named_sibling(duplicate):
+    applied = drive_snapshot._apply_changes(duplicate, None, [{'fileId': 'dup', 'removed': True}])
+
+    assert applied == 2
+    assert paths(query_files(duplicate, path_prefix='/2024', include_folders=True)) == ['/2024', '/2024/a.png']
+    assert drive_snapshot.lookup_md5(duplicate, 'a') == 'md5-a'
+
+
+def test_rename_keeps_same_named_sibling(duplicate):
+    drive_snapshot._apply_changes(duplicate, None, [
+        {'fileId': 'dup', 'file': folder('dup', '2024追加', ROOT_ID)},
+    ])
+
+    assert paths(query_files(duplicate, path_prefix='/2024')) == ['/2024/a.png']
+    assert paths(query_files(duplicate, path_prefix='/2024追加')) == ['/2024追加/d.png']
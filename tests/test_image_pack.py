@@ -0,0 +1,84 @@
+"""画像パックからの読み出しとダウンロードの使い分け"""
+
+import asyncio
+import hashlib
+import io
+import types
+
+import pytest
+from PIL import Image
+
+pytest.importorskip('requests')
+
+import image_pack
+from image_normalize import DEFAULT_SETTINGS
+from image_pack import ImagePack, fetch_images
+
+OLD = b'old page'
+NEW = b'new page'
+
+
+def url(file_id):
+    return f'https://drive.google.com/file/d/{file_id}/view'
+
+
+@pytest.fixture
+def downloads(monkeypatch):
+    """ダウンロードの代わりに新しいページを返し、ダウンロードした URL を記録する"""
+    downloads = []
+
+    def download_image(direct_url):
+        downloads.append(direct_url)
+        return NEW
+
+    monkeypatch.setattr(image_pack, 'download_image', download_image)
+    return downloads
+
+
+@pytest.fixture
+def pack(tmp_path, downloads):
+    with ImagePack(str(tmp_path)) as pack:
+        pack.put('page', OLD)
+        yield pack
+
+
+def test_known_md5_is_read_from_pack(pack, downloads):
+    images = fetch_images(pack, [(url('page'), hashlib.md5(OLD).hexdigest())])
+
+    assert bytes(images[url('page')]) == OLD
+    assert downloads == []
+
+
+def test_changed_md5_is_downloaded(pack, downloads):
+    images = fetch_images(pack, [(url('page'), hashlib.md5(NEW).hexdigest())])
+
+    assert bytes(images[url('page')]) == NEW
+    assert len(downloads) == 1
+
+
+def test_unknown_md5_is_downloaded_again(pack, downloads):
+    # スナップショットがない場合は、画像パックの古い画像を使わない
+    images = fetch_images(pack, [(url('page'), None)])
+
+    assert bytes(images[url('page')]) == NEW
+    assert len(downloads) == 1
+    assert bytes(pack.get('page', hashlib.md5(NEW).hexdigest())) == NEW
+
+
+def test_ocr_fetch_downloads_unknown_md5_again(tmp_path, monkeypatch, extract_script):
+    # OCR のパイプラインでも、スナップショットがなければ画像パックの古い画像を使わない
+    def png(color):
+        output = io.BytesIO()
+        Image.new('RGB', (8, 8), color).save(output, format='PNG')
+        return output.getvalue()
+
+    old, new = png((255, 0, 0)), png((0, 0, 255))
+    monkeypatch.setattr(extract_script, 'download_image', lambda direct_url: new)
+    normalized_cache = types.SimpleNamespace(settings=DEFAULT_SETTINGS, get=lambda image: None, put=lambda image, data: data)
+
+    with ImagePack(str(tmp_path)) as pack:
+        pack.put('page', old)
+        image, _, md5 = asyncio.run(extract_script.fetch_normalized(url('page'), pack, normalized_cache, None, {}))
+
+    assert bytes(image) == new
+    assert md5 == hashlib.md5(new).hexdigest()
@@ -0,0 +1,64 @@
+"""OCR エンジンの結果をキャッシュに残すかどうか"""
+
+import asyncio
+import io
+import types
+
+from PIL import Image
+
+from image_normalize import NormalizationReport, settings_key
+from ocr_backends import OCR_MODEL, OCR_PROMPT, ClaudeBackend
+from ocr_cache import OcrCache, prompt_version
+
+
+def png(color):
+    output = io.BytesIO()
+    Image.new('RGB', (8, 8), color).save(output, format='PNG')
+    return output.getvalue()
+
+
+def test_claude_stub_has_its_own_version():
+    backend = ClaudeBackend()
+    assert not backend.cache_results
+    assert backend.version != prompt_version(OCR_MODEL, OCR_PROMPT)
+
+
+def stub_backend(cache_results):
+    return types.SimpleNamespace(name='stub', version='v1', concurrency=2, requests_per_minute=None,
+                                 cache_results=cache_results, extract=lambda image: 'ダミーの問題文')
+
+
+def run_extract(extract, monkeypatch, backend, ocr_cache):
+    images = {'url-1': png((255, 0, 0)), 'url-2': png((0, 0, 255))}
+
+    async def fetch_normalized(image_url, *args):
+        return images[image_url], images[image_url], f'md5-{image_url}'
+
+    monkeypatch.setattr(extract, 'fetch_normalized', fetch_normalized)
+    results = {}
+    normalized_cache = types.SimpleNamespace(settings={}, report=NormalizationReport())
+    asyncio.run(extract.extract_rows(
+        [(key, key) for key in images], None, normalized_cache, ocr_cache=ocr_cache, backend=backend,
+        on_result=lambda key, analysis: results.setdefault(key, analysis['question_text'])))
+    return results
+
+
+def test_stub_results_are_not_cached(tmp_path, monkeypatch, extract_script):
+    with OcrCache(str(tmp_path / 'ocr.sqlite3')) as ocr_cache:
+        # 同じバージョンのキーに前回の結果があっても使わず、ダミーの結果も保存しない
+        ocr_cache.put('md5-url-1', settings_key({}), 'v1', '前回の結果')
+
+        results = run_extract(extract_script, monkeypatch, stub_backend(False), ocr_cache)
+
+        assert results == {'url-1': 'ダミーの問題文', 'url-2': 'ダミーの問題文'}
+        assert ocr_cache.get('md5-url-2', settings_key({}), 'v1') is None
+
+
+def test_real_results_are_cached(tmp_path, monkeypatch, extract_script):
+    with OcrCache(str(tmp_path / 'ocr.sqlite3')) as ocr_cache:
+        ocr_cache.put('md5-url-1', settings_key({}), 'v1', '前回の結果')
+
+        results = run_extract(extract_script, monkeypatch, stub_backend(True), ocr_cache)
+
+        assert results == {'url-1': '前回の結果', 'url-2': 'ダミーの問題文'}
+        assert ocr_cache.get('md5-url-2', settings_key({}), 'v1') == 'ダミーの問題文'
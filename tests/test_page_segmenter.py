@@ -0,0 +1,62 @@
+"""ページから切り出した問題の画像の保存と、OCR で切り出しを使う条件"""
+
+import io
+
+import pytest
+
+pytest.importorskip('requests')
+
+from PIL import Image
+
+from page_segmenter import SegmentStore, crop
+
+IMAGE_URL = 'https://drive.google.com/file/d/page-file-id/view'
+
+
+def page():
+    output = io.BytesIO()
+    Image.new('RGB', (40, 60), 'white').save(output, format='PNG')
+    return output.getvalue()
+
+
+@pytest.fixture
+def store(tmp_path):
+    with SegmentStore(str(tmp_path)) as store:
+        data = page()
+        for question_id, bbox in (('q1', (0, 0, 40, 30)), ('q2', (0, 30, 40, 60))):
+            store.put(question_id, 'page-md5', (40, 60), bbox, 'anchor', crop(data, bbox))
+        yield store
+
+
+def test_delete_segments(store):
+    assert Image.open(io.BytesIO(bytes(store.crop('q1')))).size == (40, 30)
+
+    store.delete(['q1'])
+
+    assert store.get('q1') is None
+    assert store.crop('q1') is None
+    assert store.get('q2')['page_md5'] == 'page-md5'
+
+
+def test_crop_is_used_only_for_current_page(store, tmp_path, extract_script):
+    from drive_snapshot import open_snapshot
+
+    class Journal:
+        def get(self, question_id, image_url):
+            return None
+
+    snapshot = open_snapshot(str(tmp_path / 'snapshot.sqlite3'))
+    snapshot.execute("INSERT INTO files (id, path, name, mime_type, md5) "
+                     "VALUES ('page-file-id', '/2024/page.png', 'page.png', 'image/png', 'page-md5')")
+    values = [['問題ID'] + [''] * 8] + [[question_id] + [''] * 7 + [IMAGE_URL] for question_id in ('q1', 'q2', 'q3')]
+
+    targets, _ = extract_script.prepare_tab([list(row) for row in values], Journal(), store, snapshot)
+    assert targets == [(1, 'segment:q1'), (2, 'segment:q2'), (3, IMAGE_URL)]
+
+    # ページが変わった（スナップショットがない）場合はページ全体を使う
+    snapshot.execute("UPDATE files SET md5 = 'new-page-md5'")
+    targets, _ = extract_script.prepare_tab([list(row) for row in values], Journal(), store, snapshot)
+    assert targets == [(1, IMAGE_URL), (2, IMAGE_URL), (3, IMAGE_URL)]
+    targets, _ = extract_script.prepare_tab([list(row) for row in values], Journal(), store, None)
+    assert targets == [(1, IMAGE_URL), (2, IMAGE_URL), (3, IMAGE_URL)]
+    snapshot.close()
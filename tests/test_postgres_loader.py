@@ -0,0 +1,96 @@
+"""
+postgres_loader を実際の Postgres に対して実行する
+
+環境変数 TEST_DATABASE_URL の DB（なければ testcontainers で起動した Postgres）の
+使い捨てのスキーマに questions テーブルを作って投入する。どちらもなければスキップ。
+"""
+
+import os
+import uuid
+from datetime import datetime
+
+import pytest
+
+psycopg2 = pytest.importorskip('psycopg2')
+
+from postgres_loader import load_questions
+from question_schema import SEARCH_SCHEMA_SQL
+
+TEST_DATABASE_URL_ENV = 'TEST_DATABASE_URL'
+
+
+@pytest.fixture(scope='module')
+def database_url():
+    url = os.environ.get(TEST_DATABASE_URL_ENV)
+    if url:
+        yield url
+        return
+
+    postgres = pytest.importorskip(
+        'testcontainers.postgres', reason=f'{TEST_DATABASE_URL_ENV} か testcontainers が必要です')
+    container = postgres.PostgresContainer('postgres:16', driver=None)
+    try:
+        container.start()
+    except Exception as e:
+        pytest.skip(f'Postgres のコンテナを起動できません: {e}')
+    try:
+        yield container.get_connection_url()
+    finally:
+        container.stop()
+
+
+@pytest.fixture
+def conn(database_url):
+    conn = psycopg2.connect(database_url)
+    schema = f'test_{uuid.uuid4().hex[:12]}'
+    with conn, conn.cursor() as cursor:
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm SCHEMA public')
+        cursor.execute(f'CREATE SCHEMA {schema}')
+        cursor.execute(f'SET search_path TO {schema}, public')
+        cursor.execute(SEARCH_SCHEMA_SQL)
+    yield conn
+    conn.rollback()
+    with conn, conn.cursor() as cursor:
+        cursor.execute(f'DROP SCHEMA {schema} CASCADE')
+    conn.close()
+
+
+def question(question_id, year=2024, created_date='', **fields):
+    return dict({'question_id': question_id, 'year': year, 'category': '気候,農業', 'answer': '1',
+                 'correct_rate': '75%', 'image_url': '', 'created_date': created_date,
+                 'notes': '', 'keywords': '', 'question_text': '問題文'}, **fields)
+
+
+def fetch(conn, question_id):
+    with conn, conn.cursor() as cursor:
+        cursor.execute('SELECT answer, categories, correct_rate, created_date FROM questions '
+                       'WHERE question_id = %s', (question_id,))
+        return cursor.fetchone()
+
+
+def test_insert_and_update(conn):
+    result = load_questions(conn, [question('2024_1'), question('2024_2', answer='2'),
+                                   question('2024_2', answer='3'), question('no_year', year=None)])
+    assert (result['rows'], result['inserted'], result['updated']) == (4, 2, 0)
+    answer, categories, correct_rate, _ = fetch(conn, '2024_2')
+    assert (answer, categories, float(correct_rate)) == ('3', ['気候', '農業'], 75.0)
+
+    result = load_questions(conn, [question('2024_1'), question('2024_2', answer='4')])
+    assert (result['inserted'], result['updated']) == (0, 1)
+
+
+def test_created_date_is_kept_when_blank(conn):
+    load_questions(conn, [question('2024_1'), question('2024_2', created_date='2024/04/01 09:30:00')])
+    created = fetch(conn, '2024_1')[3]
+    assert created is not None
+
+    # 作成日が空のまま再投入・更新しても、最初に投入した日時のまま
+    result = load_questions(conn, [question('2024_1', answer='2'), question('2024_2', answer='2')])
+    assert result['updated'] == 2
+    assert fetch(conn, '2024_1')[3] == created
+    assert fetch(conn, '2024_2')[3] == datetime(2024, 4, 1, 9, 30)
+
+    # 作成日が入力されたら更新する
+    result = load_questions(conn, [question('2024_1', answer='2', created_date='2023-12-24')])
+    assert result['updated'] == 1
+    assert fetch(conn, '2024_1')[3] == datetime(2023, 12, 24)
@@ -0,0 +1,69 @@
+"""問題データのレプリカの検索"""
+
+import pytest
+
+from question_index import open_index, rebuild_index, search_questions
+
+
+def question(question_id, year, category, keywords, question_text):
+    return {
+        'question_id': question_id, 'sheet': f'{year}年', 'year': year, 'category': category,
+        'answer': '1', 'correct_rate': '', 'notes': '', 'created_date': '', 'image_url': '',
+        'keywords': keywords, 'question_text': question_text
+    }
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = open_index(str(tmp_path / 'questions.sqlite3'))
+    rebuild_index(conn, [
+        question('2023_1', 2023, '気候', '気候,ケッペン', '次の図は世界の気候区分を示している。'),
+        question('2024_1', 2024, '農業', '稲作', '東南アジアの稲作と気候について述べた文'),
+        question('2024_2', 2024, '農業', '気候', '地中海沿岸の農業の特色'),
+        question('2024_3', 2024, '工業', '', 'ヨーロッパの工業地域'),
+    ])
+    yield conn
+    conn.close()
+
+
+def ids(rows):
+    return sorted(row['question_id'] for row in rows)
+
+
+def test_short_query_matches_text_or_keyword(conn):
+    assert ids(search_questions(conn, text='気候')) == ['2023_1', '2024_1', '2024_2']
+    # キーワードにない語も問題文の部分一致で見つかる
+    assert ids(search_questions(conn, text='稲作')) == ['2024_1']
+    assert ids(search_questions(conn, text='沿岸')) == ['2024_2']
+    assert ids(search_questions(conn, text='砂漠')) == []
+
+
+def test_short_query_with_filters(conn):
+    assert ids(search_questions(conn, text='気候', year=2024)) == ['2024_1', '2024_2']
+    assert ids(search_questions(conn, text='気候', year=2024, category='農業')) == ['2024_1', '2024_2']
+    assert ids(search_questions(conn, text='気候', category='気候')) == ['2023_1']
+    assert ids(search_questions(conn, text='工業', question_id='2024_3')) == ['2024_3']
+    assert ids(search_questions(conn, text='気候', question_id='2024_3')) == []
+
+
+def test_long_query_uses_full_text(conn):
+    assert ids(search_questions(conn, text='ヨーロッパ')) == ['2024_3']
+    assert ids(search_questions(conn, text='気候区分', year=2023)) == ['2023_1']
+
+
+def test_short_query_uses_gram_index(conn):
+    # 1文字の検索語やキーワードの一部も見つかる
+    assert ids(search_questions(conn, text='業')) == ['2024_2', '2024_3']
+    assert ids(search_questions(conn, text='ケッ')) == ['2023_1']
+    assert ids(search_questions(conn, text='業', year=2024, category='工業')) == ['2024_3']
+    assert ids(search_questions(conn, text='稲作', year=2023)) == []
+
+
+def test_rebuild_replaces_gram_index(conn):
+    rebuild_index(conn, [question('2025_1', 2025, '人口', '', '人口ピラミッド(2020年)')])
+    assert ids(search_questions(conn, text='気候')) == []
+    assert ids(search_questions(conn, text='人口', year=2025)) == ['2025_1']
+    # ASCII の記号を含む検索語も、索引で引いた候補を照合し直して見つける
+    assert ids(search_questions(conn, text='(2', year=2025)) == ['2025_1']
+    assert ids(search_questions(conn, text=')')) == ['2025_1']
+    assert ids(search_questions(conn, text='(3')) == []
@@ -0,0 +1,96 @@
+"""取得 → OCR → 分析のパイプラインの同時実行数とタイムアウト"""
+
+import asyncio
+import threading
+import time
+
+from question_pipeline import OCR_FAILED_TEXT, run_pipeline
+
+
+async def fetch(image_url):
+    return image_url
+
+
+def test_analyze_runs_off_event_loop():
+    loop_thread = threading.get_ident()
+    threads = set()
+
+    def analyze(question_text):
+        threads.add(threading.get_ident())
+        return question_text.upper()
+
+    async def ocr(image):
+        return image
+
+    results = asyncio.run(run_pipeline([(i, f'image{i}') for i in range(5)], fetch, ocr, analyze))
+
+    assert results == {i: f'IMAGE{i}' for i in range(5)}
+    assert loop_thread not in threads
+
+
+def test_timed_out_ocr_holds_its_slot():
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def recognize(image):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        # 最初の2枚はタイムアウトより長くかかる
+        time.sleep(0.3 if image in ('image0', 'image1') else 0.01)
+        with lock:
+            running -= 1
+        return f'text:{image}'
+
+    async def ocr(image):
+        return await asyncio.to_thread(recognize, image)
+
+    results = asyncio.run(run_pipeline(
+        [(i, f'image{i}') for i in range(8)], fetch, ocr, lambda text: text,
+        ocr_concurrency=2, ocr_timeout=0.1
+    ))
+
+    assert results[0] == results[1] == OCR_FAILED_TEXT
+    assert results[7] == 'text:image7'
+    # タイムアウトした OCR がスレッドで動いている間は次の画像を OCR しない
+    assert peak == 2
+    assert running == 0
+
+
+def test_duplicates_wait_outside_ocr_slots():
+    """重複画像は代表画像の OCR を OCR のワーカーの枠の外で待つ"""
+    leaders = {}
+    started = []
+    finished = []
+
+    def reuse(image):
+        name = image.split('#')[0]
+        if name in leaders:
+            return leaders[name]
+        leaders[name] = asyncio.get_running_loop().create_future()
+        return None
+
+    async def ocr(image):
+        started.append(image)
+        name = image.split('#')[0]
+        await asyncio.sleep(0.05 if name == 'slow' else 0)
+        finished.append(image)
+        text = None if name == 'broken' and image == 'broken' else f'text:{image}'
+        if not leaders[name].done():
+            leaders[name].set_result(text)
+        if text is None:
+            raise RuntimeError('OCR failed')
+        return text
+
+    items = [(1, 'slow'), (2, 'slow#2'), (3, 'slow#3'), (4, 'broken'), (5, 'broken#5'), (6, 'other')]
+    results = asyncio.run(run_pipeline(items, fetch, ocr, lambda text: text,
+                                       fetch_concurrency=1, ocr_concurrency=2, reuse=reuse))
+
+    assert results == {1: 'text:slow', 2: 'text:slow', 3: 'text:slow', 4: OCR_FAILED_TEXT,
+                       5: 'text:broken#5', 6: 'text:other'}
+    # 重複画像は OCR せず、代表画像の OCR が失敗した画像だけ自分で OCR する
+    assert sorted(started) == ['broken', 'broken#5', 'other', 'slow']
+    # 代表画像の OCR を待つ間も、もう1つの枠で他の画像を OCR する
+    assert finished[-1] == 'slow'
@@ -0,0 +1,70 @@
+"""API ごとの governor の再試行と同時実行数の調整"""
+
+import json
+
+import pytest
+
+pytest.importorskip('googleapiclient')
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+import quota_governor
+from quota_governor import QuotaGovernor, QuotaLimit
+
+
+def http_error(status, reason=None, detail=None):
+    body = {'error': {'code': status, 'errors': [{'reason': reason}] if reason else []}}
+    if detail:
+        body['error']['details'] = [{'@type': 'type.googleapis.com/google.rpc.ErrorInfo', 'reason': detail}]
+    return HttpError(httplib2.Response({'status': status}), json.dumps(body).encode('utf-8'))
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(quota_governor, 'BACKOFF_BASE_SECONDS', 0)
+    monkeypatch.setattr(quota_governor, 'DECREASE_INTERVAL_SECONDS', 0)
+
+
+def governor():
+    return QuotaGovernor('test', QuotaLimit(per_minute=6000, initial_concurrency=8, max_concurrency=8))
+
+
+@pytest.mark.parametrize('error', [http_error(429), http_error(403, 'userRateLimitExceeded'),
+                                   http_error(403, detail='RATE_LIMIT_EXCEEDED')])
+def test_rate_limit_halves_concurrency(error):
+    g = governor()
+    g.throttled(0, error)
+    assert g.concurrency == 4
+    assert g.stats['rate_limited'] == 1
+
+
+@pytest.mark.parametrize('error', [http_error(500), http_error(503), ConnectionError()])
+def test_server_errors_keep_concurrency(error):
+    g = governor()
+    g.throttled(0, error)
+    assert g.concurrency == 8
+    assert g.stats == {'retries': 1}
+
+
+def test_call_retries_up_to_max_retries():
+    g = governor()
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise http_error(503)
+
+    with pytest.raises(HttpError):
+        g.call(fail, max_retries=2)
+    assert len(calls) == 3
+
+    calls.clear()
+    with pytest.raises(HttpError):
+        g.call(fail)
+    assert len(calls) == g.max_retries + 1
+
+
+def test_permission_errors_are_not_retried():
+    assert not quota_governor.is_retryable(http_error(403, 'insufficientFilePermissions'))
+    assert not quota_governor.is_retryable(http_error(403))
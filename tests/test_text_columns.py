@@ -0,0 +1,36 @@
+"""問題文・キーワード列（K〜O列）への書き込み"""
+
+import types
+
+ANALYSIS = {
+    'question_text': '問題文', 'geographical_keywords': '地理', 'industry_keywords': '産業',
+    'climate_keywords': '気候', 'full_keywords': '全部'
+}
+HEADER = ['問題ID', '年度', '分野', '正答', '正答率', '', 'ノート', '作成日', '画像URL', 'OCRキーワード']
+IMAGE = 'https://drive.google.com/file/d/page/view'
+
+
+def journal(done):
+    return types.SimpleNamespace(get=lambda question_id, image_url: ANALYSIS if question_id in done else None)
+
+
+def test_columns_are_added_once(extract_script):
+    values = [list(HEADER), ['q1', '', '', '', '', '', '', '', IMAGE]]
+
+    for _ in range(2):
+        # 2回目はシートから読み直した（K〜O列まで埋まった）値
+        targets, resumed = extract_script.prepare_tab(values, journal({'q1'}))
+        assert values[0] == HEADER + extract_script.TEXT_COLUMNS
+        assert values[1][10:] == ['問題文', '地理', '産業', '気候', '全部']
+        assert (targets, resumed) == ([], 1)
+
+
+def test_text_columns_start_at_k(extract_script):
+    values = [list(HEADER), ['q1', '', '', '', '', '', '', '', IMAGE, 'OCR', '古い問題文', '', '', '', '']]
+
+    targets, _ = extract_script.prepare_tab(values, journal(set()))
+    extract_script.apply_analysis(values[1], ANALYSIS)
+
+    assert targets == [(1, IMAGE)]
+    assert len(values[0]) == len(values[1]) == 15
+    assert values[1][9:] == ['OCR', '問題文', '地理', '産業', '気候', '全部']
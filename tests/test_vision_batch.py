@@ -0,0 +1,103 @@
+"""バッチジョブのクライアントと一括抽出を scripts/mock_batch_server.py に対して実行する"""
+
+import asyncio
+import base64
+import functools
+import io
+import types
+
+import pytest
+
+requests = pytest.importorskip('requests')
+
+from PIL import Image
+
+import vision_batch
+from mock_batch_server import MockBatchServer, fake_extraction
+from question_pipeline import OCR_FAILED_TEXT
+
+
+def png(color):
+    output = io.BytesIO()
+    Image.new('RGB', (8, 8), color).save(output, format='PNG')
+    return output.getvalue()
+
+
+IMAGES = {f'md5-{i}': png((i * 40, 0, 0)) for i in range(5)}
+
+
+def expected(image):
+    return fake_extraction(base64.b64encode(image).decode('ascii'))
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = MockBatchServer(processing_seconds=0)
+    monkeypatch.setenv('ANTHROPIC_BASE_URL', server.start())
+    yield server
+    server.stop()
+
+
+def test_batch_round_trip(server):
+    client = vision_batch.BatchClient()
+    chunks = list(vision_batch.chunk_requests(IMAGES.items(), max_requests=2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+
+    results = {}
+    for chunk in chunks:
+        batch = client.create(chunk)
+        ended = client.wait(batch['id'], poll_interval=0.01)
+        assert ended['request_counts']['succeeded'] == len(chunk)
+        for custom_id, extraction, error in client.iter_results(ended):
+            results[custom_id] = (extraction, error)
+
+    assert results == {md5: (expected(image), None) for md5, image in IMAGES.items()}
+
+
+def test_errored_requests(server):
+    server.error_rate = 1.0
+    client = vision_batch.BatchClient()
+    batch = client.create(next(vision_batch.chunk_requests(IMAGES.items())))
+
+    results = list(client.iter_results(client.wait(batch['id'], poll_interval=0.01)))
+
+    assert results == [(md5, None, 'Overloaded') for md5 in IMAGES]
+
+
+def test_create_failure_raises(server):
+    server.create_failures = 1
+    client = vision_batch.BatchClient()
+    batch_requests = next(vision_batch.chunk_requests(IMAGES.items()))
+
+    with pytest.raises(requests.HTTPError):
+        client.create(batch_requests)
+    assert client.create(batch_requests)['processing_status'] == 'ended'
+
+
+def test_bulk_extraction_keeps_created_batches(server, monkeypatch, extract_script):
+    extract = extract_script
+    # 画像の取得の代わりに URL（= md5）の画像をそのまま返す
+    async def fetch_normalized(image_url, *args):
+        return None, IMAGES[image_url], image_url
+
+    monkeypatch.setattr(extract, 'fetch_normalized', fetch_normalized)
+    monkeypatch.setattr(vision_batch, 'chunk_requests',
+                        functools.partial(vision_batch.chunk_requests, max_requests=2))
+    # 最初のジョブ（md5-0, md5-1）の作成だけが失敗する
+    server.create_failures = 1
+
+    # 同じ画像を指す行は1回だけリクエストして、両方の行に結果を渡す
+    targets = [(f'row-{md5}', md5) for md5 in IMAGES] + [('row-copy', 'md5-4')]
+    results = {}
+    asyncio.run(extract.extract_rows_bulk(targets, None, types.SimpleNamespace(settings={}),
+                                          on_result=lambda key, analysis: results.setdefault(key, analysis)))
+
+    texts = {key: analysis['question_text'] for key, analysis in results.items()}
+    assert texts == {
+        'row-md5-0': OCR_FAILED_TEXT,
+        'row-md5-1': OCR_FAILED_TEXT,
+        'row-md5-2': expected(IMAGES['md5-2'])['questionText'],
+        'row-md5-3': expected(IMAGES['md5-3'])['questionText'],
+        'row-md5-4': expected(IMAGES['md5-4'])['questionText'],
+        'row-copy': expected(IMAGES['md5-4'])['questionText'],
+    }
@@ -5,8 +5,13 @@ WebブラウザとAPIを使用してSupabaseプロジェクトを設定
 
 import webbrowser
 import json
+import os
+import sys
 import time
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+from question_schema import SEARCH_SCHEMA_SQL
+
 def open_supabase_signup():
     """Supabaseサインアップページを開く"""
     print("🚀 Supabaseセットアップを開始します")
@@ -46,35 +51,14 @@ def setup_database_instructions():
     print("1. 左メニューの「SQL Editor」をクリック")
     print("2. 以下のSQLをコピー&ペーストして実行：")
     
-    sql_code = '''-- 地理問題データベーステーブル
-CREATE TABLE questions (
-    id SERIAL PRIMARY KEY,
-    question_id VARCHAR(50) UNIQUE NOT NULL,
-    category VARCHAR(100),
-    answer VARCHAR(10),
-    correct_rate VARCHAR(10),
-    image_url TEXT,
-    year INTEGER,
-    created_date TIMESTAMP DEFAULT NOW(),
-    notes TEXT
-);
-
--- インデックス作成
-CREATE INDEX idx_questions_year ON questions(year);
-CREATE INDEX idx_questions_category ON questions(category);
-
--- 行レベルセキュリティ
-ALTER TABLE questions ENABLE ROW LEVEL SECURITY;
-
--- 読み取り専用ポリシー
-CREATE POLICY "Anyone can read questions" ON questions
-    FOR SELECT USING (true);
+    # load-questions-to-postgres.py と同じ検索向けのテーブル定義（年度パーティション・分野タグ配列）
+    sql_code = SEARCH_SCHEMA_SQL.strip() + '''
 
 -- サンプルデータ
-INSERT INTO questions (question_id, category, answer, correct_rate, image_url, year, notes) VALUES
-('2024_geo_1_1', '地形', '3', '75%', 'https://example.com/image1.jpg', 2024, '2024年共通テスト地理B 第1問 問1'),
-('2024_geo_1_2', '気候', '1', '82%', 'https://example.com/image2.jpg', 2024, '2024年共通テスト地理B 第1問 問2'),
-('2024_geo_1_3', '農業', '4', '68%', 'https://example.com/image3.jpg', 2024, '2024年共通テスト地理B 第1問 問3');'''
+INSERT INTO questions (question_id, year, category, categories, answer, correct_rate, image_url, notes) VALUES
+('2024_geo_1_1', 2024, '地形', '{地形}', '3', 75, 'https://example.com/image1.jpg', '2024年共通テスト地理B 第1問 問1'),
+('2024_geo_1_2', 2024, '気候', '{気候}', '1', 82, 'https://example.com/image2.jpg', '2024年共通テスト地理B 第1問 問2'),
+('2024_geo_1_3', 2024, '農業', '{農業}', '4', 68, 'https://example.com/image3.jpg', '2024年共通テスト地理B 第1問 問3');'''
     
     print(f"\n```sql\n{sql_code}\n```")
     
@@ -179,7 +163,7 @@ def main():
         print("次のステップ:")
         print("1. Next.jsアプリをSupabase連携に更新")
         print("2. 画像ファイルをSupabase Storageに移行")  
-        print("3. Google Sheetsデータを移行")
+        print("3. Google Sheetsデータを移行（python3 scripts/load-questions-to-postgres.py）")
         print("4. Vercelに再デプロイ")
         
         print(f"\n📁 設定ファイル: /Users/shun/geography-db/supabase-config.json")